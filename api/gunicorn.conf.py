@@ -0,0 +1,21 @@
+"""
+Configuração do gunicorn para rodar a API com vários workers
+    PROMETHEUS_MULTIPROC_DIR=/tmp/agrodata-metrics \
+        gunicorn -c api/gunicorn.conf.py api.index:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def on_starting(server):
+    # Import tardio: ler o config não carrega o registry (o pid dele é resolvido a cada uso)
+    from api.lib.metrics import clear_multiproc_dir
+
+    # Master sobe antes dos workers: estados da execução anterior não entram no scrape
+    removed = clear_multiproc_dir(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+    if removed:
+        server.log.info("metrics: %d arquivos de workers anteriores removidos", removed)
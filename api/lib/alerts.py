@@ -0,0 +1,266 @@
+"""
+Motor de alertas de mercado e clima (substitui a detecção no navegador)
+- Roda uma vez por dado novo, no caminho da ingestão (data_fetcher/daemon)
+  ou sob demanda (POST /api/alerts/evaluate), e não em cada cliente
+- Regras configuráveis (ALERT_RULES_JSON): limiar, variação % entre pontos
+  e soma móvel; avaliadas em um passe vetorizado sobre a janela recente
+- Notificações gravadas em lote para os usuários inscritos (opt-out em
+  alert_subscriptions), com dedup_key única por usuário: reavaliar a mesma
+  janela não duplica linhas
+"""
+
+import json
+import operator
+import os
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from .instrumentation import get_logger
+
+logger = get_logger("agrodata.alerts")
+
+ALERT_WINDOW_DAYS = int(os.getenv("ALERT_WINDOW_DAYS", "30"))  # histórico carregado p/ variação e soma móvel
+ALERT_RECENT_DAYS = int(os.getenv("ALERT_RECENT_DAYS", "3"))  # só pontos novos geram notificação
+ALERT_INSERT_BATCH = int(os.getenv("ALERT_INSERT_BATCH", "500"))
+PAGE_SIZE = 1000
+
+OPERATORS: Dict[str, Callable] = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "abs>=": lambda s, v: s.abs() >= v,
+}
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """
+    kind:
+    - "threshold": valor da coluna comparado a value
+    - "change_pct": variação % para o ponto window posições antes
+    - "rolling_sum": soma móvel de window pontos
+    """
+    id: str
+    table: str  # fact_mercado | fact_clima
+    column: str
+    kind: str
+    op: str
+    value: float
+    title: str
+    body: str
+    category: str = "mercado"
+    level: str = "warning"
+    window: int = 1
+
+    def metric(self, frame: pd.DataFrame) -> pd.Series:
+        values = pd.to_numeric(frame[self.column], errors="coerce")
+        if self.kind == "change_pct":
+            previous = values.shift(self.window)
+            return (values - previous) / previous.where(previous != 0) * 100
+        if self.kind == "rolling_sum":
+            return values.fillna(0).rolling(self.window, min_periods=self.window).sum()
+        return values
+
+
+ASSETS = {"valor_dolar": "Dólar", "valor_jbs": "JBS (JBSS3)", "valor_boi_gordo": "Boi Gordo"}
+
+DEFAULT_RULES: List[AlertRule] = [
+    *(
+        AlertRule(
+            f"oscilacao_{column}", "fact_mercado", column, "change_pct", "abs>=", 2.0,
+            "{icon} Oscilação detectada: " + asset,
+            asset + " {trend} {abs_metric:.2f}% (de R$ {previous:.2f} para R$ {current:.2f})",
+        )
+        for column, asset in ASSETS.items()
+    ),
+    AlertRule(
+        "chuva_intensa", "fact_clima", "chuva_mm", "threshold", ">", 100.0,
+        "🌧️ Alerta: Chuva Intensa",
+        "Precipitação de {current:.1f}mm registrada em {data}. Pode impactar logística e pastagens.",
+        category="clima",
+    ),
+    AlertRule(
+        "seca_7d", "fact_clima", "chuva_mm", "rolling_sum", "<", 5.0,
+        "☀️ Alerta: Período de Seca",
+        "Apenas {metric:.1f}mm de chuva nos 7 dias até {data}. Monitorar hidratação do gado.",
+        category="clima", window=7,
+    ),
+    AlertRule(
+        "temperatura_elevada", "fact_clima", "temp_max", "threshold", ">", 35.0,
+        "🌡️ Alerta: Temperatura Elevada",
+        "Temperatura de {current:.1f}°C registrada em {data}. Aumentar fornecimento de água.",
+        category="clima",
+    ),
+]
+
+
+def load_rules(spec: Optional[str] = None) -> List[AlertRule]:
+    """ALERT_RULES_JSON: lista de regras no formato de AlertRule (substitui as padrão)"""
+    spec = spec if spec is not None else os.getenv("ALERT_RULES_JSON", "")
+    if not spec.strip():
+        return list(DEFAULT_RULES)
+    return [AlertRule(**item) for item in json.loads(spec)]
+
+
+# ============ Avaliação ============
+def evaluate_rules(
+    frames: Dict[str, pd.DataFrame],
+    rules: Iterable[AlertRule],
+    since: Optional[date] = None,
+) -> pd.DataFrame:
+    """
+    Um passe por regra sobre a janela inteira (Series do pandas, sem loop por
+    linha). Retorna os disparos a partir de `since`:
+    rule_id, data, current, previous, metric
+    """
+    triggered = []
+    for rule in rules:
+        frame = frames.get(rule.table)
+        if frame is None or frame.empty or rule.column not in frame:
+            continue
+        frame = frame.sort_values("data_fk")
+        metric = rule.metric(frame)
+        mask = OPERATORS[rule.op](metric, rule.value).fillna(False).to_numpy(dtype=bool)
+        if since is not None:
+            mask &= (pd.to_datetime(frame["data_fk"]).dt.date >= since).to_numpy()
+        if not mask.any():
+            continue
+        values = pd.to_numeric(frame[rule.column], errors="coerce")
+        triggered.append(pd.DataFrame({
+            "rule_id": rule.id,
+            "data": frame["data_fk"].astype(str).str[:10].to_numpy()[mask],
+            "current": values.to_numpy()[mask],
+            "previous": values.shift(rule.window).to_numpy()[mask],
+            "metric": metric.to_numpy()[mask],
+        }))
+    if not triggered:
+        return pd.DataFrame(columns=["rule_id", "data", "current", "previous", "metric"])
+    return pd.concat(triggered, ignore_index=True)
+
+
+def render(rule: AlertRule, alert: Dict[str, Any]) -> Dict[str, str]:
+    up = alert["metric"] > 0
+    fields = {
+        **alert,
+        "icon": "📈" if up else "📉",
+        "trend": "subiu" if up else "caiu",
+        "abs_metric": abs(alert["metric"]),
+    }
+    return {"title": rule.title.format(**fields), "body": rule.body.format(**fields)}
+
+
+def build_notifications(alerts: pd.DataFrame, rules: Iterable[AlertRule], users_by_category: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """Texto montado uma vez por disparo e replicado para cada usuário inscrito na categoria"""
+    rules_by_id = {rule.id: rule for rule in rules}
+    rows = []
+    for alert in alerts.to_dict("records"):
+        rule = rules_by_id[alert["rule_id"]]
+        message = render(rule, alert)
+        dedup_key = f"{rule.id}:{alert['data']}"
+        rows.extend(
+            {
+                "user_id": user_id,
+                "title": message["title"],
+                "body": message["body"],
+                "category": rule.category,
+                "level": rule.level,
+                "dedup_key": dedup_key,
+            }
+            for user_id in users_by_category.get(rule.category, [])
+        )
+    return rows
+
+
+# ============ Supabase ============
+def _paged(query_factory: Callable[[], Any]) -> List[Dict[str, Any]]:
+    rows, offset = [], 0
+    while True:
+        page = query_factory().range(offset, offset + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def load_window(client, tables: Iterable[str], end: Optional[date] = None, days: int = ALERT_WINDOW_DAYS) -> Dict[str, pd.DataFrame]:
+    end = end or date.today()
+    start = (end - timedelta(days=days)).isoformat()
+    frames = {}
+    for table in set(tables):
+        if table == "fact_mercado":
+            rows = client.table("fact_mercado").select("data_fk, valor_dolar, valor_jbs, valor_boi_gordo") \
+                .gte("data_fk", start).order("data_fk").execute().data or []
+        else:
+            # Média diária entre as regiões (uma linha por data)
+            try:
+                rows = client.table("view_clima_diario").select("data_fk, chuva_mm, temp_max") \
+                    .gte("data_fk", start).order("data_fk").execute().data or []
+            except Exception:
+                raw = client.table("fact_clima").select("data_fk, chuva_mm, temp_max") \
+                    .gte("data_fk", start).order("data_fk").execute().data or []
+                rows = (
+                    pd.DataFrame(raw).groupby("data_fk", as_index=False)[["chuva_mm", "temp_max"]].mean().to_dict("records")
+                    if raw else []
+                )
+        frames[table] = pd.DataFrame(rows)
+    return frames
+
+
+def subscribed_users(client, categories: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Opt-out: todo usuário com perfil recebe, exceto quem desativou em
+    alert_subscriptions (enabled=false ou categoria fora da lista)
+    """
+    users = [row["user_id"] for row in _paged(lambda: client.table("profiles").select("user_id").order("user_id"))]
+    try:
+        overrides = {
+            row["user_id"]: row
+            for row in _paged(lambda: client.table("alert_subscriptions").select("user_id, enabled, categories").order("user_id"))
+        }
+    except Exception:
+        logger.warning("alert_subscriptions indisponível; alertas para todos os usuários")
+        overrides = {}
+
+    result = {}
+    for category in categories:
+        result[category] = [
+            user for user in users
+            if user not in overrides
+            or (overrides[user].get("enabled", True) and category in (overrides[user].get("categories") or [category]))
+        ]
+    return result
+
+
+def insert_notifications(client, rows: List[Dict[str, Any]], batch_size: int = ALERT_INSERT_BATCH) -> int:
+    """Insert em lotes; (user_id, dedup_key) já existente é ignorado. Retorna linhas novas."""
+    inserted = 0
+    for i in range(0, len(rows), batch_size):
+        resp = client.table("notifications").upsert(
+            rows[i:i + batch_size], on_conflict="user_id,dedup_key", ignore_duplicates=True
+        ).execute()
+        inserted += len(resp.data or [])
+    return inserted
+
+
+def run_alerts(
+    client,
+    tables: Iterable[str] = ("fact_mercado", "fact_clima"),
+    rules: Optional[List[AlertRule]] = None,
+    today: Optional[date] = None,
+) -> Dict[str, int]:
+    """Avalia as regras das tabelas com dados novos e grava as notificações"""
+    tables = set(tables)
+    rules = [rule for rule in (rules or load_rules()) if rule.table in tables]
+    if not rules:
+        return {"alerts": 0, "notifications": 0, "inserted": 0}
+    today = today or date.today()
+    frames = load_window(client, {rule.table for rule in rules}, today)
+    alerts = evaluate_rules(frames, rules, since=today - timedelta(days=ALERT_RECENT_DAYS))
+    if alerts.empty:
+        return {"alerts": 0, "notifications": 0, "inserted": 0}
+
+    fired_categories = {rule.category for rule in rules if rule.id in set(alerts["rule_id"])}
+    rows = build_notifications(alerts, rules, subscribed_users(client, fired_categories))
+    inserted = insert_notifications(client, rows) if rows else 0
+    logger.info("alerts evaluated", extra={"alerts": len(alerts), "notifications": len(rows), "inserted": inserted})
+    return {"alerts": int(len(alerts)), "notifications": len(rows), "inserted": inserted}
@@ -0,0 +1,227 @@
+"""
+Broker de eventos para push via Server-Sent Events (/api/events/stream)
+- Cotações novas (quote_store), linhas novas de fact_mercado/fact_clima
+  (ingestão) e invalidações de cache, no lugar do polling do frontend
+- Um asyncio.Queue limitado por conexão: publicar é O(assinantes) sem I/O e
+  conexões ociosas custam só a fila; assinante lento que enche a fila é
+  desconectado e o EventSource reconecta com Last-Event-ID
+- Replay a partir do Last-Event-ID com um buffer circular dos últimos eventos;
+  id mais antigo que o buffer recebe um evento "reset" (recarregar tudo)
+- Heartbeat (comentário SSE) para proxies não derrubarem conexões ociosas
+- Com Redis, os eventos são retransmitidos entre workers/réplicas via pub/sub
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from .instrumentation import get_logger
+
+logger = get_logger("agrodata.events")
+
+EVENTS_REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", "1000"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))  # s
+EVENTS_RETRY_MS = 3000  # reconexão sugerida ao EventSource
+EVENTS_CHANNEL = "agrodata:events"
+
+EVENT_TYPES = {"quote", "fact_mercado", "fact_clima", "invalidate"}
+
+
+@dataclass
+class Event:
+    id: int
+    type: str
+    data: Dict[str, Any]
+    origin: str = ""
+
+    def encode(self) -> str:
+        payload = json.dumps(self.data, ensure_ascii=False, separators=(",", ":"))
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+@dataclass(eq=False)
+class Subscriber:
+    queue: asyncio.Queue
+    types: Optional[Set[str]] = None
+    overflowed: bool = False
+
+    def wants(self, event: Event) -> bool:
+        return self.types is None or event.type in self.types or event.type == "reset"
+
+
+class RedisRelay:
+    """Pub/sub entre processos; a escuta roda numa thread (redis-py síncrono)"""
+
+    def __init__(self, client, channel: str = EVENTS_CHANNEL):
+        self.client = client
+        self.channel = channel
+        self._pubsub = None
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, event: Event) -> None:
+        try:
+            self.client.publish(self.channel, json.dumps({"id": event.id, "type": event.type, "data": event.data, "origin": event.origin}))
+        except Exception as e:
+            logger.warning("event relay publish failed: %s", e)
+
+    def start(self, loop: asyncio.AbstractEventLoop, deliver) -> None:
+        if self._thread is not None:
+            return
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.channel)
+
+        def listen():
+            try:
+                for message in self._pubsub.listen():
+                    try:
+                        event = Event(**json.loads(message["data"]))
+                    except (TypeError, ValueError):
+                        continue
+                    loop.call_soon_threadsafe(deliver, event)
+            except Exception as e:
+                logger.warning("event relay stopped: %s", e)
+
+        self._thread = threading.Thread(target=listen, name="events-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            except Exception:
+                pass
+        self._pubsub = None
+        self._thread = None
+
+
+class EventBroker:
+    def __init__(
+        self,
+        replay_size: int = EVENTS_REPLAY_SIZE,
+        queue_size: int = EVENTS_QUEUE_SIZE,
+        heartbeat: float = EVENTS_HEARTBEAT,
+        relay: Optional[RedisRelay] = None,
+    ):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.relay = relay
+        self.origin = uuid.uuid4().hex[:12]
+        self._buffer: deque = deque(maxlen=replay_size)
+        self._subscribers: Set[Subscriber] = set()
+        self._last_id = 0
+        self._evicted_id = 0  # maior id que já saiu do buffer
+        self.published = 0
+        self.disconnected = 0
+
+    def _next_id(self) -> int:
+        # Microssegundos desde a época: crescente e comparável entre workers
+        self._last_id = max(time.time_ns() // 1000, self._last_id + 1)
+        return self._last_id
+
+    # ============ Publicação ============
+    def publish(self, type: str, data: Dict[str, Any]) -> Event:
+        """Entrega aos assinantes locais e ao relay (chamar no event loop)"""
+        event = Event(self._next_id(), type, data, self.origin)
+        self._deliver(event)
+        if self.relay is not None:
+            self.relay.publish(event)
+        return event
+
+    def _deliver(self, event: Event) -> None:
+        self._last_id = max(self._last_id, event.id)
+        if len(self._buffer) == self._buffer.maxlen:
+            self._evicted_id = max(self._evicted_id, self._buffer[0].id)
+        self._buffer.append(event)
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            if subscriber.overflowed or not subscriber.wants(event):
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Fila cheia: encerra a conexão; a reconexão faz replay pelo Last-Event-ID
+                subscriber.overflowed = True
+                self.disconnected += 1
+
+    def _deliver_remote(self, event: Event) -> None:
+        if event.origin != self.origin:
+            self._deliver(event)
+
+    def start(self) -> None:
+        if self.relay is not None:
+            self.relay.start(asyncio.get_running_loop(), self._deliver_remote)
+
+    def stop(self) -> None:
+        if self.relay is not None:
+            self.relay.stop()
+
+    # ============ Assinatura ============
+    def replay(self, last_event_id: Optional[int], types: Optional[Set[str]] = None) -> Optional[List[Event]]:
+        """Eventos depois de last_event_id; None se ele já saiu do buffer"""
+        if last_event_id is None:
+            return []
+        if last_event_id < self._evicted_id:
+            return None
+        return sorted(
+            (e for e in self._buffer if e.id > last_event_id and (types is None or e.type in types)),
+            key=lambda e: e.id,
+        )
+
+    async def stream(
+        self,
+        last_event_id: Optional[int] = None,
+        types: Optional[Iterable[str]] = None,
+    ) -> AsyncIterator[str]:
+        """Gera o corpo SSE de uma conexão: replay, eventos ao vivo e heartbeats"""
+        types = set(types) if types else None
+        subscriber = Subscriber(asyncio.Queue(maxsize=self.queue_size), types)
+        # Assina antes do replay: nada publicado no meio se perde (duplicados são filtrados pelo id)
+        self._subscribers.add(subscriber)
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n"
+            sent = last_event_id or 0
+            backlog = self.replay(last_event_id, types)
+            if backlog is None:
+                yield Event(self._last_id, "reset", {"reason": "last-event-id fora do buffer"}).encode()
+                backlog = []
+            for event in backlog:
+                sent = event.id
+                yield event.encode()
+
+            # Transbordou: entrega o que já está na fila e encerra
+            while not (subscriber.overflowed and subscriber.queue.empty()):
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event.id <= sent:
+                    continue
+                sent = event.id
+                yield event.encode()
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "buffered": len(self._buffer),
+            "last_event_id": self._last_id or None,
+            "published": self.published,
+            "disconnected_slow": self.disconnected,
+            "relay": "redis" if self.relay is not None else None,
+        }
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
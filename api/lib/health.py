@@ -0,0 +1,149 @@
+"""
+Health checks com probes de dependências em cache
+Os probes rodam em background; /api/health/ready só lê o último snapshot,
+então o polling do load balancer não gera queries no Supabase.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .instrumentation import get_logger
+
+logger = get_logger("agrodata.health")
+
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "15"))  # seconds
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))  # seconds
+
+# Status possíveis de um probe
+STATUS_OK = "ok"
+STATUS_DEGRADED = "degraded"
+STATUS_ERROR = "error"
+STATUS_NOT_CONFIGURED = "not_configured"
+
+Probe = Callable[[], Dict[str, Any]]
+
+
+class HealthMonitor:
+    """Executa probes registrados em intervalo fixo e guarda o último resultado"""
+
+    def __init__(self, interval: float = HEALTH_PROBE_INTERVAL, timeout: float = HEALTH_PROBE_TIMEOUT):
+        self.interval = interval
+        self.timeout = timeout
+        self._probes: Dict[str, Tuple[Probe, bool, bool]] = {}
+        self._snapshot: Dict[str, Dict[str, Any]] = {}
+        self._refreshed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Optional[asyncio.Task] = None
+
+    def register(self, name: str, probe: Probe, critical: bool = True, blocking: bool = True) -> None:
+        """
+        Registra um probe.
+        - critical: um probe crítico com status "error" marca a API como not ready
+        - blocking: probes que fazem I/O síncrono rodam em thread
+        O probe retorna um dict com "status" (e campos extras) ou levanta exceção.
+        """
+        self._probes[name] = (probe, critical, blocking)
+
+    async def _run_probe(self, name: str, probe: Probe, blocking: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            if blocking:
+                result = await asyncio.wait_for(asyncio.to_thread(probe), timeout=self.timeout)
+            else:
+                result = probe()
+            result = dict(result or {})
+            result.setdefault("status", STATUS_OK)
+        except asyncio.TimeoutError:
+            result = {"status": STATUS_ERROR, "error": f"timeout after {self.timeout}s"}
+        except Exception as e:
+            result = {"status": STATUS_ERROR, "error": str(e)}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        result["checked_at"] = datetime.utcnow().isoformat()
+        return result
+
+    async def _refresh(self) -> None:
+        names = list(self._probes)
+        results = await asyncio.gather(
+            *(self._run_probe(name, self._probes[name][0], self._probes[name][2]) for name in names)
+        )
+        self._snapshot = dict(zip(names, results))
+        self._refreshed_at = time.time()
+
+    async def refresh(self) -> None:
+        """Atualiza o snapshot (chamadas concorrentes compartilham a mesma execução)"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._refresh())
+        await asyncio.shield(self._refreshing)
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("health refresh failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Inicia o loop de refresh em background (idempotente)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def is_stale(self) -> bool:
+        """Snapshot ausente ou mais velho que 3 intervalos (loop parado, ex.: serverless)"""
+        if self._refreshed_at is None:
+            return True
+        return time.time() - self._refreshed_at > self.interval * 3
+
+    def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        """Retorna (ready, payload) a partir do último snapshot, sem executar probes"""
+        ready = self._refreshed_at is not None and all(
+            self._snapshot.get(name, {}).get("status") != STATUS_ERROR
+            for name, (_, critical, _) in self._probes.items()
+            if critical
+        )
+        payload = {
+            "status": "ready" if ready else "not_ready",
+            "checks": self._snapshot,
+            "refreshed_at": datetime.utcfromtimestamp(self._refreshed_at).isoformat() if self._refreshed_at else None,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        return ready, payload
+
+    def check(self, name: str) -> Dict[str, Any]:
+        """Último resultado de um probe específico"""
+        return self._snapshot.get(name, {})
+
+
+def threadpool_probe() -> Dict[str, Any]:
+    """
+    Saturação do threadpool do AnyIO (usado pelo FastAPI para código síncrono).
+    Precisa rodar dentro do event loop (blocking=False). Pool cheio é sinal de
+    carga, não de dependência fora: degraded, nunca error (não tira a réplica do LB).
+    """
+    from anyio.to_thread import current_default_thread_limiter
+
+    limiter = current_default_thread_limiter()
+    total = limiter.total_tokens
+    in_use = limiter.borrowed_tokens
+    saturation = in_use / total if total else 0.0
+
+    probe_status = STATUS_DEGRADED if saturation >= 0.8 else STATUS_OK
+    return {
+        "status": probe_status,
+        "in_use": in_use,
+        "total": total,
+        "saturation": round(saturation, 3),
+        "saturated": in_use >= total,
+    }
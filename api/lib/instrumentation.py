@@ -0,0 +1,134 @@
+"""
+Instrumentação leve do hot path
+- Timings por etapa do request (auth, supabase, dataframe, compute, serialize)
+- Header Server-Timing e log estruturado em JSON
+- Sampling via INSTRUMENTATION_SAMPLE_RATE e nível via LOG_LEVEL
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+SAMPLE_RATE = float(os.getenv("INSTRUMENTATION_SAMPLE_RATE", "1.0"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+# Atributos padrão de LogRecord (tudo que não estiver aqui vira campo do JSON)
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada log como uma linha JSON (agregável)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.utcfromtimestamp(record.created).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+_configured = False
+
+
+def get_logger(name: str = "agrodata") -> logging.Logger:
+    """Logger JSON em stdout, configurado uma única vez"""
+    global _configured
+    root = logging.getLogger("agrodata")
+    if not _configured:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        root.addHandler(handler)
+        root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        root.propagate = False
+        _configured = True
+    return logging.getLogger(name)
+
+
+class RequestTimings:
+    """Acumula a duração (ms) de cada etapa de um request"""
+
+    __slots__ = ("stages", "started", "sampled")
+
+    def __init__(self, sampled: bool = True):
+        self.stages: Dict[str, float] = {}
+        self.started = time.perf_counter()
+        self.sampled = sampled
+
+    def add(self, name: str, duration_ms: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + duration_ms
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request() -> contextvars.Token:
+    """Abre o contexto de timings do request atual (respeitando o sampling)"""
+    sampled = SAMPLE_RATE >= 1.0 or random.random() < SAMPLE_RATE
+    return _current.set(RequestTimings(sampled=sampled))
+
+
+def end_request(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mede uma etapa do request; sem request ativo é um no-op"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - started) * 1000)
+
+
+def log_request(logger: logging.Logger, method: str, path: str, status_code: int, timings: RequestTimings) -> None:
+    """Emite a linha de log do request (amostrada; requests lentos sempre logados)"""
+    total_ms = timings.total_ms()
+    slow = total_ms >= SLOW_REQUEST_MS
+    if not (timings.sampled or slow):
+        return
+    level = logging.WARNING if slow else logging.INFO
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(
+        level,
+        "request",
+        extra={
+            "method": method,
+            "path": path,
+            "status": status_code,
+            "duration_ms": round(total_ms, 2),
+            "stages": {name: round(ms, 2) for name, ms in timings.stages.items()},
+        },
+    )
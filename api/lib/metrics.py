@@ -0,0 +1,336 @@
+"""
+Métricas em processo no formato texto do Prometheus
+- Counter, Gauge e Histogram com labels, sem dependências externas
+- Multiprocess (gunicorn): com PROMETHEUS_MULTIPROC_DIR definido, cada worker
+  grava seu estado em <dir>/metrics_<pid>.json e o scrape agrega todos os arquivos.
+  O master limpa o diretório ao subir (on_starting em api/gunicorn.conf.py):
+  arquivos de execuções anteriores somariam contadores velhos e um PID reutilizado
+  herdaria o estado de outro processo.
+"""
+
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+METRICS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))  # seconds
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {json.dumps(list(k)): v if not isinstance(v, list) else list(v) for k, v in self._values.items()}
+
+
+class Counter(_Metric):
+    """Contador monotônico (somado entre workers)"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """
+    Valor instantâneo. multiprocess_mode define a agregação entre workers:
+    "sum", "max" ou "liveall" (soma apenas workers vivos).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), multiprocess_mode: str = "liveall"):
+        super().__init__(name, documentation, labelnames)
+        self.multiprocess_mode = multiprocess_mode
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Histograma com buckets fixos; valor interno = [contagem por bucket..., sum, count]"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def clear_multiproc_dir(directory: Optional[str] = METRICS_MULTIPROC_DIR) -> int:
+    """Remove os estados de workers de execuções anteriores; retorna quantos arquivos apagou"""
+    if not directory or not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for filename in os.listdir(directory):
+        if filename.startswith("metrics_") and filename.endswith((".json", ".json.tmp")):
+            try:
+                os.remove(os.path.join(directory, filename))
+                removed += 1
+            except FileNotFoundError:
+                continue
+    return removed
+
+
+class MetricsRegistry:
+    """Registro de métricas do processo + agregação multiprocess"""
+
+    def __init__(self, multiproc_dir: Optional[str] = METRICS_MULTIPROC_DIR, pid: Optional[int] = None):
+        self.multiproc_dir = multiproc_dir
+        self._pid = pid
+        self._metrics: List[_Metric] = []
+        self._flusher: Optional[threading.Thread] = None
+
+    @property
+    def pid(self) -> int:
+        # Lido a cada uso: o registry é criado no import, e o master do gunicorn
+        # pode importar antes do fork (cada worker precisa do próprio arquivo)
+        return self._pid or os.getpid()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), multiprocess_mode: str = "liveall") -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames, multiprocess_mode))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    # ---------- multiprocess ----------
+    def _state_path(self, pid: int) -> str:
+        return os.path.join(self.multiproc_dir, f"metrics_{pid}.json")
+
+    def flush(self) -> None:
+        """Grava o estado deste worker (escrita atômica via rename)"""
+        if not self.multiproc_dir:
+            return
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        state = {metric.name: metric.snapshot() for metric in self._metrics}
+        path = self._state_path(self.pid)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def start_flusher(self) -> None:
+        """Thread que grava o estado periodicamente (idempotente)"""
+        if not self.multiproc_dir or (self._flusher and self._flusher.is_alive()):
+            return
+
+        def loop():
+            while True:
+                time.sleep(METRICS_FLUSH_INTERVAL)
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+
+        self._flusher = threading.Thread(target=loop, name="metrics-flusher", daemon=True)
+        self._flusher.start()
+
+    def _load_states(self) -> List[Tuple[int, Dict[str, Dict[str, object]]]]:
+        states = [(self.pid, {metric.name: metric.snapshot() for metric in self._metrics})]
+        if not self.multiproc_dir or not os.path.isdir(self.multiproc_dir):
+            return states
+        for filename in os.listdir(self.multiproc_dir):
+            if not (filename.startswith("metrics_") and filename.endswith(".json")):
+                continue
+            try:
+                pid = int(filename[len("metrics_"):-len(".json")])
+            except ValueError:
+                continue
+            if pid == self.pid:
+                continue
+            try:
+                with open(os.path.join(self.multiproc_dir, filename)) as f:
+                    states.append((pid, json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return states
+
+    @staticmethod
+    def _is_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    def _aggregate(self, metric: _Metric, states) -> Dict[LabelValues, object]:
+        merged: Dict[LabelValues, object] = {}
+        for pid, state in states:
+            values = state.get(metric.name, {})
+            if isinstance(metric, Gauge) and metric.multiprocess_mode == "liveall" and pid != self.pid and not self._is_alive(pid):
+                continue
+            for raw_key, value in values.items():
+                key = tuple(json.loads(raw_key))
+                current = merged.get(key)
+                if isinstance(metric, Histogram):
+                    merged[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+                elif isinstance(metric, Gauge) and metric.multiprocess_mode == "max":
+                    merged[key] = value if current is None else max(current, value)
+                else:
+                    merged[key] = value if current is None else current + value
+        return merged
+
+    def render(self) -> str:
+        """Exposição no formato texto do Prometheus (0.0.4)"""
+        states = self._load_states()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for key, value in sorted(self._aggregate(metric, states).items()):
+                if isinstance(metric, Histogram):
+                    cumulative = 0.0
+                    for bound, count in zip(metric.buckets, value[:-2]):
+                        cumulative += count
+                        le = ("le", "+Inf" if math.isinf(bound) else repr(float(bound)))
+                        lines.append(f"{metric.name}_bucket{_format_labels(metric.labelnames, key, le)} {_format_value(cumulative)}")
+                    labels = _format_labels(metric.labelnames, key)
+                    lines.append(f"{metric.name}_sum{labels} {_format_value(value[-2])}")
+                    lines.append(f"{metric.name}_count{labels} {_format_value(value[-1])}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# ============================================
+# MÉTRICAS DA API
+# ============================================
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "Total de requests HTTP", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "Latência dos requests HTTP", ("method", "route")
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests em andamento", multiprocess_mode="liveall"
+)
+rate_limit_rejections_total = registry.counter(
+    "rate_limit_rejections_total", "Requests rejeitados pelo rate limit", ("backend",)
+)
+supabase_query_duration_seconds = registry.histogram(
+    "supabase_query_duration_seconds", "Duração das queries no Supabase", ("table",)
+)
+supabase_rows_fetched = registry.histogram(
+    "supabase_rows_fetched", "Linhas retornadas por query, por endpoint", ("table", "route"), buckets=ROW_BUCKETS
+)
+cache_requests_total = registry.counter(
+    "cache_requests_total", "Leituras de cache por resultado (hit/miss)", ("cache", "result")
+)
+
+# Linhas buscadas no request atual (o route só é conhecido depois do roteamento)
+_request_rows: contextvars.ContextVar[Optional[List[Tuple[str, int]]]] = contextvars.ContextVar("request_rows", default=None)
+
+
+def start_request_rows() -> contextvars.Token:
+    return _request_rows.set([])
+
+
+def finish_request_rows(token: contextvars.Token, route: str) -> None:
+    rows = _request_rows.get()
+    _request_rows.reset(token)
+    for table, count in rows or ():
+        supabase_rows_fetched.observe(count, table=table, route=route)
+
+
+@contextmanager
+def observe_query(table: str) -> Iterator[None]:
+    """Mede a duração de uma query no Supabase"""
+    with supabase_query_duration_seconds.time(table=table):
+        yield
+
+
+def record_rows(table: str, count: int) -> None:
+    """Registra as linhas buscadas (associadas ao route ao final do request)"""
+    rows = _request_rows.get()
+    if rows is None:
+        supabase_rows_fetched.observe(count, table=table, route="background")
+    else:
+        rows.append((table, count))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    cache_requests_total.inc(cache=cache, result="hit" if hit else "miss")
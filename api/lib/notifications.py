@@ -0,0 +1,170 @@
+"""
+Central de notificações servida pela API (/api/notifications)
+- Paginação por keyset (created_at desc, id desc) com cursor opaco: cada
+  página é um range scan no índice, sem OFFSET crescendo com o histórico
+- Contador de não lidas por usuário em cache (memória ou Redis, TTL curto);
+  marcar como lida/excluir ajusta o valor em cache em vez de recontar
+- Marcar como lidas em lote: uma única instrução (id in (...)) por chamada
+- Notificações globais (user_id nulo) aparecem na lista, mas não têm estado
+  de leitura por usuário e não entram no contador
+"""
+
+import base64
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from postgrest.types import CountMethod
+
+from .instrumentation import get_logger
+
+logger = get_logger("agrodata.notifications")
+
+NOTIFICATIONS_PAGE_MAX = 100
+NOTIFICATIONS_BULK_MAX = 500  # ids por chamada de marcar como lida
+UNREAD_CACHE_TTL = float(os.getenv("UNREAD_CACHE_TTL", "30"))  # s; alertas da ingestão entram sem passar pela API
+UNREAD_PREFIX = "agrodata:notifications:unread:"
+
+COLUMNS = "id, user_id, title, body, created_at, is_read, category, level"
+
+
+# ============ Cursor ============
+def encode_cursor(row: Dict[str, Any]) -> str:
+    raw = f"{row['created_at']}|{row['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """ValueError se o cursor não veio de encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        # Vai para o filtro do PostgREST: só timestamp válido (senão 400, não erro do banco)
+        datetime.fromisoformat(created_at)
+        return created_at, int(row_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+
+# ============ Contador de não lidas ============
+class UnreadCounter:
+    """Cache do total de não lidas por usuário (Redis compartilha entre réplicas)"""
+
+    def __init__(self, redis=None, ttl: float = UNREAD_CACHE_TTL):
+        self.redis = redis
+        self.ttl = ttl
+        self._local: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[int]:
+        if self.redis is not None:
+            try:
+                value = self.redis.get(UNREAD_PREFIX + user_id)
+                return int(value) if value is not None else None
+            except Exception as e:
+                logger.warning("unread counter redis read failed: %s", e)
+                return None
+        with self._lock:
+            cached = self._local.get(user_id)
+            if cached is None or cached[1] < time.monotonic():
+                self._local.pop(user_id, None)
+                return None
+            return cached[0]
+
+    def set(self, user_id: str, count: int) -> None:
+        if self.redis is not None:
+            try:
+                self.redis.set(UNREAD_PREFIX + user_id, count, ex=max(1, int(self.ttl)))
+            except Exception as e:
+                logger.warning("unread counter redis write failed: %s", e)
+            return
+        with self._lock:
+            self._local[user_id] = (count, time.monotonic() + self.ttl)
+
+    def adjust(self, user_id: str, delta: int) -> Optional[int]:
+        """Aplica delta ao valor em cache (se houver); sem cache, a próxima leitura reconta"""
+        if self.redis is not None:
+            try:
+                key = UNREAD_PREFIX + user_id
+                if self.redis.get(key) is None:
+                    return None
+                value = max(0, int(self.redis.incrby(key, delta)))
+                self.redis.set(key, value, ex=max(1, int(self.ttl)))
+                return value
+            except Exception as e:
+                logger.warning("unread counter redis update failed: %s", e)
+                self.invalidate([user_id])
+                return None
+        with self._lock:
+            cached = self._local.get(user_id)
+            if cached is None or cached[1] < time.monotonic():
+                return None
+            value = max(0, cached[0] + delta)
+            self._local[user_id] = (value, cached[1])
+            return value
+
+    def invalidate(self, user_ids: Optional[Iterable[str]] = None) -> None:
+        """user_ids=None: todos (ex.: alertas gravados em lote pela ingestão)"""
+        if self.redis is not None:
+            try:
+                keys = [UNREAD_PREFIX + u for u in user_ids] if user_ids is not None else list(self.redis.scan_iter(UNREAD_PREFIX + "*"))
+                if keys:
+                    self.redis.delete(*keys)
+            except Exception as e:
+                logger.warning("unread counter redis invalidate failed: %s", e)
+            return
+        with self._lock:
+            if user_ids is None:
+                self._local.clear()
+            for user_id in user_ids or []:
+                self._local.pop(user_id, None)
+
+
+# ============ Supabase ============
+def fetch_page(
+    client,
+    user_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    unread_only: bool = False,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Uma página (mais recentes primeiro) e o cursor da próxima (None no fim)"""
+    limit = max(1, min(limit, NOTIFICATIONS_PAGE_MAX))
+    query = client.table("notifications").select(COLUMNS)
+    if unread_only:
+        query = query.eq("user_id", user_id).eq("is_read", "false")
+    else:
+        query = query.or_(f"user_id.eq.{user_id},user_id.is.null")
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # (created_at, id) < cursor; aspas porque o timestamp tem ':' e '+'
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})')
+    # Uma linha a mais só para saber se existe próxima página
+    rows = query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute().data or []
+    page = rows[:limit]
+    return page, encode_cursor(page[-1]) if len(rows) > limit else None
+
+
+def count_unread(client, user_id: str) -> int:
+    resp = client.table("notifications").select("id", count=CountMethod.exact) \
+        .eq("user_id", user_id).eq("is_read", "false").limit(1).execute()
+    return int(resp.count or 0)
+
+
+def mark_read(client, user_id: str, ids: Optional[List[int]] = None) -> int:
+    """Marca ids (ou todas, com ids=None) como lidas numa instrução; retorna quantas mudaram"""
+    # Sem return=minimal: o postgrest-py só lê o Content-Range quando há corpo JSON
+    query = client.table("notifications").update({"is_read": True}) \
+        .eq("user_id", user_id).eq("is_read", "false")
+    if ids is not None:
+        query = query.in_("id", ids)
+    return len(query.execute().data or [])
+
+
+def delete_notification(client, user_id: str, notification_id: int) -> Optional[Dict[str, Any]]:
+    """Linha excluída (para ajustar o contador) ou None se não existe/é de outro usuário"""
+    rows = client.table("notifications").delete() \
+        .eq("id", notification_id).eq("user_id", user_id).execute().data or []
+    return rows[0] if rows else None
@@ -0,0 +1,112 @@
+"""
+Profiler opt-in para requests lentos (cProfile)
+- Ativado por ?profile=1 (somente admin) ou por amostragem via PROFILE_SAMPLE_RATE
+- Guarda os top frames em um ring buffer limitado, lido por /api/admin/profiles
+
+Obs.: o cProfile mede a thread do event loop inteira enquanto está ativo, então
+requests concorrentes podem aparecer no mesmo perfil. Só um perfil roda por vez.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MAX_ENTRIES = int(os.getenv("PROFILE_MAX_ENTRIES", "20"))
+PROFILE_TOP_FRAMES = int(os.getenv("PROFILE_TOP_FRAMES", "30"))
+PROFILE_MAX_BYTES = int(os.getenv("PROFILE_MAX_BYTES", "65536"))
+
+
+def should_sample(rate: float = PROFILE_SAMPLE_RATE) -> bool:
+    return rate > 0 and random.random() < rate
+
+
+class RequestProfiler:
+    """Context manager que perfila o bloco; um único perfil ativo por processo"""
+
+    _active = threading.Lock()
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.enabled = False
+        self.started = 0.0
+        self.duration_ms = 0.0
+
+    def __enter__(self) -> "RequestProfiler":
+        # Se outro perfil estiver rodando, o request segue sem profiling
+        self.enabled = self._active.acquire(blocking=False)
+        self.started = time.perf_counter()
+        if self.enabled:
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        if self.enabled:
+            self.profile.disable()
+            self._active.release()
+
+    def top_frames(self, limit: int = PROFILE_TOP_FRAMES, sort: str = "cumulative") -> List[Dict[str, Any]]:
+        """Top frames por tempo acumulado (ms)"""
+        if not self.enabled:
+            return []
+        stats = pstats.Stats(self.profile)
+        stats.sort_stats(sort)
+        frames = []
+        for func in stats.fcn_list[:limit]:
+            filename, line, name = func
+            primitive_calls, total_calls, tottime, cumtime, _ = stats.stats[func]
+            frames.append({
+                "function": f"{os.path.basename(filename)}:{line}({name})",
+                "calls": total_calls,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3),
+            })
+        return frames
+
+
+class ProfileStore:
+    """Ring buffer de perfis, cada um limitado a PROFILE_MAX_BYTES"""
+
+    def __init__(self, max_entries: int = PROFILE_MAX_ENTRIES, max_bytes: int = PROFILE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def add(self, entry: Dict[str, Any]) -> str:
+        entry = dict(entry)
+        entry.setdefault("id", uuid.uuid4().hex[:12])
+        entry.setdefault("created_at", datetime.utcnow().isoformat())
+        frames = list(entry.get("top_frames", []))
+        # Remove frames do fim até caber no limite
+        while frames and len(json.dumps({**entry, "top_frames": frames}, default=str)) > self.max_bytes:
+            frames.pop()
+        entry["top_frames"] = frames
+        with self._lock:
+            self._entries.append(entry)
+        return entry["id"]
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Resumo dos perfis (mais recentes primeiro), sem os frames"""
+        with self._lock:
+            entries = list(self._entries)
+        return [{k: v for k, v in e.items() if k != "top_frames"} for e in reversed(entries)]
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for entry in self._entries:
+                if entry["id"] == profile_id:
+                    return entry
+        return None
+
+
+# Instância global
+profile_store = ProfileStore()
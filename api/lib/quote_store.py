@@ -0,0 +1,386 @@
+"""
+Store de cotações em tempo real (/api/realtime/*)
+- Dólar (PTAX), JBSS3 (Brapi) e clima atual (Open-Meteo) das mesmas fontes
+  do data_fetcher; boi gordo vem do último valor gravado pelo IMEA no warehouse
+- Refresher em background mantém cada fonte dentro do seu TTL; os endpoints
+  só leem da memória (ou do Redis, com cópia local de 1s, em várias réplicas)
+- Cada fonte tem timestamp de atualização e último erro; falha mantém o valor
+  anterior (marcado como stale)
+- Refresh deduplicado: uma execução por fonte por vez no processo e, com
+  Redis, um lock SET NX entre réplicas
+- Leitura de uma entrada vencida dispara refresh em background
+  (stale-while-revalidate), o que cobre serverless sem o loop rodando
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+from .health import STATUS_DEGRADED, STATUS_OK
+from .instrumentation import get_logger
+
+logger = get_logger("agrodata.quotes")
+
+QUOTE_REFRESH_INTERVAL = float(os.getenv("QUOTE_REFRESH_INTERVAL", "30"))  # tick do loop (s)
+QUOTE_FETCH_TIMEOUT = float(os.getenv("QUOTE_FETCH_TIMEOUT", "10"))
+QUOTE_LOCAL_TTL = 1.0  # cópia local das entradas lidas do Redis (s)
+QUOTE_IDLE_EXPIRY = 60 * 60  # coordenadas de clima sem leitura há 1h saem do refresh
+MAX_WEATHER_KEYS = 100
+REDIS_PREFIX = "agrodata:quotes:"
+
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+BRAPI_URL = "https://brapi.dev/api/quote/{ticker}"
+PTAX_URL = "https://olinda.bcb.gov.br/olinda/servico/PTAX/versao/v1/odata/CotacaoDolarPeriodo(dataInicial=@dataInicial,dataFinalCotacao=@dataFinalCotacao)"
+DEFAULT_LAT, DEFAULT_LON = -15.6014, -56.0979  # Cuiabá
+
+# TTL por fonte (s): PTAX tem boletins ao longo do dia; Brapi atrasa ~15 min
+MARKET_TTL = {"dolar": 15 * 60, "jbs": 5 * 60, "boi_gordo": 60 * 60}
+WEATHER_TTL = 15 * 60
+
+WMO_CONDITIONS = [
+    (0, "Céu limpo"), (3, "Parcialmente nublado"), (48, "Nublado/neblina"),
+    (67, "Chuva"), (77, "Neve"), (82, "Pancadas de chuva"), (99, "Tempestade"),
+]
+
+Fetcher = Callable[[httpx.AsyncClient], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class QuoteEntry:
+    key: str
+    value: Optional[Dict[str, Any]]
+    updated_at: Optional[float]  # último sucesso (epoch)
+    ttl: float
+    error: Optional[str] = None
+    error_at: Optional[float] = None
+    fetch_ms: Optional[float] = None
+
+    def age(self, now: Optional[float] = None) -> Optional[float]:
+        return None if self.updated_at is None else (now or time.time()) - self.updated_at
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        age = self.age(now)
+        return age is None or age >= self.ttl
+
+    def freshness(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            "updated_at": datetime.utcfromtimestamp(self.updated_at).isoformat() if self.updated_at else None,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "stale": self.is_stale(),
+            "error": self.error,
+        }
+
+
+# ============ Backends ============
+class MemoryBackend:
+    """Um processo: dict em memória, sem lock entre réplicas"""
+
+    def __init__(self):
+        self._entries: Dict[str, QuoteEntry] = {}
+
+    def get(self, key: str) -> Optional[QuoteEntry]:
+        return self._entries.get(key)
+
+    def set(self, entry: QuoteEntry) -> None:
+        self._entries[entry.key] = entry
+
+    def acquire(self, key: str, ttl: float) -> bool:
+        return True
+
+    def release(self, key: str) -> None:
+        pass
+
+
+class RedisBackend:
+    """Várias réplicas: entradas em JSON no Redis + lock de refresh (SET NX EX)"""
+
+    def __init__(self, client):
+        self.client = client
+        self._local: Dict[str, tuple] = {}
+
+    def get(self, key: str) -> Optional[QuoteEntry]:
+        cached = self._local.get(key)
+        if cached and time.monotonic() - cached[0] < QUOTE_LOCAL_TTL:
+            return cached[1]
+        try:
+            raw = self.client.get(REDIS_PREFIX + key)
+        except Exception as e:
+            logger.warning("quote store redis read failed: %s", e)
+            return cached[1] if cached else None
+        entry = QuoteEntry(**json.loads(raw)) if raw else None
+        self._local[key] = (time.monotonic(), entry)
+        return entry
+
+    def set(self, entry: QuoteEntry) -> None:
+        self._local[entry.key] = (time.monotonic(), entry)
+        try:
+            self.client.set(REDIS_PREFIX + entry.key, json.dumps(asdict(entry)), ex=int(entry.ttl * 24))
+        except Exception as e:
+            logger.warning("quote store redis write failed: %s", e)
+
+    def acquire(self, key: str, ttl: float) -> bool:
+        try:
+            return bool(self.client.set(f"{REDIS_PREFIX}lock:{key}", "1", nx=True, ex=max(1, int(ttl))))
+        except Exception:
+            return True  # Redis fora: cada réplica busca por conta própria
+
+    def release(self, key: str) -> None:
+        try:
+            self.client.delete(f"{REDIS_PREFIX}lock:{key}")
+        except Exception:
+            pass
+
+
+# ============ Fontes ============
+async def fetch_dollar(client: httpx.AsyncClient) -> Dict[str, Any]:
+    """Última cotação de compra da PTAX (boletins intermediários + fechamento)"""
+    end = datetime.now()
+    params = {
+        "@dataInicial": f"'{(end - timedelta(days=7)).strftime('%m-%d-%Y')}'",
+        "@dataFinalCotacao": f"'{end.strftime('%m-%d-%Y')}'",
+        "$format": "json",
+        "$select": "cotacaoCompra,dataHoraCotacao",
+    }
+    response = await client.get(PTAX_URL, params=params)
+    response.raise_for_status()
+    values = response.json().get("value") or []
+    if not values:
+        raise ValueError("PTAX sem cotações nos últimos 7 dias")
+    latest = max(values, key=lambda item: item["dataHoraCotacao"])
+    return {"value": round(float(latest["cotacaoCompra"]), 4), "as_of": latest["dataHoraCotacao"], "source": "PTAX/BCB"}
+
+
+async def fetch_stock(client: httpx.AsyncClient, ticker: str = "JBSS3") -> Dict[str, Any]:
+    params = {}
+    if os.getenv("BRAPI_API_TOKEN"):
+        params["token"] = os.getenv("BRAPI_API_TOKEN")
+    response = await client.get(BRAPI_URL.format(ticker=ticker), params=params)
+    response.raise_for_status()
+    results = response.json().get("results") or []
+    if not results or results[0].get("regularMarketPrice") is None:
+        raise ValueError(f"Brapi sem preço para {ticker}")
+    return {
+        "value": round(float(results[0]["regularMarketPrice"]), 2),
+        "as_of": results[0].get("regularMarketTime"),
+        "source": "Brapi",
+    }
+
+
+def weather_condition(code: Optional[int]) -> Optional[str]:
+    if code is None:
+        return None
+    return next((label for limit, label in WMO_CONDITIONS if code <= limit), WMO_CONDITIONS[-1][1])
+
+
+async def fetch_weather(client: httpx.AsyncClient, lat: float = DEFAULT_LAT, lon: float = DEFAULT_LON) -> Dict[str, Any]:
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "current": "temperature_2m,relative_humidity_2m,precipitation,weather_code,wind_speed_10m",
+        "timezone": "America/Sao_Paulo",
+    }
+    response = await client.get(WEATHER_URL, params=params)
+    response.raise_for_status()
+    current = response.json().get("current") or {}
+    if current.get("temperature_2m") is None:
+        raise ValueError("Open-Meteo sem dados atuais")
+    return {
+        "lat": lat,
+        "lon": lon,
+        "temp": current.get("temperature_2m"),
+        "humidity": current.get("relative_humidity_2m"),
+        "wind_speed": current.get("wind_speed_10m"),
+        "precipitation": current.get("precipitation"),
+        "weather_code": current.get("weather_code"),
+        "condition": weather_condition(current.get("weather_code")),
+        "time": current.get("time"),
+        "source": "Open-Meteo",
+    }
+
+
+def weather_key(lat: float, lon: float) -> str:
+    # ~1 km: coordenadas vizinhas compartilham a entrada
+    return f"weather:{lat:.2f},{lon:.2f}"
+
+
+# ============ Store ============
+class QuoteStore:
+    def __init__(
+        self,
+        backend=None,
+        interval: float = QUOTE_REFRESH_INTERVAL,
+        timeout: float = QUOTE_FETCH_TIMEOUT,
+        on_update: Optional[Callable[[QuoteEntry], None]] = None,
+    ):
+        self.backend = backend or MemoryBackend()
+        self.on_update = on_update  # chamado quando o valor de uma fonte muda (push via /api/events)
+        self.interval = interval
+        self.timeout = timeout
+        self._sources: Dict[str, tuple] = {}  # key -> (fetcher, ttl)
+        self._last_read: Dict[str, float] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self.last_refresh_ok: Optional[float] = None
+
+    def register(self, key: str, fetcher: Fetcher, ttl: float) -> None:
+        self._sources[key] = (fetcher, ttl)
+
+    def register_weather(self, lat: float, lon: float) -> str:
+        """Coordenada pedida pela API passa a ser mantida pelo refresher (até MAX_WEATHER_KEYS)"""
+        key = weather_key(lat, lon)
+        if key not in self._sources:
+            weather_keys = [k for k in self._sources if k.startswith("weather:")]
+            if len(weather_keys) >= MAX_WEATHER_KEYS:
+                oldest = min(weather_keys, key=lambda k: self._last_read.get(k, 0))
+                self._sources.pop(oldest, None)
+            self.register(key, lambda client: fetch_weather(client, round(lat, 4), round(lon, 4)), WEATHER_TTL)
+        return key
+
+    @property
+    def keys(self) -> List[str]:
+        return list(self._sources)
+
+    # ============ Leitura ============
+    def get(self, key: str) -> Optional[QuoteEntry]:
+        """Leitura da memória; entrada vencida dispara refresh em background"""
+        self._last_read[key] = time.time()
+        entry = self.backend.get(key)
+        if key in self._sources and (entry is None or entry.is_stale()):
+            self.trigger([key])
+        return entry
+
+    async def get_or_fetch(self, key: str) -> Optional[QuoteEntry]:
+        """Como get, mas a primeira leitura (store frio) espera o fetch"""
+        entry = self.get(key)
+        if entry is None or entry.value is None:
+            await self.refresh([key])
+            entry = self.backend.get(key)
+        return entry
+
+    # ============ Refresh ============
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True)
+        return self._client
+
+    async def _refresh_one(self, key: str) -> None:
+        fetcher, ttl = self._sources[key]
+        if not self.backend.acquire(key, self.timeout * 2):
+            return  # outra réplica está buscando; o valor aparece no Redis
+        previous = self.backend.get(key)
+        started = time.perf_counter()
+        try:
+            value = await asyncio.wait_for(fetcher(self._http()), timeout=self.timeout)
+            entry = QuoteEntry(key, value, time.time(), ttl, fetch_ms=round((time.perf_counter() - started) * 1000, 1))
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            logger.warning("quote refresh failed for %s: %s", key, error)
+            entry = QuoteEntry(
+                key,
+                previous.value if previous else None,
+                previous.updated_at if previous else None,
+                ttl,
+                error=error,
+                error_at=time.time(),
+            )
+        finally:
+            self.backend.release(key)
+        self.backend.set(entry)
+        if self.on_update is not None and entry.error is None and (previous is None or previous.value != entry.value):
+            try:
+                self.on_update(entry)
+            except Exception:
+                logger.exception("quote on_update failed for %s", key)
+
+    def trigger(self, keys: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """
+        Agenda o refresh sem esperar. Fonte que já está sendo buscada não
+        ganha uma segunda execução. Retorna {"scheduled", "in_flight"}.
+        """
+        scheduled, in_flight = [], []
+        for key in keys if keys is not None else self.keys:
+            if key not in self._sources:
+                continue
+            task = self._inflight.get(key)
+            if task is not None and not task.done():
+                in_flight.append(key)
+                continue
+            self._inflight[key] = asyncio.ensure_future(self._refresh_one(key))
+            scheduled.append(key)
+        return {"scheduled": scheduled, "in_flight": in_flight}
+
+    async def refresh(self, keys: Optional[Iterable[str]] = None) -> None:
+        """Refresh deduplicado esperando o término (chamadas concorrentes compartilham a execução)"""
+        keys = [key for key in (keys if keys is not None else self.keys) if key in self._sources]
+        self.trigger(keys)
+        tasks = [self._inflight[key] for key in keys if key in self._inflight]
+        if tasks:
+            await asyncio.shield(asyncio.gather(*tasks, return_exceptions=True))
+        if all((entry := self.backend.get(key)) is not None and entry.error is None for key in keys):
+            self.last_refresh_ok = time.time()
+
+    def stale_keys(self, now: Optional[float] = None) -> List[str]:
+        now = now or time.time()
+        stale = []
+        for key in self.keys:
+            if key.startswith("weather:") and now - self._last_read.get(key, now) > QUOTE_IDLE_EXPIRY:
+                self._sources.pop(key, None)  # ninguém mais lê essa coordenada
+                continue
+            entry = self.backend.get(key)
+            if entry is None or entry.is_stale(now):
+                stale.append(key)
+        return stale
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                stale = self.stale_keys()
+                if stale:
+                    await self.refresh(stale)
+            except Exception:
+                logger.exception("quote refresh loop failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Inicia o refresher em background (idempotente)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ============ Status ============
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        status = {}
+        for key in self.keys:
+            entry = self.backend.get(key)
+            status[key] = entry.freshness() if entry else {"updated_at": None, "age_seconds": None, "stale": True, "error": None}
+        return status
+
+    def probe(self) -> Dict[str, Any]:
+        """Probe do HealthMonitor (blocking=False): degraded se alguma fonte de mercado está vencida"""
+        status = self.status()
+        stale = sorted(key for key in MARKET_TTL if status.get(key, {}).get("stale", True))
+        return {
+            "status": STATUS_DEGRADED if stale else STATUS_OK,
+            "backend": "redis" if isinstance(self.backend, RedisBackend) else "memory",
+            "refresher": self._task is not None and not self._task.done(),
+            "stale": stale,
+        }
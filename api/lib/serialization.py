@@ -0,0 +1,68 @@
+"""
+Serialização JSON-safe de DataFrames
+- NaN/inf/NaT viram null (JSON não aceita NaN e o PostgREST/Starlette recusam)
+- Trabalha por coluna com numpy (máscara de np.isfinite), sem apply por célula
+  e sem converter o DataFrame inteiro para dtype object
+- Usado pela API (respostas) e pelo data_fetcher (payloads de upsert)
+"""
+
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def json_float(value: Any) -> Optional[float]:
+    """Escalar para float JSON-safe: None/NaN/inf/inválido -> None"""
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def column_values(series: pd.Series, date_format: str = DATE_FORMAT) -> List[Any]:
+    """Valores da coluna como tipos Python nativos, com nulos/não finitos -> None"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.dt.strftime(date_format).tolist()
+        mask = series.isna().to_numpy()
+    elif pd.api.types.is_bool_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+        return series.tolist()
+    elif pd.api.types.is_float_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+        array = series.to_numpy()
+        values = array.tolist()
+        mask = ~np.isfinite(array)
+    elif pd.api.types.is_integer_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+        return series.tolist()
+    else:
+        # object / nullable (Int64, Float64, string): inf só pode aparecer como float solto
+        values = series.tolist()
+        mask = series.isna().to_numpy()
+        if series.dtype == object:
+            mask |= np.fromiter(
+                (isinstance(v, float) and math.isinf(v) for v in values), dtype=bool, count=len(values)
+            )
+        elif pd.api.types.is_float_dtype(series):
+            mask |= np.isinf(series.to_numpy(dtype="float64", na_value=np.nan))
+
+    for index in np.flatnonzero(mask):
+        values[index] = None
+    return values
+
+
+def frame_to_records(
+    df: pd.DataFrame,
+    columns: Optional[Iterable[str]] = None,
+    date_format: str = DATE_FORMAT,
+) -> List[Dict[str, Any]]:
+    """Equivalente JSON-safe de df.to_dict('records'), montado direto dos arrays das colunas"""
+    names = list(columns) if columns is not None else list(df.columns)
+    if df.empty:
+        return []
+    arrays = [column_values(df[name], date_format) for name in names]
+    return [dict(zip(names, row)) for row in zip(*arrays)]
@@ -1,10 +1,12 @@
+import asyncio
 import os
 import time
 from typing import Dict, List, Optional
 from collections import defaultdict
 from fastapi import FastAPI, Request, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from datetime import datetime, timedelta
 
 import pandas as pd
@@ -20,6 +22,59 @@ from .lib.security import (
     validate_auth_payload,
     validate_user_update_payload
 )
+from .lib.health import (
+    HealthMonitor,
+    STATUS_DEGRADED,
+    STATUS_ERROR,
+    STATUS_NOT_CONFIGURED,
+    STATUS_OK,
+    threadpool_probe,
+)
+from .lib.instrumentation import (
+    current_timings,
+    end_request,
+    get_logger,
+    log_request,
+    stage,
+    start_request,
+)
+
+from .lib.notifications import (
+    NOTIFICATIONS_BULK_MAX,
+    UnreadCounter,
+    count_unread,
+    delete_notification,
+    fetch_page,
+    mark_read,
+)
+from .lib.metrics import (
+    finish_request_rows,
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_requests_total,
+    observe_query,
+    rate_limit_rejections_total,
+    record_cache,
+    record_rows,
+    registry as metrics_registry,
+    start_request_rows,
+)
+from .lib.alerts import run_alerts
+from .lib.events import EVENT_TYPES, EventBroker, RedisRelay, parse_last_event_id
+from .lib.profiler import RequestProfiler, profile_store, should_sample
+from .lib.quote_store import (
+    DEFAULT_LAT,
+    DEFAULT_LON,
+    MARKET_TTL,
+    MemoryBackend,
+    QuoteStore,
+    RedisBackend,
+    fetch_dollar,
+    fetch_stock,
+)
+from .lib.serialization import frame_to_records, json_float
+
+logger = get_logger("agrodata.api")
 
 app = FastAPI(
     title="AgroData Nexus API",
@@ -117,8 +172,8 @@ except (ImportError, ModuleNotFoundError) as e:
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
     """Rate limiting middleware com suporte a Redis"""
-    # Skip rate limiting for health checks
-    if request.url.path == "/api/health":
+    # Skip rate limiting for health checks and metrics scrapes
+    if request.url.path.startswith("/api/health") or request.url.path == "/api/metrics":
         return await call_next(request)
     
     # Get client IP
@@ -130,6 +185,7 @@ async def rate_limit_middleware(request: Request, call_next):
         count = redis_client.increment(rate_limit_key, RATE_LIMIT_WINDOW)
         
         if count > RATE_LIMIT_REQUESTS:
+            rate_limit_rejections_total.inc(backend="redis")
             return JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
@@ -148,6 +204,7 @@ async def rate_limit_middleware(request: Request, call_next):
         ]
         
         if len(rate_limit_store[client_ip]) >= RATE_LIMIT_REQUESTS:
+            rate_limit_rejections_total.inc(backend="memory")
             return JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
@@ -174,8 +231,11 @@ async def cache_headers_middleware(request: Request, call_next):
     response = await call_next(request)
     
     # Add cache headers based on endpoint
-    if request.url.path.startswith("/api/health"):
+    if request.url.path.startswith(("/api/health", "/api/events")) or request.url.path == "/api/metrics":
         response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+    elif request.url.path.startswith("/api/notifications"):
+        # Por usuário e muda a cada leitura/alerta novo
+        response.headers["Cache-Control"] = "private, no-cache"
     elif request.url.path.startswith("/api/"):
         # Cache API responses for 5 minutes
         response.headers["Cache-Control"] = "public, max-age=300"
@@ -188,13 +248,104 @@ async def cache_headers_middleware(request: Request, call_next):
     return response
 
 
+# ✅ Instrumentation middleware
+# Middleware registrado depois fica por fora: profiler e metrics envolvem este,
+# então o tempo medido cobre rota + cache headers + rate limit + CORS, sem o
+# overhead do profiler/metrics (o profiler lê o Server-Timing já pronto)
+@app.middleware("http")
+async def instrumentation_middleware(request: Request, call_next):
+    """Server-Timing por etapa + log estruturado do request"""
+    token = start_request()
+    try:
+        timings = current_timings()
+        response = await call_next(request)
+        response.headers["Server-Timing"] = timings.server_timing()
+        log_request(logger, request.method, request.url.path, response.status_code, timings)
+        return response
+    finally:
+        end_request(token)
+
+
+def is_profile_admin(request: Request) -> bool:
+    """?profile=1 vale só para admin; sem Supabase/token é apenas um request comum"""
+    # HTTPException do ensure_supabase dentro do middleware viraria 500
+    if not supabase or not request.headers.get("Authorization"):
+        return False
+    try:
+        user = get_user_from_request_optional(request)
+        return bool(user) and is_admin_user(user)
+    except HTTPException:
+        return False
+
+
+# ✅ Profiler middleware (opt-in: ?profile=1 para admins ou PROFILE_SAMPLE_RATE)
+@app.middleware("http")
+async def profiler_middleware(request: Request, call_next):
+    """Perfila requests de analytics e guarda os top frames em memória"""
+    if not request.url.path.startswith("/api/analytics/"):
+        return await call_next(request)
+
+    trigger = None
+    if request.query_params.get("profile") == "1":
+        # Auth só para quem pediu o profile; chamadas síncronas ao Supabase fora do event loop
+        if await asyncio.to_thread(is_profile_admin, request):
+            trigger = "explicit"
+    elif should_sample():
+        trigger = "sampled"
+
+    if trigger is None:
+        return await call_next(request)
+
+    with RequestProfiler() as profiler:
+        response = await call_next(request)
+
+    if profiler.enabled:
+        profile_id = profile_store.add({
+            "method": request.method,
+            "path": request.url.path,
+            "query": str(request.url.query),
+            "status": response.status_code,
+            "trigger": trigger,
+            "duration_ms": round(profiler.duration_ms, 2),
+            "server_timing": response.headers.get("Server-Timing"),
+            "top_frames": profiler.top_frames(),
+        })
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+# ✅ Metrics middleware (rate, latência e linhas buscadas por route)
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Alimenta os counters/histogramas expostos em /api/metrics"""
+    rows_token = start_request_rows()
+    http_requests_in_flight.inc()
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        http_requests_in_flight.dec()
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        http_requests_total.inc(method=request.method, route=route_path, status=str(status_code))
+        http_request_duration_seconds.observe(time.perf_counter() - started, method=request.method, route=route_path)
+        finish_request_rows(rows_token, route_path)
+
+
 # ============ Helpers ============
 def ensure_supabase() -> Client:
     if not supabase:
-        print("❌ ensure_supabase() called but supabase client is None")
-        print(f"   SUPABASE_URL configured: {bool(os.getenv('SUPABASE_URL'))}")
-        print(f"   SUPABASE_SERVICE_ROLE_KEY configured: {bool(os.getenv('SUPABASE_SERVICE_ROLE_KEY'))}")
-        print(f"   SUPABASE_ANON_KEY configured: {bool(os.getenv('SUPABASE_ANON_KEY'))}")
+        logger.error(
+            "supabase client not initialized",
+            extra={
+                "supabase_url_set": bool(os.getenv("SUPABASE_URL")),
+                "service_role_key_set": bool(os.getenv("SUPABASE_SERVICE_ROLE_KEY")),
+                "anon_key_set": bool(os.getenv("SUPABASE_ANON_KEY")),
+            },
+        )
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Supabase not configured")
     return supabase
 
@@ -209,29 +360,41 @@ def parse_date(value: Optional[str], field: str) -> Optional[datetime]:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {field}")
 
 
-def get_user_from_request(request: Request):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.lower().startswith("bearer "):
-        print("⚠️ Missing or invalid authorization header")
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing authorization header")
-
-    token = auth_header.split(" ", 1)[1]
-    if not token:
-        print("⚠️ Empty token in authorization header")
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    
-    client = ensure_supabase()
+async def read_json_object(request: Request) -> Dict:
+    """Corpo JSON que precisa ser um objeto; malformado, lista, número ou null viram 400"""
     try:
-        result = client.auth.get_user(token)
-    except Exception as e:
-        print(f"⚠️ Error validating token: {e}")
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be valid JSON")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON object")
+    return body
+
+
+def get_user_from_request(request: Request):
+    with stage("auth"):
+        auth_header = request.headers.get("Authorization")
+        if not auth_header or not auth_header.lower().startswith("bearer "):
+            logger.debug("missing or invalid authorization header")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing authorization header")
+
+        token = auth_header.split(" ", 1)[1]
+        if not token:
+            logger.debug("empty token in authorization header")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        
+        client = ensure_supabase()
+        try:
+            result = client.auth.get_user(token)
+        except Exception as e:
+            logger.warning("error validating token", extra={"error": str(e)})
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    if not result or not result.user:
-        print("⚠️ Token validation returned no user")
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        if not result or not result.user:
+            logger.debug("token validation returned no user")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    return result.user
+        return result.user
 
 
 def get_user_from_request_optional(request: Request):
@@ -240,91 +403,168 @@ def get_user_from_request_optional(request: Request):
     the Authorization header is missing/invalid. Useful for endpoints where
     we prefer a graceful fallback over a 401 that would crash the UI.
     """
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.lower().startswith("bearer "):
-        return None
+    with stage("auth"):
+        auth_header = request.headers.get("Authorization")
+        if not auth_header or not auth_header.lower().startswith("bearer "):
+            return None
 
-    token = auth_header.split(" ", 1)[1]
-    if not token:
-        return None
+        token = auth_header.split(" ", 1)[1]
+        if not token:
+            return None
+
+        client = ensure_supabase()
+        try:
+            result = client.auth.get_user(token)
+        except Exception as e:
+            logger.warning("error validating token (optional)", extra={"error": str(e)})
+            return None
+
+        if not result or not result.user:
+            return None
 
+        return result.user
+
+
+def user_id_of(user) -> Optional[str]:
+    if isinstance(user, dict):
+        return user.get("id")
+    return getattr(user, "id", None)
+
+
+def is_admin_user(user) -> bool:
+    """Verifica a role admin em user_roles (mesma regra de public.has_role)"""
+    user_id = user_id_of(user)
+    if not user_id:
+        return False
     client = ensure_supabase()
     try:
-        result = client.auth.get_user(token)
-    except Exception as e:
-        print(f"⚠️ Error validating token (optional): {e}")
-        return None
+        with stage("auth"):
+            resp = client.table("user_roles").select("role").eq("user_id", str(user_id)).execute()
+    except Exception:
+        logger.warning("error checking admin role", exc_info=True)
+        return False
+    return any(r.get("role") == "admin" for r in (resp.data or []))
 
-    if not result or not result.user:
-        return None
 
-    return result.user
+def require_admin(request: Request):
+    user = get_user_from_request(request)
+    if not is_admin_user(user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return user
 
 
 def fetch_fact_mercado(start: Optional[datetime], end: Optional[datetime]) -> List[Dict]:
     try:
-        print(f"📊 fetch_fact_mercado called - start: {start}, end: {end}")
         client = ensure_supabase()
-        print(f"✅ Supabase client obtained, querying fact_mercado...")
         query = client.table("fact_mercado").select("data_fk, valor_dolar, valor_jbs, valor_boi_gordo").order("data_fk")
         if start:
             query = query.gte("data_fk", start.date().isoformat())
-            print(f"   Filter: data_fk >= {start.date().isoformat()}")
         if end:
             query = query.lte("data_fk", end.date().isoformat())
-            print(f"   Filter: data_fk <= {end.date().isoformat()}")
-        print(f"🔄 Executing Supabase query...")
-        resp = query.execute()
-        print(f"✅ Query executed, received {len(resp.data) if resp.data else 0} records")
+        with stage("supabase"), observe_query("fact_mercado"):
+            resp = query.execute()
+        record_rows("fact_mercado", len(resp.data or []))
+        logger.debug("fact_mercado fetched", extra={"start": start, "end": end, "rows": len(resp.data or [])})
         return resp.data or []
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error fetching fact_mercado: {e}", exc_info=True)
+        logger.exception("error fetching fact_mercado")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error fetching market data: {str(e)}"
         )
 
 
-def fetch_fact_clima(start: Optional[datetime], end: Optional[datetime]) -> List[Dict]:
+def parse_locations(value: Optional[str]) -> List[str]:
+    """?location=Sorriso,Sinop -> ["Sorriso", "Sinop"]"""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def fetch_fact_clima(start: Optional[datetime], end: Optional[datetime], locations: Optional[List[str]] = None) -> List[Dict]:
     try:
-        print(f"🌧️ fetch_fact_clima called - start: {start}, end: {end}")
         client = ensure_supabase()
-        print(f"✅ Supabase client obtained, querying fact_clima...")
-        query = client.table("fact_clima").select("data_fk, chuva_mm, temp_max").order("data_fk")
+        query = client.table("fact_clima").select("data_fk, chuva_mm, temp_max, localizacao").order("data_fk")
         if start:
             query = query.gte("data_fk", start.date().isoformat())
-            print(f"   Filter: data_fk >= {start.date().isoformat()}")
         if end:
             query = query.lte("data_fk", end.date().isoformat())
-            print(f"   Filter: data_fk <= {end.date().isoformat()}")
-        print(f"🔄 Executing Supabase query...")
-        resp = query.execute()
-        print(f"✅ Query executed, received {len(resp.data) if resp.data else 0} records")
+        if locations:
+            # Filtro no banco (índice localizacao, data_fk)
+            query = query.in_("localizacao", locations)
+        with stage("supabase"), observe_query("fact_clima"):
+            resp = query.execute()
+        record_rows("fact_clima", len(resp.data or []))
+        logger.debug("fact_clima fetched", extra={"start": start, "end": end, "rows": len(resp.data or [])})
         return resp.data or []
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error fetching fact_clima: {e}", exc_info=True)
+        logger.exception("error fetching fact_clima")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error fetching climate data: {str(e)}"
         )
 
 
+def daily_climate_mean(records: List[Dict]) -> List[Dict]:
+    """Média por data entre as localizações (equivalente a view_clima_diario)"""
+    df = build_dataframe(records)
+    if df.empty:
+        return []
+    with stage("compute"):
+        for column in ("chuva_mm", "temp_max"):
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+        daily = df.groupby("data_fk", sort=True).agg(
+            chuva_mm=("chuva_mm", "mean"),
+            temp_max=("temp_max", "mean"),
+            n_localizacoes=("localizacao", "count"),
+        ).round(2).reset_index()
+    return frame_to_records(daily)
+
+
+def fetch_daily_climate(start: Optional[datetime], end: Optional[datetime], locations: Optional[List[str]] = None) -> List[Dict]:
+    """Clima agregado por data; sem filtro de localização a agregação roda no banco"""
+    if not locations:
+        try:
+            client = ensure_supabase()
+            query = client.table("view_clima_diario").select("data_fk, chuva_mm, temp_max, n_localizacoes").order("data_fk")
+            if start:
+                query = query.gte("data_fk", start.date().isoformat())
+            if end:
+                query = query.lte("data_fk", end.date().isoformat())
+            with stage("supabase"), observe_query("view_clima_diario"):
+                resp = query.execute()
+            record_rows("view_clima_diario", len(resp.data or []))
+            return resp.data or []
+        except HTTPException:
+            raise
+        except Exception:
+            logger.warning("error querying view_clima_diario, aggregating raw data", exc_info=True)
+    return daily_climate_mean(fetch_fact_clima(start, end, locations))
+
+
 def build_dataframe(records: List[Dict]) -> pd.DataFrame:
     if not records:
         return pd.DataFrame()
     try:
-        df = pd.DataFrame(records)
-        if "data_fk" in df.columns:
-            df["data_fk"] = pd.to_datetime(df["data_fk"], errors="coerce")
+        with stage("dataframe"):
+            df = pd.DataFrame(records)
+            if "data_fk" in df.columns:
+                df["data_fk"] = pd.to_datetime(df["data_fk"], errors="coerce")
         return df
-    except Exception as e:
-        print(f"❌ Error building dataframe: {e}", exc_info=True)
+    except Exception:
+        logger.exception("error building dataframe")
         return pd.DataFrame()
 
+
+def json_response(payload) -> JSONResponse:
+    """Serializa a resposta dentro do timing da etapa 'serialize'"""
+    with stage("serialize"):
+        return JSONResponse(content=jsonable_encoder(payload))
+
 # ✅ Global exception handler
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -341,7 +581,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Global exception handler for unhandled errors"""
-    print(f"❌ Unhandled error: {exc}", exc_info=True)
+    logger.error("unhandled error", exc_info=exc, extra={"path": request.url.path})
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
@@ -351,50 +591,167 @@ async def general_exception_handler(request: Request, exc: Exception):
         },
     )
 
+# ============ Health ============
+# Probes rodam em background; os endpoints só leem o último snapshot
+health_monitor = HealthMonitor()
+
+
+def probe_supabase() -> Dict:
+    if not supabase:
+        return {"status": STATUS_ERROR, "error": "Supabase client not initialized"}
+    # Leitura indexada de uma linha (sem count exact, que varre a tabela)
+    supabase.table("fact_mercado").select("data_fk").limit(1).execute()
+    return {"status": STATUS_OK}
+
+
+def probe_redis() -> Dict:
+    if not (USE_REDIS and redis_client and redis_client.client):
+        return {"status": STATUS_NOT_CONFIGURED}
+    redis_client.client.ping()
+    return {"status": STATUS_OK}
+
+
+def probe_cache() -> Dict:
+    """Cache de cotações que as rotas servem: quantas chaves já têm valor no backend"""
+    # Lê o backend direto: quote_store.get marcaria leitura e dispararia refresh
+    keys = quote_store.keys
+    cached = [key for key in keys if quote_store.backend.get(key) is not None]
+    warm = len(cached) == len(keys)
+    return {
+        "status": STATUS_OK if warm else STATUS_DEGRADED,
+        "backend": "redis" if isinstance(quote_store.backend, RedisBackend) else "memory",
+        "warm": warm,
+        "entries": len(cached),
+        "keys": len(keys),
+    }
+
+
+# ============ Eventos (SSE) ============
+# Com Redis, eventos publicados em um worker chegam aos assinantes de todos
+event_broker = EventBroker(relay=RedisRelay(redis_client.client) if USE_REDIS and redis_client else None)
+
+
+def publish_quote(entry) -> None:
+    event_broker.publish("quote", {"key": entry.key, "value": entry.value, **entry.freshness()})
+
+
+# ============ Cotações em tempo real ============
+# Redis compartilha as cotações (e o lock de refresh) entre réplicas
+quote_store = QuoteStore(
+    RedisBackend(redis_client.client) if USE_REDIS and redis_client else MemoryBackend(),
+    on_update=publish_quote,
+)
+
+
+def latest_cattle_price() -> Dict:
+    """Último boi gordo gravado pelo data_fetcher (IMEA), sem scraping no processo da API"""
+    client = ensure_supabase()
+    resp = (
+        client.table("fact_mercado").select("data_fk, valor_boi_gordo")
+        .not_.is_("valor_boi_gordo", "null").order("data_fk", desc=True).limit(1).execute()
+    )
+    if not resp.data:
+        raise ValueError("fact_mercado sem valor_boi_gordo")
+    row = resp.data[0]
+    return {"value": json_float(row["valor_boi_gordo"]), "as_of": row["data_fk"], "source": "IMEA (warehouse)"}
+
+
+async def fetch_cattle(http_client) -> Dict:
+    return await asyncio.to_thread(latest_cattle_price)
+
+
+quote_store.register("dolar", fetch_dollar, MARKET_TTL["dolar"])
+quote_store.register("jbs", fetch_stock, MARKET_TTL["jbs"])
+quote_store.register("boi_gordo", fetch_cattle, MARKET_TTL["boi_gordo"])
+quote_store.register_weather(DEFAULT_LAT, DEFAULT_LON)
+
+health_monitor.register("supabase", probe_supabase, critical=True)
+health_monitor.register("redis", probe_redis, critical=False)
+health_monitor.register("cache", probe_cache, critical=False)  # Redis: I/O em thread
+health_monitor.register("threadpool", threadpool_probe, critical=False, blocking=False)
+health_monitor.register("quotes", quote_store.probe, critical=False, blocking=False)
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    health_monitor.start()
+    metrics_registry.start_flusher()
+    quote_store.start()
+    event_broker.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await health_monitor.stop()
+    await quote_store.stop()
+    event_broker.stop()
+
+
+async def current_readiness():
+    # Sem loop em background (ex.: serverless) o snapshot é atualizado sob demanda,
+    # no máximo uma vez por intervalo
+    stale = health_monitor.is_stale()
+    record_cache("health", hit=not stale)
+    if stale:
+        await health_monitor.refresh()
+    return health_monitor.readiness()
+
+
+@app.get("/api/health/live")
+async def health_live():
+    """Liveness - não toca em nenhuma dependência"""
+    return {"status": "alive", "timestamp": datetime.utcnow().isoformat()}
+
+
+@app.get("/api/health/ready")
+async def health_ready():
+    """Readiness - status das dependências a partir do snapshot em cache"""
+    ready, payload = await current_readiness()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=payload,
+    )
+
+
 @app.get("/api/health")
 async def health(request: Request):
     """Health check endpoint - verifica se a API está online"""
-    supabase_status = "not_configured"
-    supabase_error = None
-    supabase_test_result = None
-    
-    if supabase and supabase_url and supabase_key:
-        try:
-            # Test Supabase connection with simple query
-            print("🔄 Testing Supabase connection in health check...")
-            result = supabase.table("fact_mercado").select("count", count="exact").limit(1).execute()
-            supabase_status = "connected"
-            supabase_test_result = {
-                "count": result.count if hasattr(result, 'count') else None,
-                "has_data": bool(result.data) if hasattr(result, 'data') else None
-            }
-            print(f"✅ Supabase health check: OK")
-        except Exception as e:
-            print(f"⚠️ Supabase health check failed: {e}", exc_info=True)
-            supabase_status = "error"
-            supabase_error = str(e)
+    _, payload = await current_readiness()
+    supabase_check = payload["checks"].get("supabase", {})
+
+    if not (supabase_url and supabase_key):
+        supabase_status = "not_configured"
+    elif supabase_check.get("status") == STATUS_OK:
+        supabase_status = "connected"
     else:
-        supabase_error = "Supabase client not initialized"
-        if not supabase_url:
-            supabase_error += " - SUPABASE_URL missing"
-        if not supabase_key:
-            supabase_error += " - SUPABASE key missing"
-    
+        supabase_status = "error"
+
     return {
         "status": "online",
+        "ready": payload["status"] == "ready",
         "environment": os.getenv("ENVIRONMENT", "development"),
         "supabase_configured": bool(supabase_url and supabase_key),
         "supabase_initialized": bool(supabase),
         "supabase_status": supabase_status,
-        "supabase_error": supabase_error,
-        "supabase_test": supabase_test_result,
+        "supabase_error": supabase_check.get("error"),
         "supabase_url_set": bool(supabase_url),
         "supabase_key_set": bool(supabase_key),
+        "checks": payload["checks"],
         "cors_origins": len(origins),
         "timestamp": datetime.utcnow().isoformat(),
         "version": "1.0.0",
     }
 
+@app.get("/api/metrics")
+async def metrics(request: Request):
+    """Métricas no formato texto do Prometheus (agregadas entre workers)"""
+    metrics_token = os.getenv("METRICS_TOKEN")
+    if metrics_token and request.headers.get("Authorization") != f"Bearer {metrics_token}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    metrics_registry.flush()
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/")
 async def root():
     """Root endpoint"""
@@ -418,24 +775,64 @@ async def get_market_data(request: Request, start_date: Optional[str] = None, en
 
 
 @app.get("/api/climate-data")
-async def get_climate_data(request: Request, start_date: Optional[str] = None, end_date: Optional[str] = None):
+async def get_climate_data(
+    request: Request,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    location: Optional[str] = None,
+    aggregate: bool = False,
+):
+    """
+    location: uma ou mais localizações separadas por vírgula
+    aggregate: média por data entre as localizações selecionadas
+    """
     get_user_from_request(request)
     start = parse_date(start_date, "start_date")
     end = parse_date(end_date, "end_date")
+    locations = parse_locations(location)
 
-    records = fetch_fact_clima(start, end)
+    if aggregate:
+        return json_response(fetch_daily_climate(start, end, locations))
+    records = fetch_fact_clima(start, end, locations)
     return records
 
 
+@app.get("/api/climate-data/locations")
+async def get_climate_locations(request: Request):
+    """Localizações disponíveis com período coberto e médias"""
+    get_user_from_request(request)
+    client = ensure_supabase()
+    try:
+        query = client.table("view_clima_localizacoes").select("*").order("localizacao")
+        with stage("supabase"), observe_query("view_clima_localizacoes"):
+            resp = query.execute()
+        return resp.data or []
+    except Exception:
+        logger.warning("error querying view_clima_localizacoes, aggregating raw data", exc_info=True)
+
+    df = build_dataframe(fetch_fact_clima(None, None))
+    if df.empty:
+        return []
+    with stage("compute"):
+        for column in ("chuva_mm", "temp_max"):
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+        summary = df.groupby("localizacao", sort=True).agg(
+            data_inicio=("data_fk", "min"),
+            data_fim=("data_fk", "max"),
+            dias=("data_fk", "count"),
+            chuva_media_mm=("chuva_mm", "mean"),
+            temp_max_media=("temp_max", "mean"),
+        ).round(2).reset_index()
+    return json_response(frame_to_records(summary))
+
+
 @app.get("/api/analytics/correlation")
 async def correlation_analysis(request: Request, start_date: Optional[str] = None, end_date: Optional[str] = None):
     try:
-        print(f"🔍 /api/analytics/correlation called - start_date: {start_date}, end_date: {end_date}")
         get_user_from_request(request)
         start = parse_date(start_date, "start_date")
         end = parse_date(end_date, "end_date")
 
-        print(f"📊 Fetching market data for correlation analysis...")
         records = fetch_fact_mercado(start, end)
         df = build_dataframe(records)
 
@@ -446,28 +843,30 @@ async def correlation_analysis(request: Request, start_date: Optional[str] = Non
         required_cols = ["valor_dolar", "valor_jbs", "valor_boi_gordo"]
         missing_cols = [col for col in required_cols if col not in df.columns]
         if missing_cols:
-            print(f"⚠️ Missing columns in correlation analysis: {missing_cols}")
+            logger.warning("missing columns in correlation analysis", extra={"missing": missing_cols})
             return {"correlation_matrix": {}, "data_points": 0, "data": [], "error": f"Missing columns: {missing_cols}"}
 
-        # Filter out rows with missing values for correlation
-        df_clean = df[required_cols].dropna()
-        if df_clean.empty:
-            return {"correlation_matrix": {}, "data_points": 0, "data": []}
-
-        corr_matrix = df_clean.corr().round(4)
-        df["ano"] = df["data_fk"].dt.year
-        df["mes"] = df["data_fk"].dt.month
-        df["data_fk"] = df["data_fk"].dt.strftime("%Y-%m-%d")
+        with stage("compute"):
+            # Filter out rows with missing values for correlation
+            df_clean = df[required_cols].dropna()
+            if df_clean.empty:
+                return {"correlation_matrix": {}, "data_points": 0, "data": []}
+
+            corr_matrix = df_clean.corr().round(4)
+            df["ano"] = df["data_fk"].dt.year
+            df["mes"] = df["data_fk"].dt.month
+            df["data_fk"] = df["data_fk"].dt.strftime("%Y-%m-%d")
+            payload = {
+                "correlation_matrix": corr_matrix.to_dict(),
+                "data_points": len(df),
+                "data": frame_to_records(df, ["data_fk", "ano", "mes", "valor_dolar", "valor_jbs", "valor_boi_gordo"]),
+            }
 
-        return {
-            "correlation_matrix": corr_matrix.to_dict(),
-            "data_points": len(df),
-            "data": df[["data_fk", "ano", "mes", "valor_dolar", "valor_jbs", "valor_boi_gordo"]].to_dict(orient="records"),
-        }
+        return json_response(payload)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error in correlation_analysis: {e}", exc_info=True)
+        logger.exception("error in correlation_analysis")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing correlation analysis: {str(e)}"
@@ -477,12 +876,10 @@ async def correlation_analysis(request: Request, start_date: Optional[str] = Non
 @app.get("/api/analytics/volatility")
 async def volatility_analysis(request: Request, start_date: Optional[str] = None, end_date: Optional[str] = None):
     try:
-        print(f"🔍 /api/analytics/volatility called - start_date: {start_date}, end_date: {end_date}")
         get_user_from_request(request)
         start = parse_date(start_date, "start_date")
         end = parse_date(end_date, "end_date")
 
-        print(f"📊 Fetching market data for volatility analysis...")
         records = fetch_fact_mercado(start, end)
         df = build_dataframe(records)
 
@@ -493,7 +890,7 @@ async def volatility_analysis(request: Request, start_date: Optional[str] = None
         required_cols = ["valor_boi_gordo", "valor_dolar"]
         missing_cols = [col for col in required_cols if col not in df.columns]
         if missing_cols:
-            print(f"⚠️ Missing columns in volatility analysis: {missing_cols}")
+            logger.warning("missing columns in volatility analysis", extra={"missing": missing_cols})
             return []
 
         df["ano"] = df["data_fk"].dt.year
@@ -515,44 +912,83 @@ async def volatility_analysis(request: Request, start_date: Optional[str] = None
             except (ValueError, TypeError):
                 return 0.0
 
-        grouped = df.groupby(["ano", "mes"])
         results: List[Dict] = []
-        for (ano, mes), group in grouped:
-            boi_series = group["valor_boi_gordo"].dropna()
-            dolar_series = group["valor_dolar"].dropna()
-            
-            results.append(
-                {
-                    "ano": int(ano),
-                    "mes": int(mes),
-                    "min_boi": safe_float(boi_series.min()) if not boi_series.empty else 0.0,
-                    "q1_boi": percentile(boi_series, 0.25),
-                    "mediana_boi": percentile(boi_series, 0.50),
-                    "q3_boi": percentile(boi_series, 0.75),
-                    "max_boi": safe_float(boi_series.max()) if not boi_series.empty else 0.0,
-                    "min_dolar": safe_float(dolar_series.min()) if not dolar_series.empty else 0.0,
-                    "q1_dolar": percentile(dolar_series, 0.25),
-                    "mediana_dolar": percentile(dolar_series, 0.50),
-                    "q3_dolar": percentile(dolar_series, 0.75),
-                    "max_dolar": safe_float(dolar_series.max()) if not dolar_series.empty else 0.0,
-                }
-            )
-
-        return results
+        with stage("compute"):
+            grouped = df.groupby(["ano", "mes"])
+            for (ano, mes), group in grouped:
+                boi_series = group["valor_boi_gordo"].dropna()
+                dolar_series = group["valor_dolar"].dropna()
+                
+                results.append(
+                    {
+                        "ano": int(ano),
+                        "mes": int(mes),
+                        "min_boi": safe_float(boi_series.min()) if not boi_series.empty else 0.0,
+                        "q1_boi": percentile(boi_series, 0.25),
+                        "mediana_boi": percentile(boi_series, 0.50),
+                        "q3_boi": percentile(boi_series, 0.75),
+                        "max_boi": safe_float(boi_series.max()) if not boi_series.empty else 0.0,
+                        "min_dolar": safe_float(dolar_series.min()) if not dolar_series.empty else 0.0,
+                        "q1_dolar": percentile(dolar_series, 0.25),
+                        "mediana_dolar": percentile(dolar_series, 0.50),
+                        "q3_dolar": percentile(dolar_series, 0.75),
+                        "max_dolar": safe_float(dolar_series.max()) if not dolar_series.empty else 0.0,
+                    }
+                )
+
+        return json_response(results)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error in volatility_analysis: {e}", exc_info=True)
+        logger.exception("error in volatility_analysis")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing volatility analysis: {str(e)}"
         )
 
 
+def compute_lag_from_raw(start: Optional[datetime], end: Optional[datetime], lag_days: int) -> List[Dict]:
+    """Lag chuva -> preço calculado a partir das tabelas fato (sem a view)"""
+    mercado_records = fetch_fact_mercado(start, end)
+    clima_records = fetch_fact_clima(None, None)  # need earlier dates for lag lookup
+    mercado_df = build_dataframe(mercado_records)
+    clima_df = build_dataframe(clima_records)
+    if mercado_df.empty:
+        return []
+    
+    if "valor_boi_gordo" not in mercado_df.columns:
+        logger.warning("missing valor_boi_gordo column in lag analysis")
+        return []
+    
+    with stage("compute"):
+        # Várias localizações por data: usa a média diária (mesma regra da view)
+        clima_lookup = (
+            pd.to_numeric(clima_df["chuva_mm"], errors="coerce").groupby(clima_df["data_fk"]).mean()
+            if not clima_df.empty and "chuva_mm" in clima_df.columns
+            else None
+        )
+
+        mercado_df["data_preco"] = mercado_df["data_fk"]
+        mercado_df["data_chuva_original"] = mercado_df["data_fk"] - pd.to_timedelta(lag_days, unit="D")
+        if clima_lookup is not None:
+            mercado_df["chuva_mm_lag"] = mercado_df["data_chuva_original"].map(clima_lookup)
+        else:
+            mercado_df["chuva_mm_lag"] = None
+
+        mercado_df["ano_preco"] = mercado_df["data_preco"].dt.year
+        mercado_df["mes_preco"] = mercado_df["data_preco"].dt.month
+        mercado_df["chuva_mm"] = pd.to_numeric(mercado_df["chuva_mm_lag"], errors="coerce")
+        mercado_df["valor_boi_gordo"] = pd.to_numeric(mercado_df["valor_boi_gordo"], errors="coerce")
+
+        return frame_to_records(
+            mercado_df,
+            ["data_preco", "ano_preco", "mes_preco", "valor_boi_gordo", "chuva_mm", "data_chuva_original"],
+        )
+
+
 @app.get("/api/analytics/lag")
 async def lag_analysis(request: Request, start_date: Optional[str] = None, end_date: Optional[str] = None, lag_days: int = 60):
     try:
-        print(f"🔍 /api/analytics/lag called - start_date: {start_date}, end_date: {end_date}, lag_days: {lag_days}")
         get_user_from_request(request)
         
         # Simple bounds check for lag_days
@@ -563,138 +999,47 @@ async def lag_analysis(request: Request, start_date: Optional[str] = None, end_d
         end = parse_date(end_date, "end_date")
 
         # Prefer view_lag_chuva_60d_boi if available for server-side lag
-        print(f"📊 Getting Supabase client for lag analysis...")
         client = ensure_supabase()
         
         # If lag_days different from 60, compute client-side using raw data
         if lag_days != 60:
-            mercado_records = fetch_fact_mercado(start, end)
-            clima_records = fetch_fact_clima(None, None)  # need earlier dates for lag lookup
-            mercado_df = build_dataframe(mercado_records)
-            clima_df = build_dataframe(clima_records)
-            if mercado_df.empty:
-                return []
-            
-            if "valor_boi_gordo" not in mercado_df.columns:
-                print("⚠️ Missing valor_boi_gordo column in lag analysis")
-                return []
-            
-            clima_lookup = clima_df.set_index("data_fk")["chuva_mm"] if not clima_df.empty and "chuva_mm" in clima_df.columns else None
-
-            mercado_df["data_preco"] = mercado_df["data_fk"]
-            mercado_df["data_chuva_original"] = mercado_df["data_fk"] - pd.to_timedelta(lag_days, unit="D")
-            if clima_lookup is not None:
-                mercado_df["chuva_mm_lag"] = mercado_df["data_chuva_original"].map(clima_lookup)
-            else:
-                mercado_df["chuva_mm_lag"] = None
-
-            mercado_df["ano_preco"] = mercado_df["data_preco"].dt.year
-            mercado_df["mes_preco"] = mercado_df["data_preco"].dt.month
-            mercado_df["data_preco"] = mercado_df["data_preco"].dt.strftime("%Y-%m-%d")
-            mercado_df["data_chuva_original"] = mercado_df["data_chuva_original"].dt.strftime("%Y-%m-%d")
-            
-            def safe_float(value):
-                try:
-                    if pd.isna(value):
-                        return None
-                    return float(value)
-                except (ValueError, TypeError):
-                    return None
-            
-            return [
-                {
-                    "data_preco": str(row["data_preco"]),
-                    "ano_preco": int(row["ano_preco"]),
-                    "mes_preco": int(row["mes_preco"]),
-                    "valor_boi_gordo": safe_float(row["valor_boi_gordo"]),
-                    "chuva_mm": safe_float(row["chuva_mm_lag"]),
-                    "data_chuva_original": str(row["data_chuva_original"]),
-                }
-                for _, row in mercado_df.iterrows()
-            ]
+            return json_response(compute_lag_from_raw(start, end, lag_days))
 
         # Use view for lag_days == 60
         try:
-            print(f"📊 Querying view_lag_chuva_60d_boi...")
             query = client.table("view_lag_chuva_60d_boi").select(
                 "data_preco, ano_preco, mes_preco, valor_boi_gordo, chuva_mm_lag_60d, data_chuva_original"
             ).order("data_preco")
             if start:
                 query = query.gte("data_preco", start.date().isoformat())
-                print(f"   Filter: data_preco >= {start.date().isoformat()}")
             if end:
                 query = query.lte("data_preco", end.date().isoformat())
-                print(f"   Filter: data_preco <= {end.date().isoformat()}")
-            print(f"🔄 Executing Supabase query on view...")
-            resp = query.execute()
-            print(f"✅ View query executed, received {len(resp.data) if resp.data else 0} records")
+            with stage("supabase"), observe_query("view_lag_chuva_60d_boi"):
+                resp = query.execute()
             records = resp.data or []
-        except Exception as e:
-            print(f"⚠️ Error querying view_lag_chuva_60d_boi: {e}, falling back to raw data", exc_info=True)
+            record_rows("view_lag_chuva_60d_boi", len(records))
+        except Exception:
+            logger.warning("error querying view_lag_chuva_60d_boi, falling back to raw data", exc_info=True)
             # Fallback to raw data computation
-            mercado_records = fetch_fact_mercado(start, end)
-            clima_records = fetch_fact_clima(None, None)
-            mercado_df = build_dataframe(mercado_records)
-            clima_df = build_dataframe(clima_records)
-            if mercado_df.empty:
-                return []
-            
-            clima_lookup = clima_df.set_index("data_fk")["chuva_mm"] if not clima_df.empty and "chuva_mm" in clima_df.columns else None
-            mercado_df["data_preco"] = mercado_df["data_fk"]
-            mercado_df["data_chuva_original"] = mercado_df["data_fk"] - pd.to_timedelta(60, unit="D")
-            if clima_lookup is not None:
-                mercado_df["chuva_mm_lag"] = mercado_df["data_chuva_original"].map(clima_lookup)
-            else:
-                mercado_df["chuva_mm_lag"] = None
-            
-            mercado_df["ano_preco"] = mercado_df["data_preco"].dt.year
-            mercado_df["mes_preco"] = mercado_df["data_preco"].dt.month
-            mercado_df["data_preco"] = mercado_df["data_preco"].dt.strftime("%Y-%m-%d")
-            mercado_df["data_chuva_original"] = mercado_df["data_chuva_original"].dt.strftime("%Y-%m-%d")
-            
-            def safe_float(value):
-                try:
-                    if pd.isna(value):
-                        return None
-                    return float(value)
-                except (ValueError, TypeError):
-                    return None
-            
-            return [
+            return json_response(compute_lag_from_raw(start, end, 60))
+
+        with stage("compute"):
+            results = [
                 {
-                    "data_preco": str(row["data_preco"]),
-                    "ano_preco": int(row["ano_preco"]),
-                    "mes_preco": int(row["mes_preco"]),
-                    "valor_boi_gordo": safe_float(row["valor_boi_gordo"]),
-                    "chuva_mm": safe_float(row["chuva_mm_lag"]),
-                    "data_chuva_original": str(row["data_chuva_original"]),
+                    "data_preco": rec.get("data_preco", ""),
+                    "ano_preco": int(rec.get("ano_preco", 0)),
+                    "mes_preco": int(rec.get("mes_preco", 0)),
+                    "valor_boi_gordo": json_float(rec.get("valor_boi_gordo")),
+                    "chuva_mm": json_float(rec.get("chuva_mm_lag_60d")),
+                    "data_chuva_original": rec.get("data_chuva_original", ""),
                 }
-                for _, row in mercado_df.iterrows()
+                for rec in records
             ]
-
-        def safe_float(value):
-            try:
-                if value is None or (isinstance(value, float) and pd.isna(value)):
-                    return None
-                return float(value)
-            except (ValueError, TypeError):
-                return None
-
-        return [
-            {
-                "data_preco": rec.get("data_preco", ""),
-                "ano_preco": int(rec.get("ano_preco", 0)),
-                "mes_preco": int(rec.get("mes_preco", 0)),
-                "valor_boi_gordo": safe_float(rec.get("valor_boi_gordo")),
-                "chuva_mm": safe_float(rec.get("chuva_mm_lag_60d")),
-                "data_chuva_original": rec.get("data_chuva_original", ""),
-            }
-            for rec in records
-        ]
+        return json_response(results)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error in lag_analysis: {e}", exc_info=True)
+        logger.exception("error in lag_analysis")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing lag analysis: {str(e)}"
@@ -750,7 +1095,7 @@ async def validate_password_endpoint(request: Request):
         except HTTPException as e:
             return {"valid": False, "error": e.detail}
     except Exception as e:
-        print(f"❌ Error validating password: {e}", exc_info=True)
+        logger.exception("error validating password")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error validating password: {str(e)}"
@@ -791,7 +1136,7 @@ async def validate_signup_endpoint(request: Request):
             "errors": errors if errors else None
         }
     except Exception as e:
-        print(f"❌ Error validating signup: {e}", exc_info=True)
+        logger.exception("error validating signup")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error validating signup: {str(e)}"
@@ -817,38 +1162,132 @@ async def validate_signup_endpoint(request: Request):
             "errors": {}
         }
     except Exception as e:
-        print(f"❌ Error validating signup: {e}", exc_info=True)
+        logger.exception("error validating signup")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error validating signup: {str(e)}"
         )
 
 
+# ============ Notifications Endpoints ============
+# Contador de não lidas em cache (Redis entre réplicas); ajustado nas escritas da API
+unread_counter = UnreadCounter(redis_client.client if USE_REDIS and redis_client else None)
+
+
+def unread_count_for(client, user_id: str) -> int:
+    cached = unread_counter.get(user_id)
+    if cached is not None:
+        return cached
+    with stage("supabase"), observe_query("notifications"):
+        count = count_unread(client, user_id)
+    unread_counter.set(user_id, count)
+    return count
+
+
+@app.get("/api/notifications")
+async def list_notifications(
+    request: Request,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    unread_only: bool = False,
+):
+    """Página de notificações + contador de não lidas (uma requisição ao abrir a central)"""
+    user_id = str(user_id_of(get_user_from_request(request)))
+    client = ensure_supabase()
+    try:
+        with stage("supabase"), observe_query("notifications"):
+            items, next_cursor = await asyncio.to_thread(fetch_page, client, user_id, limit, cursor, unread_only)
+        unread = await asyncio.to_thread(unread_count_for, client, user_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    except Exception as e:
+        logger.exception("error fetching notifications")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching notifications: {str(e)}"
+        )
+    record_rows("notifications", len(items))
+    return {"items": items, "next_cursor": next_cursor, "unread_count": unread}
+
+
+@app.get("/api/notifications/unread-count")
+async def notifications_unread_count(request: Request):
+    user_id = str(user_id_of(get_user_from_request(request)))
+    client = ensure_supabase()
+    return {"unread_count": await asyncio.to_thread(unread_count_for, client, user_id)}
+
+
+@app.post("/api/notifications/read")
+async def mark_notifications_read(request: Request):
+    """Body: {"ids": [1, 2, ...]} ou {"all": true}; um UPDATE por chamada"""
+    user_id = str(user_id_of(get_user_from_request(request)))
+    body = await read_json_object(request)
+    ids = None
+    if not body.get("all"):
+        ids = body.get("ids")
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be a non-empty list of integers")
+        if len(ids) > NOTIFICATIONS_BULK_MAX:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {NOTIFICATIONS_BULK_MAX} ids per request")
+        ids = sorted(set(ids))
+
+    client = ensure_supabase()
+    try:
+        with stage("supabase"), observe_query("notifications"):
+            updated = await asyncio.to_thread(mark_read, client, user_id, ids)
+    except Exception as e:
+        logger.exception("error marking notifications as read")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error updating notifications: {str(e)}"
+        )
+    if ids is None:
+        unread_counter.set(user_id, 0)
+        unread = 0
+    else:
+        unread = unread_counter.adjust(user_id, -updated)
+        if unread is None:
+            unread = await asyncio.to_thread(unread_count_for, client, user_id)
+    return {"updated": updated, "unread_count": unread}
+
+
+@app.delete("/api/notifications/{notification_id}")
+async def remove_notification(request: Request, notification_id: int):
+    user_id = str(user_id_of(get_user_from_request(request)))
+    client = ensure_supabase()
+    try:
+        with stage("supabase"), observe_query("notifications"):
+            deleted = await asyncio.to_thread(delete_notification, client, user_id, notification_id)
+    except Exception as e:
+        logger.exception("error deleting notification")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error deleting notification: {str(e)}"
+        )
+    if deleted is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notification not found")
+    if not deleted.get("is_read"):
+        unread_counter.adjust(user_id, -1)
+    return {"success": True, "message": "Notification deleted"}
+
+
 # ============ Admin Endpoints ============
 @app.get("/api/admin/users")
 async def get_admin_users(request: Request):
-    print("🔍 /api/admin/users called")
     user = get_user_from_request_optional(request)
     if not user:
-        print("⚠️ No user authenticated, returning empty list")
         # Fallback: return empty list instead of 401 to avoid UI crash
         return []
     
-    print(f"✅ User authenticated: {user.email}")
-    
     try:
         client = ensure_supabase()
         
         # Fetch all profiles
-        print("📊 Fetching profiles from Supabase...")
         profiles_resp = client.table("profiles").select("*").execute()
-        print(f"📊 Profiles response: {len(profiles_resp.data or [])} records")
         profiles = {p["user_id"]: p for p in (profiles_resp.data or [])}
         
         # Fetch all user_roles
-        print("📊 Fetching user_roles from Supabase...")
         roles_resp = client.table("user_roles").select("*").execute()
-        print(f"📊 Roles response: {len(roles_resp.data or [])} records")
         roles_map = {r["user_id"]: r["role"] for r in (roles_resp.data or [])}
         
         # Combine
@@ -862,12 +1301,9 @@ async def get_admin_users(request: Request):
                 "created_at": profile.get("created_at")
             })
         
-        print(f"✅ Returning {len(result)} users")
         return result
-    except Exception as e:
-        print(f"❌ Error fetching admin users: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("error fetching admin users")
         return []
 
 
@@ -885,13 +1321,27 @@ async def get_admin_audit_logs(request: Request, limit: int = 100):
         client = ensure_supabase()
         resp = client.table("audit_logs").select("*").order("created_at", desc=True).limit(limit).execute()
         return resp.data or []
-    except Exception as e:
-        print(f"❌ Error fetching audit logs: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("error fetching audit logs")
         return []
 
 
+@app.get("/api/admin/profiles")
+async def list_profiles(request: Request):
+    """Perfis capturados (resumo, mais recentes primeiro)"""
+    require_admin(request)
+    return profile_store.list()
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(request: Request, profile_id: str):
+    require_admin(request)
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return profile
+
+
 @app.put("/api/admin/users/{user_id}/role")
 async def update_user_role(request: Request, user_id: str, role: str):
     user = get_user_from_request_optional(request)
@@ -917,79 +1367,176 @@ async def update_user_role(request: Request, user_id: str, role: str):
         
         return {"success": True, "role": role}
     except Exception as e:
-        print(f"❌ Error updating user role: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("error updating user role")
         return {"success": False, "role": role, "detail": str(e)}
 
 
 # ============ Realtime Endpoints ============
-@app.get("/api/realtime/weather")
-async def get_realtime_weather(request: Request, lat: float = -15.6014, lon: float = -56.0979):
-    get_user_from_request(request)
-    
+# Respostas saem do quote_store (memória/Redis); o refresher em background
+# mantém cada fonte dentro do TTL
+MARKET_QUOTES = {"dolar": "valor_dolar", "jbs": "valor_jbs", "boi_gordo": "valor_boi_gordo"}
+
+
+def valid_coordinates(lat: float, lon: float):
     # Simple bounds check for coordinates
     if lat < -90 or lat > 90:
-        lat = -15.6014
+        lat = DEFAULT_LAT
     if lon < -180 or lon > 180:
-        lon = -56.0979
-    
+        lon = DEFAULT_LON
+    return lat, lon
+
+
+async def realtime_weather(lat: float, lon: float) -> Dict:
+    entry = await quote_store.get_or_fetch(quote_store.register_weather(lat, lon))
+    value = dict(entry.value or {}) if entry else {}
     return {
+        **value,
         "lat": lat,
         "lon": lon,
-        "temp": 32.0,
-        "humidity": 65,
-        "wind_speed": 10,
-        "condition": "Parcialmente nublado",
-        "timestamp": datetime.utcnow().isoformat()
+        # Formato do RealtimeDataPanel
+        "current": {
+            "temperature": value.get("temp"),
+            "precipitation": value.get("precipitation"),
+            "weather_code": value.get("weather_code"),
+            "time": value.get("time"),
+        },
+        "location": {"name": "Cuiabá" if (lat, lon) == (DEFAULT_LAT, DEFAULT_LON) else f"{lat:.2f}, {lon:.2f}"},
+        "freshness": entry.freshness() if entry else None,
+        "timestamp": datetime.utcnow().isoformat(),
     }
 
 
+async def realtime_market() -> Dict:
+    entries = {key: quote_store.get(key) for key in MARKET_QUOTES}
+    if all(entry is None or entry.value is None for entry in entries.values()):
+        # Store frio (primeira requisição do processo): espera uma vez
+        await quote_store.refresh(list(MARKET_QUOTES))
+        entries = {key: quote_store.get(key) for key in MARKET_QUOTES}
+    payload: Dict = {"market": {}, "sources": {}}
+    for key, column in MARKET_QUOTES.items():
+        entry = entries[key]
+        value = entry.value if entry and entry.value else {}
+        payload[column] = value.get("value")
+        payload["market"][key] = {"value": value.get("value"), "source": value.get("source"), "as_of": value.get("as_of")}
+        payload["sources"][key] = entry.freshness() if entry else None
+    payload["timestamp"] = datetime.utcnow().isoformat()
+    return payload
+
+
+@app.get("/api/realtime/weather")
+async def get_realtime_weather(request: Request, lat: float = DEFAULT_LAT, lon: float = DEFAULT_LON):
+    get_user_from_request(request)
+    lat, lon = valid_coordinates(lat, lon)
+    return await realtime_weather(lat, lon)
+
+
 @app.get("/api/realtime/market")
 async def get_realtime_market(request: Request):
     get_user_from_request(request)
-    return {
-        "valor_dolar": 5.35,
-        "valor_jbs": 40.0,
-        "valor_boi_gordo": 615.0,
-        "timestamp": datetime.utcnow().isoformat()
-    }
+    return await realtime_market()
 
 
 @app.post("/api/realtime/refresh")
-async def refresh_realtime(request: Request, lat: float = -15.6014, lon: float = -56.0979):
+async def refresh_realtime(request: Request, lat: float = DEFAULT_LAT, lon: float = DEFAULT_LON):
+    """Agenda um refresh (deduplicado) e responde com o que já está no store, sem esperar as fontes"""
     get_user_from_request(request)
-    
-    # Simple bounds check for coordinates
-    if lat < -90 or lat > 90:
-        lat = -15.6014
-    if lon < -180 or lon > 180:
-        lon = -56.0979
-    
+    lat, lon = valid_coordinates(lat, lon)
+    key = quote_store.register_weather(lat, lon)
+    refresh = quote_store.trigger([*MARKET_QUOTES, key])
     return {
-        "weather": {
-            "lat": lat,
-            "lon": lon,
-            "temp": 32.0,
-            "humidity": 65,
-            "wind_speed": 10,
-            "condition": "Parcialmente nublado",
-            "timestamp": datetime.utcnow().isoformat()
-        },
-        "market": {
-            "valor_dolar": 5.35,
-            "valor_jbs": 40.0,
-            "valor_boi_gordo": 615.0,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        "weather": await realtime_weather(lat, lon),
+        "market": await realtime_market(),
+        "refresh": refresh,
     }
 
 
 @app.get("/api/realtime/status")
 async def get_realtime_status(request: Request):
     get_user_from_request(request)
+    sources = quote_store.status()
+    market_times = [sources[key]["updated_at"] for key in MARKET_QUOTES if sources.get(key, {}).get("updated_at")]
+    weather = sources.get(quote_store.register_weather(DEFAULT_LAT, DEFAULT_LON), {})
     return {
-        "last_weather_at": datetime.utcnow().isoformat(),
-        "last_market_at": datetime.utcnow().isoformat(),
-        "last_refresh_ok": datetime.utcnow().isoformat()
+        "last_weather_at": weather.get("updated_at"),
+        "last_market_at": max(market_times) if market_times else None,
+        "last_refresh_ok": datetime.utcfromtimestamp(quote_store.last_refresh_ok).isoformat() if quote_store.last_refresh_ok else None,
+        "sources": sources,
     }
+
+
+# ============ Events (SSE) ============
+@app.get("/api/events/stream")
+async def events_stream(request: Request, types: Optional[str] = None, last_event_id: Optional[str] = None, access_token: Optional[str] = None):
+    """
+    Push de cotações, linhas novas de fact_mercado/fact_clima e invalidações.
+    EventSource não envia headers: o token pode vir em ?access_token=.
+    Reconexão manda Last-Event-ID e recebe os eventos perdidos.
+    """
+    if access_token and not request.headers.get("Authorization"):
+        try:
+            user = ensure_supabase().auth.get_user(access_token).user
+        except Exception:
+            user = None
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    else:
+        get_user_from_request(request)
+
+    wanted = [t.strip() for t in (types or "").split(",") if t.strip()]
+    unknown = set(wanted) - EVENT_TYPES
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown event types: {', '.join(sorted(unknown))}")
+
+    last_id = parse_last_event_id(request.headers.get("Last-Event-ID") or last_event_id)
+    return StreamingResponse(
+        event_broker.stream(last_id, wanted or None),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Connection": "keep-alive"},
+    )
+
+
+@app.post("/api/events/publish")
+async def publish_event(request: Request):
+    """Publica um evento (ingestão/admin). Aceita EVENTS_PUBLISH_TOKEN ou usuário admin."""
+    publish_token = os.getenv("EVENTS_PUBLISH_TOKEN")
+    if not (publish_token and request.headers.get("Authorization") == f"Bearer {publish_token}"):
+        require_admin(request)
+
+    body = await read_json_object(request)
+    event_type = body.get("type")
+    if event_type not in EVENT_TYPES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"type must be one of {sorted(EVENT_TYPES)}")
+    data = body.get("data") or {}
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="data must be an object")
+    if event_type == "invalidate" and "notifications" in (data.get("tables") or []):
+        unread_counter.invalidate(data.get("user_ids"))
+    event = event_broker.publish(event_type, data)
+    return {"id": event.id, "type": event.type, "subscribers": event_broker.stats()["subscribers"]}
+
+
+@app.get("/api/events/stats")
+async def events_stats(request: Request):
+    require_admin(request)
+    return event_broker.stats()
+
+
+@app.post("/api/alerts/evaluate")
+async def evaluate_alerts(request: Request, table: Optional[str] = None):
+    """Reavalia as regras de alerta sob demanda (a ingestão já avalia a cada gravação)"""
+    require_admin(request)
+    tables = [table] if table else ["fact_mercado", "fact_clima"]
+    if not set(tables) <= {"fact_mercado", "fact_clima"}:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="table must be fact_mercado or fact_clima")
+    client = ensure_supabase()
+    try:
+        summary = await asyncio.to_thread(run_alerts, client, tables)
+    except Exception as e:
+        logger.exception("error evaluating alerts")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error evaluating alerts: {str(e)}"
+        )
+    if summary["inserted"]:
+        unread_counter.invalidate()
+    return summary
@@ -0,0 +1,124 @@
+import os
+import sys
+from datetime import date
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api.lib.alerts import DEFAULT_RULES, build_notifications, evaluate_rules, load_rules, run_alerts
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.start = None
+        self.range_ = None
+        self.payload = None
+
+    def select(self, *args):
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def gte(self, column, value):
+        self.start = value
+        return self
+
+    def range(self, start, end):
+        self.range_ = (start, end)
+        return self
+
+    def upsert(self, rows, on_conflict="", ignore_duplicates=False):
+        self.payload = (rows, on_conflict, ignore_duplicates)
+        return self
+
+    def execute(self):
+        if self.payload is not None:
+            rows, on_conflict, ignore = self.payload
+            self.db.upserts.append((len(rows), on_conflict, ignore))
+            new = [r for r in rows if (r["user_id"], r["dedup_key"]) not in self.db.keys]
+            self.db.keys.update((r["user_id"], r["dedup_key"]) for r in rows)
+            return type("Resp", (), {"data": new})()
+        rows = [r for r in self.db.tables.get(self.table, []) if self.start is None or r["data_fk"] >= self.start]
+        if self.range_:
+            rows = rows[self.range_[0]:self.range_[1] + 1]
+        return type("Resp", (), {"data": rows})()
+
+
+class FakeSupabase:
+    def __init__(self, tables):
+        self.tables = tables
+        self.upserts = []
+        self.keys = set()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+def market_frame():
+    return pd.DataFrame({
+        "data_fk": ["2024-03-01", "2024-03-04", "2024-03-05", "2024-03-06"],
+        "valor_dolar": [5.00, 5.02, 5.15, 5.16],
+        "valor_jbs": [20.0, 20.1, 20.2, 19.5],
+        "valor_boi_gordo": [300.0, None, 301.0, 301.5],
+    })
+
+
+def test_change_pct_and_thresholds_evaluate_whole_window():
+    clima = pd.DataFrame({
+        "data_fk": [f"2024-03-{d:02d}" for d in range(1, 9)],
+        "chuva_mm": [0.5, 0.0, 0.2, 0.0, 0.3, 0.0, 0.1, 120.0],
+        "temp_max": [30, 31, 36.2, 32, 33, 34, 30, 29],
+    })
+    alerts = evaluate_rules({"fact_mercado": market_frame(), "fact_clima": clima}, DEFAULT_RULES)
+    fired = set(zip(alerts["rule_id"], alerts["data"]))
+
+    assert ("oscilacao_valor_dolar", "2024-03-05") in fired  # +2.59%
+    assert ("oscilacao_valor_jbs", "2024-03-06") in fired  # -3.47%
+    assert not any(rule.startswith("oscilacao_valor_boi") for rule, _ in fired)  # NaN no meio não dispara
+    assert ("temperatura_elevada", "2024-03-03") in fired
+    assert ("chuva_intensa", "2024-03-08") in fired
+    assert ("seca_7d", "2024-03-07") in fired  # 1.1mm em 7 dias
+    assert ("seca_7d", "2024-03-08") not in fired
+
+    recent = evaluate_rules({"fact_mercado": market_frame()}, DEFAULT_RULES, since=date(2024, 3, 6))
+    assert list(recent["rule_id"]) == ["oscilacao_valor_jbs"]
+
+
+def test_notifications_rendered_once_and_fanned_out_to_subscribers():
+    alerts = evaluate_rules({"fact_mercado": market_frame()}, DEFAULT_RULES, since=date(2024, 3, 5))
+    rows = build_notifications(alerts, DEFAULT_RULES, {"mercado": ["u1", "u2"], "clima": ["u3"]})
+
+    assert len(rows) == 4
+    dolar = next(r for r in rows if r["dedup_key"] == "oscilacao_valor_dolar:2024-03-05")
+    assert dolar["title"] == "📈 Oscilação detectada: Dólar"
+    assert dolar["body"] == "Dólar subiu 2.59% (de R$ 5.02 para R$ 5.15)"
+    assert {r["user_id"] for r in rows} == {"u1", "u2"}
+
+    custom = load_rules('[{"id": "dolar_6", "table": "fact_mercado", "column": "valor_dolar", "kind": "threshold", '
+                        '"op": ">", "value": 5.1, "title": "Dólar acima de 5,10", "body": "R$ {current:.2f} em {data}"}]')
+    assert list(evaluate_rules({"fact_mercado": market_frame()}, custom)["data"]) == ["2024-03-05", "2024-03-06"]
+
+
+def test_run_alerts_bulk_inserts_for_subscribed_users_without_duplicates():
+    db = FakeSupabase({
+        "fact_mercado": market_frame().to_dict("records"),
+        "profiles": [{"user_id": f"u{i}"} for i in range(1200)],
+        "alert_subscriptions": [
+            {"user_id": "u1", "enabled": False, "categories": ["mercado", "clima"]},
+            {"user_id": "u2", "enabled": True, "categories": ["clima"]},
+        ],
+    })
+
+    summary = run_alerts(db, ["fact_mercado"], today=date(2024, 3, 6))
+    assert summary == {"alerts": 2, "notifications": 2396, "inserted": 2396}
+    assert [size for size, _, _ in db.upserts] == [500, 500, 500, 500, 396]
+    assert all(conflict == "user_id,dedup_key" and ignore for _, conflict, ignore in db.upserts)
+    assert ("u1", "oscilacao_valor_jbs:2024-03-06") not in db.keys
+    assert ("u3", "oscilacao_valor_jbs:2024-03-06") in db.keys
+
+    # Reprocessar a mesma janela não gera notificações novas
+    assert run_alerts(db, ["fact_mercado"], today=date(2024, 3, 6))["inserted"] == 0
@@ -4,35 +4,37 @@ import sys
 import os
 import pytest
 
-# Add the parent directory to sys.path to allow importing main
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add the repository root to sys.path to allow importing the api package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from main import app
+from api.main import app
 
 client = TestClient(app)
 
 # Mock Supabase client
 @pytest.fixture
 def mock_supabase():
-    with patch("main.supabase") as mock:
+    with patch("api.main.supabase") as mock:
         yield mock
 
 def test_read_root():
-    response = client.get("/")
+    response = client.get("/api/")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok", "service": "AgroData Nexus API", "version": "1.0.0"}
+    data = response.json()
+    assert data["status"] == "ok"
+    assert data["service"] == "AgroData Nexus API"
+    assert data["version"] == "1.0.0"
 
-def test_health_check():
-    response = client.get("/health")
+def test_health_check(mock_supabase):
+    response = client.get("/api/health")
     assert response.status_code == 200
-    # The database status might vary depending on mocking, but 'status' should be 'healthy'
-    assert response.json()["status"] == "healthy"
+    assert response.json()["status"] == "online"
 
 def test_get_market_data_unauthorized(mock_supabase):
     # Should fail without token
     response = client.get("/api/market-data")
     assert response.status_code == 401
-    assert response.json() == {"detail": "Missing authorization header"}
+    assert response.json()["detail"] == "Missing authorization header"
 
 def test_get_market_data_success(mock_supabase):
     # Mock authentication
@@ -41,7 +43,7 @@ def test_get_market_data_success(mock_supabase):
     # Mock data query
     mock_response = MagicMock()
     mock_response.data = [{"data_fk": "2023-01-01", "valor_dolar": 5.0}]
-    mock_supabase.table.return_value.select.return_value.order.return_value.limit.return_value.execute.return_value = mock_response
+    mock_supabase.table.return_value.select.return_value.order.return_value.execute.return_value = mock_response
 
     # Test with token
     headers = {"Authorization": "Bearer fake-token"}
@@ -58,7 +60,7 @@ def test_get_climate_data_success(mock_supabase):
     # Mock data query
     mock_response = MagicMock()
     mock_response.data = [{"data_fk": "2023-01-01", "temp_max": 30.0, "chuva_mm": 10.0}]
-    mock_supabase.table.return_value.select.return_value.order.return_value.limit.return_value.execute.return_value = mock_response
+    mock_supabase.table.return_value.select.return_value.order.return_value.execute.return_value = mock_response
 
     headers = {"Authorization": "Bearer fake-token"}
     response = client.get("/api/climate-data", headers=headers)
@@ -78,7 +80,7 @@ def test_get_correlation_analysis(mock_supabase):
         {"data_fk": "2023-01-02", "valor_dolar": 2.0, "valor_jbs": 20.0, "valor_boi_gordo": 200.0},
         {"data_fk": "2023-01-03", "valor_dolar": 3.0, "valor_jbs": 30.0, "valor_boi_gordo": 300.0}
     ]
-    mock_supabase.table.return_value.select.return_value.order.return_value.limit.return_value.execute.return_value = mock_response
+    mock_supabase.table.return_value.select.return_value.order.return_value.execute.return_value = mock_response
 
     headers = {"Authorization": "Bearer token"}
     response = client.get("/api/analytics/correlation", headers=headers)
@@ -88,6 +90,7 @@ def test_get_correlation_analysis(mock_supabase):
     assert "correlation_matrix" in data
     # Check perfect correlation (1.0)
     assert data["correlation_matrix"]["valor_dolar"]["valor_jbs"] > 0.99
+    assert data["data_points"] == 3
 
 def test_get_volatility_analysis(mock_supabase):
     # Mock authentication
@@ -100,13 +103,38 @@ def test_get_volatility_analysis(mock_supabase):
         {"data_fk": "2023-01-02", "valor_dolar": 5.5, "valor_jbs": 22.0, "valor_boi_gordo": 210.0},
         {"data_fk": "2023-01-03", "valor_dolar": 4.5, "valor_jbs": 18.0, "valor_boi_gordo": 190.0}
     ]
-    mock_supabase.table.return_value.select.return_value.order.return_value.limit.return_value.execute.return_value = mock_response
+    mock_supabase.table.return_value.select.return_value.order.return_value.execute.return_value = mock_response
 
     headers = {"Authorization": "Bearer token"}
     response = client.get("/api/analytics/volatility", headers=headers)
     
     assert response.status_code == 200
     data = response.json()
-    assert "volatility" in data
-    assert "mean" in data
-    assert data["data_points"] == 3
+    # One monthly boxplot bucket (Jan/2023)
+    assert len(data) == 1
+    assert data[0]["ano"] == 2023 and data[0]["mes"] == 1
+    assert data[0]["min_boi"] == 190.0
+    assert data[0]["mediana_boi"] == 200.0
+    assert data[0]["max_dolar"] == 5.5
+
+def test_get_climate_data_location_filter_and_aggregate(mock_supabase):
+    mock_supabase.auth.get_user.return_value.user = {"id": "123", "email": "test"}
+
+    query = mock_supabase.table.return_value.select.return_value.order.return_value
+    mock_response = MagicMock()
+    mock_response.data = [
+        {"data_fk": "2023-01-01", "temp_max": 30.0, "chuva_mm": 10.0, "localizacao": "Sorriso"},
+        {"data_fk": "2023-01-01", "temp_max": 32.0, "chuva_mm": 20.0, "localizacao": "Sinop"},
+        {"data_fk": "2023-01-02", "temp_max": 31.0, "chuva_mm": None, "localizacao": "Sinop"},
+    ]
+    query.in_.return_value.execute.return_value = mock_response
+
+    headers = {"Authorization": "Bearer token"}
+    response = client.get("/api/climate-data?location=Sorriso,Sinop&aggregate=true", headers=headers)
+
+    assert response.status_code == 200
+    query.in_.assert_called_with("localizacao", ["Sorriso", "Sinop"])
+    assert response.json() == [
+        {"data_fk": "2023-01-01", "chuva_mm": 15.0, "temp_max": 31.0, "n_localizacoes": 2},
+        {"data_fk": "2023-01-02", "chuva_mm": None, "temp_max": 31.0, "n_localizacoes": 1},
+    ]
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import sys
+
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api import main
+from api.lib.events import EventBroker
+from api.lib.quote_store import QuoteStore
+
+client = TestClient(main.app)
+
+
+async def take(stream, count):
+    return [await stream.__anext__() for _ in range(count)]
+
+
+def test_stream_delivers_live_events_and_heartbeats():
+    broker = EventBroker(heartbeat=0.05)
+
+    async def scenario():
+        stream = broker.stream(types=["quote"])
+        first = await stream.__anext__()  # assina
+        broker.publish("fact_clima", {"rows": 3})  # filtrado
+        event = broker.publish("quote", {"key": "dolar", "value": 5.1})
+        frames = await take(stream, 2)
+        assert broker.stats()["subscribers"] == 1
+        await stream.aclose()
+        return first, event, frames
+
+    first, event, frames = asyncio.run(scenario())
+    assert first == "retry: 3000\n\n"
+    assert frames[0] == f'id: {event.id}\nevent: quote\ndata: {{"key":"dolar","value":5.1}}\n\n'
+    assert frames[1] == ": ping\n\n"
+    assert broker.stats()["subscribers"] == 0
+
+
+def test_replay_from_last_event_id_and_reset_when_evicted():
+    broker = EventBroker(replay_size=3)
+
+    async def scenario():
+        ids = [broker.publish("fact_mercado", {"n": n}).id for n in range(5)]
+        replayed = await take(broker.stream(last_event_id=ids[2]), 3)
+        evicted = await take(broker.stream(last_event_id=ids[0]), 2)
+        return ids, replayed, evicted
+
+    ids, replayed, evicted = asyncio.run(scenario())
+    assert [frame.split("\n")[0] for frame in replayed[1:]] == [f"id: {ids[3]}", f"id: {ids[4]}"]
+    assert "event: reset" in evicted[1]
+
+
+def test_slow_subscriber_is_disconnected():
+    broker = EventBroker(queue_size=2)
+
+    async def scenario():
+        stream = broker.stream()
+        await stream.__anext__()
+        for n in range(5):
+            broker.publish("quote", {"n": n})
+        frames = [frame async for frame in stream]
+        return frames
+
+    frames = asyncio.run(scenario())
+    assert len(frames) == 2  # o que coube na fila; o cliente reconecta com Last-Event-ID
+    assert broker.stats()["disconnected_slow"] == 1
+
+
+def test_quote_updates_are_published():
+    published = []
+
+    async def fetch(http_client):
+        return {"value": 5.1}
+
+    store = QuoteStore(on_update=published.append)
+    store.register("dolar", fetch, ttl=0)
+    asyncio.run(store.refresh())
+    asyncio.run(store.refresh())  # mesmo valor: sem evento
+
+    assert [entry.value for entry in published] == [{"value": 5.1}]
+
+
+def test_publish_endpoint_requires_token_and_known_type():
+    broker = EventBroker()
+    with patch("api.main.event_broker", broker), patch.dict(os.environ, {"EVENTS_PUBLISH_TOKEN": "secret"}), patch("api.main.supabase"):
+        ok = client.post("/api/events/publish", json={"type": "invalidate", "data": {"tables": ["fact_mercado"]}}, headers={"Authorization": "Bearer secret"})
+        bad = client.post("/api/events/publish", json={"type": "boom"}, headers={"Authorization": "Bearer secret"})
+        denied = client.post("/api/events/publish", json={"type": "invalidate"})
+        unknown = client.get("/api/events/stream?types=quote, boom", headers={"Authorization": "Bearer secret"})
+        not_object = [
+            client.post("/api/events/publish", content=raw, headers={"Authorization": "Bearer secret", "Content-Type": "application/json"})
+            for raw in ("[1]", "3", "null", "{bad")
+        ]
+
+    assert ok.status_code == 200
+    assert broker.stats()["buffered"] == 1
+    assert bad.status_code == 400
+    assert denied.status_code == 401
+    assert unknown.status_code == 400
+    assert unknown.json()["detail"] == "Unknown event types: boom"  # " quote" já vem sem espaço
+    assert [r.status_code for r in not_object] == [400, 400, 400, 400]
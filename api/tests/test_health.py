@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+import time
+
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api import main
+from api.lib.health import HealthMonitor, STATUS_DEGRADED, STATUS_ERROR, STATUS_OK
+from api.lib.quote_store import MemoryBackend, QuoteEntry
+
+client = TestClient(main.app)
+
+
+def test_monitor_runs_probes_and_caches_snapshot():
+    calls = []
+
+    def probe():
+        calls.append(1)
+        return {"status": STATUS_OK, "rows": 1}
+
+    monitor = HealthMonitor(interval=60)
+    monitor.register("db", probe)
+    assert monitor.is_stale()
+
+    asyncio.run(monitor.refresh())
+    ready, payload = monitor.readiness()
+    monitor.readiness()
+
+    assert ready
+    assert len(calls) == 1
+    assert payload["checks"]["db"]["rows"] == 1
+    assert not monitor.is_stale()
+
+
+def test_monitor_critical_failure_marks_not_ready():
+    def broken():
+        raise RuntimeError("boom")
+
+    monitor = HealthMonitor(interval=60)
+    monitor.register("db", broken, critical=True)
+    monitor.register("extra", lambda: {"status": STATUS_DEGRADED}, critical=False, blocking=False)
+    asyncio.run(monitor.refresh())
+
+    ready, payload = monitor.readiness()
+    assert not ready
+    assert payload["checks"]["db"]["status"] == STATUS_ERROR
+    assert payload["checks"]["db"]["error"] == "boom"
+
+
+def test_non_critical_failure_keeps_ready():
+    monitor = HealthMonitor(interval=60)
+    monitor.register("db", lambda: {"status": STATUS_OK})
+    monitor.register("redis", lambda: {"status": STATUS_ERROR}, critical=False)
+    asyncio.run(monitor.refresh())
+
+    ready, _ = monitor.readiness()
+    assert ready
+
+
+def test_live_touches_no_dependencies():
+    with patch.object(main, "supabase") as mock_supabase:
+        response = client.get("/api/health/live")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "alive"
+    mock_supabase.table.assert_not_called()
+
+
+def test_ready_reflects_cached_snapshot():
+    with patch.object(main, "supabase") as mock_supabase:
+        main.health_monitor._refreshed_at = None
+        first = client.get("/api/health/ready")
+        second = client.get("/api/health/ready")
+
+    assert first.status_code == 200
+    assert first.json()["checks"]["supabase"]["status"] == STATUS_OK
+    assert second.status_code == 200
+    # Segunda chamada usa o snapshot, sem nova query
+    assert mock_supabase.table.call_count == 1
+
+
+def test_ready_returns_503_when_supabase_missing():
+    with patch.object(main, "supabase", None):
+        main.health_monitor._refreshed_at = None
+        response = client.get("/api/health/ready")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "not_ready"
+
+
+def test_cache_probe_reports_quote_cache_warmth():
+    backend = MemoryBackend()
+    with patch.object(main.quote_store, "backend", backend):
+        cold = main.probe_cache()
+        for key in main.quote_store.keys:
+            backend.set(QuoteEntry(key, {"price": 1.0}, time.time(), 60))
+        warm = main.probe_cache()
+
+    assert cold["status"] == STATUS_DEGRADED and cold["entries"] == 0
+    assert warm == {"status": STATUS_OK, "backend": "memory", "warm": True,
+                    "entries": len(main.quote_store.keys), "keys": len(main.quote_store.keys)}
+
+
+def test_saturated_threadpool_degrades_without_failing_readiness():
+    _, critical, blocking = main.health_monitor._probes["threadpool"]
+    saturated = {"status": STATUS_DEGRADED, "saturated": True}
+    with patch.dict(main.health_monitor._probes, {"threadpool": (lambda: saturated, critical, blocking)}), \
+            patch.object(main, "supabase"):
+        main.health_monitor._refreshed_at = None
+        response = client.get("/api/health/ready")
+
+    assert response.status_code == 200
+    assert response.json()["checks"]["threadpool"]["saturated"] is True
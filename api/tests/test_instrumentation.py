@@ -0,0 +1,73 @@
+import json
+import logging
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api import main
+from api.lib.instrumentation import (
+    JsonFormatter,
+    RequestTimings,
+    current_timings,
+    end_request,
+    stage,
+    start_request,
+)
+
+client = TestClient(main.app)
+
+
+def test_stage_accumulates_per_request():
+    token = start_request()
+    try:
+        with stage("supabase"):
+            pass
+        with stage("supabase"):
+            pass
+        with stage("compute"):
+            pass
+        timings = current_timings()
+    finally:
+        end_request(token)
+
+    assert set(timings.stages) == {"supabase", "compute"}
+    header = timings.server_timing()
+    assert header.startswith("supabase;dur=")
+    assert "total;dur=" in header
+
+
+def test_stage_without_request_is_noop():
+    with stage("compute"):
+        value = 1
+    assert value == 1
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.LogRecord("agrodata.test", logging.INFO, __file__, 1, "request", (), None)
+    record.stages = {"auth": 1.5}
+    payload = json.loads(JsonFormatter().format(record))
+
+    assert payload["msg"] == "request"
+    assert payload["stages"] == {"auth": 1.5}
+    assert payload["level"] == "info"
+
+
+def test_server_timing_header_on_responses():
+    response = client.get("/api/health/live")
+    assert "total;dur=" in response.headers["Server-Timing"]
+
+
+def test_auth_stage_reported():
+    response = client.get("/api/market-data")
+    assert response.status_code == 401
+    assert "auth;dur=" in response.headers["Server-Timing"]
+
+
+def test_timings_total_is_positive():
+    timings = RequestTimings()
+    timings.add("compute", 2.0)
+    assert timings.total_ms() >= 0
+    assert timings.stages["compute"] == 2.0
@@ -0,0 +1,110 @@
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api import main
+from api.lib.metrics import MetricsRegistry, clear_multiproc_dir
+
+client = TestClient(main.app)
+
+
+def test_counter_and_histogram_render():
+    registry = MetricsRegistry(multiproc_dir=None)
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 3.0' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1.0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2.0' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2.0' in text
+    assert "latency_seconds_count 2.0" in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry(multiproc_dir=None)
+    counter = registry.counter("c_total", "C", ("path",))
+    counter.inc(path='a"b')
+    assert 'c_total{path="a\\"b"} 1.0' in registry.render()
+
+
+def test_multiprocess_states_are_aggregated(tmp_path):
+    def build(pid):
+        registry = MetricsRegistry(multiproc_dir=str(tmp_path), pid=pid)
+        counter = registry.counter("jobs_total", "Jobs")
+        histogram = registry.histogram("job_seconds", "Job duration", buckets=(1.0,))
+        gauge = registry.gauge("peak", "Peak", multiprocess_mode="max")
+        return registry, counter, histogram, gauge
+
+    worker_a, counter_a, hist_a, gauge_a = build(os.getpid())
+    worker_b, counter_b, hist_b, gauge_b = build(999999)
+
+    counter_a.inc(2)
+    hist_a.observe(0.5)
+    gauge_a.set(3)
+    counter_b.inc(5)
+    hist_b.observe(2.0)
+    gauge_b.set(7)
+    worker_b.flush()
+
+    text = worker_a.render()
+    assert "jobs_total 7.0" in text
+    assert 'job_seconds_bucket{le="1.0"} 1.0' in text
+    assert "job_seconds_count 2.0" in text
+    assert "peak 7.0" in text
+
+
+def test_master_start_clears_previous_worker_states(tmp_path):
+    previous = MetricsRegistry(multiproc_dir=str(tmp_path), pid=999999)
+    previous.counter("jobs_total", "Jobs").inc(5)
+    previous.flush()
+    (tmp_path / "other.txt").write_text("x")
+
+    assert clear_multiproc_dir(str(tmp_path)) == 1
+    assert clear_multiproc_dir(None) == 0
+
+    current = MetricsRegistry(multiproc_dir=str(tmp_path), pid=os.getpid())
+    current.counter("jobs_total", "Jobs").inc(1)
+    assert "jobs_total 1.0" in current.render()
+    assert (tmp_path / "other.txt").exists()
+
+
+def test_forked_workers_write_their_own_state(tmp_path):
+    # Como no gunicorn: registry criado no master, incrementado nos workers após o fork
+    registry = MetricsRegistry(multiproc_dir=str(tmp_path))
+    counter = registry.counter("jobs_total", "Jobs")
+
+    children = []
+    for amount in (2, 3):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                counter.inc(amount)
+                registry.flush()
+            finally:
+                os._exit(0)
+        children.append(pid)
+    for pid in children:
+        assert os.waitpid(pid, 0)[1] == 0
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(f"metrics_{pid}.json" for pid in children)
+    assert "jobs_total 5.0" in registry.render()
+
+
+def test_metrics_endpoint_reports_requests():
+    client.get("/api/health/live")
+    response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/api/health/live",status="200"}' in response.text
+    assert "http_request_duration_seconds_bucket" in response.text
@@ -0,0 +1,120 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from postgrest import SyncPostgrestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api import main
+from api.lib.notifications import UnreadCounter, decode_cursor, encode_cursor, fetch_page
+
+client = TestClient(main.app)
+
+
+def rest(handler):
+    """Builder real do postgrest-py contra um PostgREST simulado (MockTransport)"""
+    postgrest = SyncPostgrestClient("http://db/rest/v1")
+    postgrest.session = httpx.Client(
+        base_url="http://db/rest/v1", headers=postgrest.session.headers, transport=httpx.MockTransport(handler)
+    )
+    return SimpleNamespace(table=postgrest.from_)
+
+
+def rows(*ids):
+    return [{"id": i, "user_id": "u1", "title": "t", "body": "b", "created_at": f"2024-03-0{i}T12:00:00+00:00", "is_read": False} for i in ids]
+
+
+def test_keyset_page_uses_index_order_and_opaque_cursor():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=rows(5, 4, 3))
+
+    page, cursor = fetch_page(rest(handler), "u1", limit=2)
+    assert [r["id"] for r in page] == [5, 4]
+    assert decode_cursor(cursor) == ("2024-03-04T12:00:00+00:00", 4)
+
+    fetch_page(rest(handler), "u1", limit=2, cursor=cursor)
+    first, second = (request.url.params for request in requests)
+    assert first["order"] == "created_at.desc,id.desc"
+    assert first["limit"] == "3"
+    assert first.get_list("or") == ["(user_id.eq.u1,user_id.is.null)"]
+    assert second.get_list("or")[1] == '(created_at.lt."2024-03-04T12:00:00+00:00",and(created_at.eq."2024-03-04T12:00:00+00:00",id.lt.4))'
+
+    with pytest.raises(ValueError):
+        decode_cursor("não-é-cursor")
+    # Decodifica, mas created_at não é timestamp (iria direto para o filtro)
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor({"created_at": '2024",id.gt.0', "id": 1}))
+
+
+def test_list_endpoint_returns_page_and_caches_unread_count():
+    counts = []
+
+    def handler(request):
+        if "count=exact" in request.headers.get("prefer", ""):
+            counts.append(request.url.params["is_read"])
+            return httpx.Response(200, json=[{"id": 5}], headers={"Content-Range": "0-0/7"})
+        return httpx.Response(200, json=rows(5))
+
+    with patch("api.main.ensure_supabase", return_value=rest(handler)), \
+            patch("api.main.get_user_from_request", return_value={"id": "u1"}), \
+            patch("api.main.unread_counter", UnreadCounter()):
+        first = client.get("/api/notifications?limit=10", headers={"Authorization": "Bearer t"})
+        count = client.get("/api/notifications/unread-count", headers={"Authorization": "Bearer t"})
+        bad = client.get("/api/notifications?cursor=xx", headers={"Authorization": "Bearer t"})
+
+    assert first.status_code == 200
+    assert first.json() == {"items": rows(5), "next_cursor": None, "unread_count": 7}
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert count.json() == {"unread_count": 7}
+    assert counts == ["eq.false"]  # segunda leitura veio do cache
+    assert bad.status_code == 400
+
+
+def test_bulk_mark_read_is_one_statement_and_adjusts_counter():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.method == "PATCH":
+            assert json.loads(request.content) == {"is_read": True}
+            return httpx.Response(200, json=rows(1, 3))
+        if request.method == "DELETE":
+            found = request.url.params["id"] == "eq.2"
+            return httpx.Response(200, json=rows(2) if found else [])
+        raise AssertionError(f"unexpected {request.method}")
+
+    counter = UnreadCounter()
+    counter.set("u1", 7)
+    with patch("api.main.ensure_supabase", return_value=rest(handler)), \
+            patch("api.main.get_user_from_request", return_value={"id": "u1"}), \
+            patch("api.main.unread_counter", counter):
+        marked = client.post("/api/notifications/read", json={"ids": [3, 1, 3]})
+        invalid = client.post("/api/notifications/read", json={"ids": ["1"]})
+        not_object = [
+            client.post("/api/notifications/read", content=raw, headers={"Content-Type": "application/json"})
+            for raw in ("[1, 2]", "7", "null", "{bad")
+        ]
+        deleted = client.delete("/api/notifications/2")
+        missing = client.delete("/api/notifications/9")
+        marked_all = client.post("/api/notifications/read", json={"all": True})
+
+    assert marked.json() == {"updated": 2, "unread_count": 5}
+    patch_params = requests[0].url.params
+    assert (patch_params["id"], patch_params["user_id"], patch_params["is_read"]) == ("in.(1,3)", "eq.u1", "eq.false")
+    assert invalid.status_code == 400
+    assert [r.status_code for r in not_object] == [400, 400, 400, 400]
+    assert deleted.json()["success"] is True
+    assert missing.status_code == 404
+    assert marked_all.json()["unread_count"] == 0
+    assert "id" not in requests[-1].url.params
+    assert [r.method for r in requests] == ["PATCH", "DELETE", "DELETE", "PATCH"]
+    assert counter.get("u1") == 0
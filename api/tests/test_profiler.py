@@ -0,0 +1,93 @@
+import os
+import sys
+
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api import main
+from api.lib.profiler import ProfileStore, RequestProfiler
+
+client = TestClient(main.app)
+
+MARKET_ROWS = [
+    {"data_fk": "2023-01-01", "valor_dolar": 5.0, "valor_jbs": 20.0, "valor_boi_gordo": 200.0},
+    {"data_fk": "2023-01-02", "valor_dolar": 5.5, "valor_jbs": 22.0, "valor_boi_gordo": 210.0},
+]
+
+
+def mock_backend(mock_supabase, role):
+    mock_supabase.auth.get_user.return_value.user = {"id": "123", "email": "admin@example.com"}
+    market = MagicMock()
+    market.data = MARKET_ROWS
+    mock_supabase.table.return_value.select.return_value.order.return_value.execute.return_value = market
+    roles = MagicMock()
+    roles.data = [{"role": role}]
+    mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = roles
+
+
+def test_profiler_collects_top_frames():
+    with RequestProfiler() as profiler:
+        sorted(range(1000), key=lambda x: -x)
+
+    frames = profiler.top_frames(limit=5)
+    assert profiler.enabled
+    assert frames
+    assert {"function", "calls", "tottime_ms", "cumtime_ms"} <= set(frames[0])
+
+
+def test_store_is_bounded_ring_buffer_with_size_cap():
+    store = ProfileStore(max_entries=2, max_bytes=400)
+    frames = [{"function": f"f{i}", "calls": 1, "tottime_ms": 0.1, "cumtime_ms": 0.1} for i in range(50)]
+    ids = [store.add({"path": "/x", "top_frames": frames}) for _ in range(3)]
+
+    listed = store.list()
+    assert [e["id"] for e in listed] == [ids[2], ids[1]]
+    assert "top_frames" not in listed[0]
+    assert store.get(ids[0]) is None
+    assert 0 < len(store.get(ids[2])["top_frames"]) < 50
+
+
+def test_profile_param_requires_admin():
+    with patch.object(main, "supabase") as mock_supabase:
+        mock_backend(mock_supabase, role="gestor")
+        response = client.get("/api/analytics/volatility?profile=1", headers={"Authorization": "Bearer t"})
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_admin_profile_is_stored_and_readable():
+    with patch.object(main, "supabase") as mock_supabase:
+        mock_backend(mock_supabase, role="admin")
+        headers = {"Authorization": "Bearer t"}
+        response = client.get("/api/analytics/volatility?profile=1", headers=headers)
+        profile_id = response.headers["X-Profile-Id"]
+
+        listed = client.get("/api/admin/profiles", headers=headers).json()
+        detail = client.get(f"/api/admin/profiles/{profile_id}", headers=headers).json()
+
+    assert any(p["id"] == profile_id for p in listed)
+    assert detail["path"] == "/api/analytics/volatility"
+    assert detail["trigger"] == "explicit"
+    assert detail["top_frames"]
+
+
+def test_profiles_endpoint_forbidden_for_non_admin():
+    with patch.object(main, "supabase") as mock_supabase:
+        mock_backend(mock_supabase, role="gestor")
+        response = client.get("/api/admin/profiles", headers={"Authorization": "Bearer t"})
+
+    assert response.status_code == 403
+
+
+def test_profile_param_without_supabase_is_a_plain_request():
+    with patch.object(main, "supabase", None), \
+            patch.object(main, "get_user_from_request_optional") as resolve_user:
+        response = client.get("/api/analytics/volatility?profile=1", headers={"Authorization": "Bearer t"})
+
+    resolve_user.assert_not_called()
+    assert "X-Profile-Id" not in response.headers
+    # Erro tratado pela própria rota, não uma exceção vazando do middleware
+    assert response.json()["detail"] == "Supabase not configured"
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+import time
+
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api import main
+from api.lib.quote_store import MemoryBackend, QuoteEntry, QuoteStore, RedisBackend
+
+client = TestClient(main.app)
+
+
+def counting_fetcher(values, delay=0.05):
+    calls = []
+
+    async def fetch(http_client):
+        calls.append(1)
+        await asyncio.sleep(delay)
+        value = values[min(len(calls), len(values)) - 1]
+        if isinstance(value, Exception):
+            raise value
+        return {"value": value, "source": "test"}
+
+    return fetch, calls
+
+
+def test_concurrent_refreshes_share_one_fetch():
+    fetch, calls = counting_fetcher([5.1])
+    store = QuoteStore()
+    store.register("dolar", fetch, ttl=60)
+
+    async def scenario():
+        await asyncio.gather(store.refresh(["dolar"]), store.refresh(["dolar"]), store.refresh())
+        return store.trigger(["dolar"])
+
+    asyncio.run(scenario())
+    entry = store.get("dolar")
+    assert len(calls) == 1
+    assert entry.value["value"] == 5.1
+    assert not entry.is_stale()
+    assert store.last_refresh_ok is not None
+
+
+def test_failed_refresh_keeps_last_value_and_stale_read_revalidates():
+    fetch, calls = counting_fetcher([5.1, RuntimeError("PTAX fora"), 5.3], delay=0)
+    store = QuoteStore()
+    store.register("dolar", fetch, ttl=60)
+
+    async def scenario():
+        await store.refresh()
+        await store.refresh()  # falha
+        failed = store.backend.get("dolar")
+        store.backend.set(QuoteEntry("dolar", failed.value, time.time() - 120, 60))
+        stale = store.get("dolar")  # vencida: responde na hora e agenda o refresh
+        await asyncio.gather(*store._inflight.values())
+        return failed, stale
+
+    failed, stale = asyncio.run(scenario())
+    assert failed.value["value"] == 5.1
+    assert failed.error == "RuntimeError: PTAX fora"
+    assert stale.value["value"] == 5.1 and stale.is_stale()
+    assert store.backend.get("dolar").value["value"] == 5.3
+    assert len(calls) == 3
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_redis_backend_shares_quotes_and_refresh_lock():
+    redis = FakeRedis()
+    fetch, calls = counting_fetcher([40.0], delay=0)
+    writer, reader = QuoteStore(RedisBackend(redis)), QuoteStore(RedisBackend(redis))
+    for store in (writer, reader):
+        store.register("jbs", fetch, ttl=60)
+
+    redis.set("agrodata:quotes:lock:jbs", "1")  # outra réplica buscando
+    asyncio.run(writer.refresh(["jbs"]))
+    assert calls == []
+
+    redis.delete("agrodata:quotes:lock:jbs")
+    asyncio.run(writer.refresh(["jbs"]))
+    assert reader.backend.get("jbs").value["value"] == 40.0
+    assert "agrodata:quotes:lock:jbs" not in redis.data
+    assert len(calls) == 1
+
+
+def test_realtime_endpoints_answer_from_store():
+    store = QuoteStore(MemoryBackend())
+    now = time.time()
+    for key, value in {"dolar": 5.12, "jbs": 31.4, "boi_gordo": 305.0}.items():
+        store.register(key, counting_fetcher([value])[0], ttl=600)
+        store.backend.set(QuoteEntry(key, {"value": value, "source": "test"}, now, 600))
+    key = store.register_weather(main.DEFAULT_LAT, main.DEFAULT_LON)
+    store.register(key, counting_fetcher([{"temp": 31.5}])[0], ttl=600)  # sem rede
+    store.backend.set(QuoteEntry(key, {"temp": 31.5, "weather_code": 2}, now, 600))
+
+    headers = {"Authorization": "Bearer fake-token"}
+    with patch("api.main.supabase") as mock_supabase, patch("api.main.quote_store", store):
+        mock_supabase.auth.get_user.return_value.user = {"id": "123", "email": "test@example.com"}
+        market = client.get("/api/realtime/market", headers=headers).json()
+        weather = client.get("/api/realtime/weather", headers=headers).json()
+        refresh = client.post("/api/realtime/refresh", headers=headers).json()
+        status = client.get("/api/realtime/status", headers=headers).json()
+
+    assert market["valor_dolar"] == 5.12
+    assert market["market"]["boi_gordo"]["value"] == 305.0
+    assert market["sources"]["jbs"]["stale"] is False
+    assert weather["temp"] == 31.5
+    assert weather["current"]["temperature"] == 31.5
+    assert sorted(refresh["refresh"]["scheduled"]) == sorted(["dolar", "jbs", "boi_gordo", key])
+    assert refresh["market"]["valor_jbs"] == 31.4
+    assert status["last_market_at"] is not None
+    assert status["last_weather_at"] is not None
@@ -0,0 +1,46 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api.lib.serialization import frame_to_records, json_float
+
+
+def test_frame_to_records_nulls_nan_inf_and_nat():
+    df = pd.DataFrame({
+        "data_fk": pd.to_datetime(["2024-01-01", None, "2024-01-03"]),
+        "valor_dolar": [5.1, np.nan, np.inf],
+        "valor_jbs": pd.array([1, None, 3], dtype="Int64"),
+        "ano": [2024, 2024, 2024],
+        "texto": ["a", None, float("-inf")],
+    })
+
+    records = frame_to_records(df)
+
+    assert records == [
+        {"data_fk": "2024-01-01", "valor_dolar": 5.1, "valor_jbs": 1, "ano": 2024, "texto": "a"},
+        {"data_fk": None, "valor_dolar": None, "valor_jbs": None, "ano": 2024, "texto": None},
+        {"data_fk": "2024-01-03", "valor_dolar": None, "valor_jbs": 3, "ano": 2024, "texto": None},
+    ]
+    json.dumps(records, allow_nan=False)
+    assert type(records[0]["ano"]) is int and type(records[0]["valor_dolar"]) is float
+
+
+def test_frame_to_records_matches_to_dict_on_clean_data():
+    df = pd.DataFrame({"data_fk": ["2024-01-01", "2024-01-02"], "valor": [1.5, 2.5], "n": [1, 2]})
+
+    assert frame_to_records(df) == df.to_dict("records")
+    assert frame_to_records(df, ["valor"]) == [{"valor": 1.5}, {"valor": 2.5}]
+    assert frame_to_records(df.iloc[0:0]) == []
+
+
+def test_json_float():
+    assert json_float("5.25") == 5.25
+    assert json_float(None) is None
+    assert json_float(float("nan")) is None
+    assert json_float(float("inf")) is None
+    assert json_float("abc") is None
@@ -0,0 +1,147 @@
+"""
+Benchmark dos endpoints da API contra um Supabase fake em memória
+
+Uso:
+    python benchmarks/bench_api.py --years 1 5 10 30 --iterations 20
+    python benchmarks/compare.py benchmarks/results/<antes>.json benchmarks/results/<depois>.json
+
+Mede latência (p50/p95/p99), throughput e pico de memória (tracemalloc) por
+endpoint e tamanho de dados, e grava JSON em benchmarks/results/<commit>.json.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# Sem rate limit e sem log por request durante o benchmark
+os.environ.setdefault("RATE_LIMIT_REQUESTS", "1000000000")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import pandas as pd  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api import main  # noqa: E402
+from synthetic import build_fake_supabase  # noqa: E402
+
+ENDPOINTS = [
+    ("market-data", "/api/market-data"),
+    ("climate-data", "/api/climate-data"),
+    ("correlation", "/api/analytics/correlation"),
+    ("volatility", "/api/analytics/volatility"),
+    ("lag-view", "/api/analytics/lag"),
+    ("lag-raw", "/api/analytics/lag?lag_days=30"),
+]
+HEADERS = {"Authorization": "Bearer benchmark"}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def bench_endpoint(client: TestClient, path: str, iterations: int, warmup: int, memory_iterations: int) -> dict:
+    for _ in range(warmup):
+        response = client.get(path, headers=HEADERS)
+        response.raise_for_status()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        response = client.get(path, headers=HEADERS)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+
+    # Memória medida em passada separada (tracemalloc distorce a latência)
+    peaks = []
+    for _ in range(memory_iterations):
+        tracemalloc.start()
+        client.get(path, headers=HEADERS)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "response_bytes": len(response.content),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "throughput_rps": round(iterations / elapsed, 2),
+        "peak_memory_kb": round(max(peaks) / 1024, 1) if peaks else None,
+    }
+
+
+def run(years_list, iterations: int, warmup: int, memory_iterations: int, only=None) -> dict:
+    client = TestClient(main.app)
+    results = []
+    original = main.supabase
+    try:
+        for years in years_list:
+            fake = build_fake_supabase(years)
+            main.supabase = fake
+            rows = {name: len(table.rows) for name, table in fake.tables.items()}
+            for name, path in ENDPOINTS:
+                if only and name not in only:
+                    continue
+                stats = bench_endpoint(client, path, iterations, warmup, memory_iterations)
+                results.append({"endpoint": name, "path": path, "years": years, "rows": rows, **stats})
+                print(f"{name:<14} {years:>3}y  p50={stats['p50_ms']:>9.2f}ms  p95={stats['p95_ms']:>9.2f}ms  "
+                      f"{stats['throughput_rps']:>8.1f} req/s  peak={stats['peak_memory_kb']}KB")
+    finally:
+        main.supabase = original
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "iterations": iterations,
+        },
+        "results": results,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark dos endpoints da API")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 10, 30])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--memory-iterations", type=int, default=2)
+    parser.add_argument("--endpoints", nargs="*", help="Subconjunto de endpoints (ex.: correlation lag-raw)")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    report = run(args.years, args.iterations, args.warmup, args.memory_iterations, args.endpoints)
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Resultados gravados em {output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,59 @@
+"""
+Benchmark do parser do IMEA (scripts/imea_scraper.py) vs parser antigo do data_fetcher
+
+Uso:
+    python benchmarks/bench_imea_parser.py --repeat 20
+    python benchmarks/bench_imea_parser.py --html pagina_salva.html
+
+Roda sobre páginas salvas (por padrão a fixture dos testes). O parser antigo monta a
+árvore inteira com html.parser e varre todas as <tr>; os novos só tocam a linha da
+região (selectolax/lxml aparecem apenas se estiverem instalados).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(os.path.dirname(BENCH_DIR), "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+
+from imea_scraper import IMEA_REGION, available_parsers, parse_full_tree  # noqa: E402
+
+DEFAULT_FIXTURE = os.path.join(SCRIPTS_DIR, "tests", "fixtures", "imea_indicador_boi.html")
+
+
+def best_of(fn, html: str, region: str, repeat: int):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(html, region)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark do parser do IMEA")
+    parser.add_argument("--html", nargs="+", default=[DEFAULT_FIXTURE], help="Páginas salvas do indicador")
+    parser.add_argument("--region", default=IMEA_REGION)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    parsers = {"antigo (árvore)": parse_full_tree, **available_parsers()}
+    for path in args.html:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        print(f"📊 {os.path.basename(path)} ({len(html) / 1024:.0f} KB), melhor de {args.repeat}\n")
+        print(f"{'parser':<18}{'ms':>9}{'páginas/s':>11}{'speedup':>9}   preço")
+        baseline = None
+        for name, fn in parsers.items():
+            elapsed, price = best_of(fn, html, args.region, args.repeat)
+            baseline = baseline or elapsed
+            print(f"{name:<18}{elapsed * 1000:>9.2f}{1 / elapsed:>11.0f}{baseline / elapsed:>8.1f}x   {price}")
+        print()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,67 @@
+"""
+Benchmark do parser numérico (scripts/number_parser.py) vs conversão antiga do import_csv
+
+Uso:
+    python benchmarks/bench_number_parser.py --rows 1000000 --repeat 3
+
+Cenários: coluna já float (caminho rápido), texto en ("5.3829") e texto pt-BR
+("1.234,56"). O parser antigo é incorreto no cenário en (remove o ponto decimal);
+a coluna "correto" indica se o resultado bate com o valor original.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "scripts"))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from number_parser import parse_numeric  # noqa: E402
+
+
+def legacy_parse(values: pd.Series) -> pd.Series:
+    """Conversão anterior do import_csv: astype(str) + dois replaces em toda coluna"""
+    cleaned = values.astype(str).str.replace(".", "", regex=False).str.replace(",", ".", regex=False).str.strip()
+    return pd.to_numeric(cleaned, errors="coerce")
+
+
+def scenarios(rows: int, seed: int = 42) -> dict:
+    rng = np.random.default_rng(seed)
+    values = np.round(rng.uniform(1, 5000, rows), 2)
+    en = pd.Series(values.astype(str))
+    pt = pd.Series([f"{v:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".") for v in values])
+    return {"float": (pd.Series(values), values), "texto en": (en, values), "texto pt-BR": (pt, values)}
+
+
+def best_of(fn, series: pd.Series, repeat: int):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(series)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark do parser numérico")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"📊 {args.rows} linhas, melhor de {args.repeat}\n")
+    print(f"{'cenário':<14}{'antigo (s)':>12}{'novo (s)':>10}{'speedup':>9}   correto (antigo/novo)")
+    for name, (series, expected) in scenarios(args.rows).items():
+        old_time, old_result = best_of(legacy_parse, series, args.repeat)
+        new_time, new_result = best_of(parse_numeric, series, args.repeat)
+        old_ok = np.allclose(old_result.to_numpy(dtype=float), expected, equal_nan=True)
+        new_ok = np.allclose(new_result.to_numpy(dtype=float), expected, equal_nan=True)
+        print(f"{name:<14}{old_time:>12.3f}{new_time:>10.3f}{old_time / new_time:>8.1f}x   {'✅' if old_ok else '❌'} / {'✅' if new_ok else '❌'}")
+
+
+if __name__ == "__main__":
+    main_cli()
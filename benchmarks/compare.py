@@ -0,0 +1,50 @@
+"""
+Compara dois arquivos de resultado do benchmark e aponta regressões
+
+Uso:
+    python benchmarks/compare.py antes.json depois.json [--metric p50_ms] [--threshold 10]
+Sai com código 1 se alguma métrica piorar mais que o threshold (%).
+"""
+
+import argparse
+import json
+import sys
+
+HIGHER_IS_BETTER = {"throughput_rps"}
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        report = json.load(f)
+    return {(r["endpoint"], r["years"]): r for r in report["results"]}, report["meta"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara resultados de benchmark")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p50_ms")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regressão máxima tolerada (%%)")
+    args = parser.parse_args()
+
+    base, base_meta = load(args.baseline)
+    cand, cand_meta = load(args.candidate)
+    print(f"{args.metric}: {base_meta['commit']} -> {cand_meta['commit']}\n")
+
+    regressions = 0
+    for key in sorted(set(base) & set(cand)):
+        before = base[key][args.metric]
+        after = cand[key][args.metric]
+        if not before or after is None:
+            continue
+        change = (after - before) / before * 100
+        worse = -change if args.metric in HIGHER_IS_BETTER else change
+        flag = "❌" if worse > args.threshold else ("✅" if worse < -args.threshold else "  ")
+        regressions += worse > args.threshold
+        print(f"{flag} {key[0]:<14} {key[1]:>3}y  {before:>10.2f} -> {after:>10.2f}  ({change:+.1f}%)")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
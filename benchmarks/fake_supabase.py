@@ -0,0 +1,136 @@
+"""
+Stand-in local do cliente Supabase para benchmarks
+Implementa o subconjunto do query builder usado pela API
+(select/order/gte/lte/eq/in_/limit/range/execute) sobre tabelas em memória.
+"""
+
+from bisect import bisect_left, bisect_right
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+
+class FakeResponse:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, table: "FakeTable"):
+        self._table = table
+        self._columns: Optional[List[str]] = None
+        self._count = None
+        self._filters: List = []
+        self._order: Optional[tuple] = None
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._range_filters: Dict[str, List[Optional[str]]] = {}
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "FakeQuery":
+        if columns.strip() != "*":
+            self._columns = [c.strip() for c in columns.split(",")]
+        self._count = count
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "FakeQuery":
+        self._order = (column, desc)
+        return self
+
+    def _bound(self, column: str, index: int, value) -> "FakeQuery":
+        bounds = self._range_filters.setdefault(column, [None, None])
+        bounds[index] = value
+        return self
+
+    def gte(self, column: str, value) -> "FakeQuery":
+        return self._bound(column, 0, value)
+
+    def lte(self, column: str, value) -> "FakeQuery":
+        return self._bound(column, 1, value)
+
+    def eq(self, column: str, value) -> "FakeQuery":
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column: str, values) -> "FakeQuery":
+        allowed = set(values)
+        self._filters.append(lambda row: row.get(column) in allowed)
+        return self
+
+    def limit(self, count: int) -> "FakeQuery":
+        self._limit = count
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def execute(self) -> FakeResponse:
+        rows = self._table.scan(self._range_filters)
+        for predicate in self._filters:
+            rows = [row for row in rows if predicate(row)]
+        if self._order:
+            column, desc = self._order
+            if column != self._table.key or desc:
+                rows = sorted(rows, key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        total = len(rows)
+        if self._table.max_rows is not None:
+            rows = rows[self._offset:self._offset + min(self._limit or self._table.max_rows, self._table.max_rows)]
+        elif self._limit is not None or self._offset:
+            rows = rows[self._offset:self._offset + self._limit if self._limit is not None else None]
+        if self._columns:
+            rows = [{c: row.get(c) for c in self._columns} for row in rows]
+        else:
+            rows = [dict(row) for row in rows]
+        return FakeResponse(rows, total if self._count else None)
+
+
+class FakeTable:
+    """Tabela ordenada pela chave; filtros de intervalo na chave usam bisect (como um índice)"""
+
+    def __init__(self, key: str, rows: List[Dict[str, Any]], max_rows: Optional[int] = None):
+        self.key = key
+        self.max_rows = max_rows
+        self.rows = sorted(rows, key=lambda row: row[key])
+        self._keys = [row[key] for row in self.rows]
+
+    def scan(self, range_filters: Dict[str, List[Optional[str]]]) -> List[Dict[str, Any]]:
+        lo, hi = 0, len(self.rows)
+        if self.key in range_filters:
+            low, high = range_filters[self.key]
+            if low is not None:
+                lo = bisect_left(self._keys, low)
+            if high is not None:
+                hi = bisect_right(self._keys, high)
+        rows = self.rows[lo:hi]
+        for column, (low, high) in range_filters.items():
+            if column == self.key:
+                continue
+            rows = [
+                row for row in rows
+                if row.get(column) is not None
+                and (low is None or row[column] >= low)
+                and (high is None or row[column] <= high)
+            ]
+        return rows
+
+
+class FakeAuth:
+    def __init__(self, user: Dict[str, Any]):
+        self._user = user
+
+    def get_user(self, token: str):
+        return SimpleNamespace(user=SimpleNamespace(**self._user))
+
+
+class FakeSupabase:
+    """Cliente fake: client.table(name) / client.auth.get_user(token)"""
+
+    def __init__(self, tables: Dict[str, FakeTable], user: Optional[Dict[str, Any]] = None):
+        self.tables = tables
+        self.auth = FakeAuth(user or {"id": "00000000-0000-0000-0000-000000000001", "email": "bench@example.com"})
+
+    def table(self, name: str) -> FakeQuery:
+        if name not in self.tables:
+            raise KeyError(f"relation '{name}' does not exist")
+        return FakeQuery(self.tables[name])
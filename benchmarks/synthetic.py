@@ -0,0 +1,72 @@
+"""
+Dados sintéticos de fact_mercado / fact_clima para benchmarks
+Mercado: dias úteis com random walk; clima: dias corridos com chuva sazonal.
+"""
+
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from fake_supabase import FakeSupabase, FakeTable
+
+
+def generate_market(years: int, end: date = date(2025, 12, 31), seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=252 * years)
+    n = len(dates)
+
+    def walk(start: float, vol: float) -> np.ndarray:
+        return np.round(start * np.exp(np.cumsum(rng.normal(0, vol, n))), 4)
+
+    return pd.DataFrame({
+        "data_fk": dates.strftime("%Y-%m-%d"),
+        "valor_dolar": walk(2.5, 0.006),
+        "valor_jbs": walk(15.0, 0.015),
+        "valor_boi_gordo": walk(120.0, 0.008),
+    })
+
+
+def generate_climate(years: int, end: date = date(2025, 12, 31), seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=end, periods=365 * years, freq="D")
+    n = len(dates)
+    # Estação chuvosa (out-abr) no Mato Grosso
+    wet = np.isin(dates.month, [10, 11, 12, 1, 2, 3, 4])
+    rain = np.where(rng.random(n) < np.where(wet, 0.55, 0.08), rng.gamma(2.0, 8.0, n), 0.0)
+    return pd.DataFrame({
+        "data_fk": dates.strftime("%Y-%m-%d"),
+        "chuva_mm": np.round(rain, 2),
+        "temp_max": np.round(30 + 4 * np.sin(2 * np.pi * dates.dayofyear / 365) + rng.normal(0, 1.5, n), 2),
+        "localizacao": "Mato Grosso",
+    })
+
+
+def build_lag_view(market: pd.DataFrame, climate: pd.DataFrame, lag_days: int = 60) -> pd.DataFrame:
+    """Equivalente em pandas de view_lag_chuva_60d_boi"""
+    view = pd.DataFrame({"data_preco": market["data_fk"], "valor_boi_gordo": market["valor_boi_gordo"]})
+    preco = pd.to_datetime(view["data_preco"])
+    view["ano_preco"] = preco.dt.year
+    view["mes_preco"] = preco.dt.month
+    original = (preco - pd.Timedelta(days=lag_days)).dt.strftime("%Y-%m-%d")
+    rain = climate.set_index("data_fk")["chuva_mm"]
+    view["chuva_mm_lag_60d"] = original.map(rain)
+    view["data_chuva_original"] = original.where(view["chuva_mm_lag_60d"].notna(), None)
+    return view
+
+
+def _records(df: pd.DataFrame) -> List[Dict]:
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def build_fake_supabase(years: int) -> FakeSupabase:
+    market = generate_market(years)
+    climate = generate_climate(years)
+    view = build_lag_view(market, climate)
+    return FakeSupabase({
+        "fact_mercado": FakeTable("data_fk", _records(market)),
+        "fact_clima": FakeTable("data_fk", _records(climate)),
+        "view_lag_chuva_60d_boi": FakeTable("data_preco", _records(view)),
+        "user_roles": FakeTable("user_id", [{"user_id": "00000000-0000-0000-0000-000000000001", "role": "admin"}]),
+    })
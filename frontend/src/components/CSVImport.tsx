@@ -256,17 +256,20 @@ export function CSVImport({ type }: CSVImportProps) {
               throw new Error("Colunas climáticas não encontradas");
             }
 
+            // Sem coluna de local, vale o default da tabela (mesma região do data_fetcher)
             const record = {
               data_fk: parsedDate,
               temp_max: parseNumber(row[tempIndex]),
               chuva_mm: parseNumber(row[chuvaIndex]),
-              localizacao:
-                locIndex !== -1 && row[locIndex]
-                  ? cleanText(row[locIndex])
-                  : "SP",
+              ...(locIndex !== -1 && row[locIndex]
+                ? { localizacao: cleanText(row[locIndex]) }
+                : {}),
             };
 
-            const { error } = await supabase.from("fact_clima").insert(record);
+            // Chave natural (data_fk, localizacao): reimportar atualiza em vez de falhar
+            const { error } = await supabase
+              .from("fact_clima")
+              .upsert(record, { onConflict: "data_fk,localizacao" });
 
             if (error) throw error;
             successCount++;
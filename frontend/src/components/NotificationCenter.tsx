@@ -1,5 +1,5 @@
 import { useEffect } from "react";
-import { Bell, Trash2, Info } from "lucide-react";
+import { Bell, Trash2, Info, CheckCheck } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { ScrollArea } from "@/components/ui/scroll-area";
 import {
@@ -22,7 +22,9 @@ function NotificationItem({ notification, onDelete }: NotificationItemProps) {
     <div
       className={cn(
         "flex items-start gap-3 p-3 rounded-lg border transition-colors",
-        "bg-primary/5 border-primary/20",
+        notification.is_read
+          ? "bg-background border-border"
+          : "bg-primary/5 border-primary/20",
       )}
     >
       <div className="mt-0.5">
@@ -64,6 +66,9 @@ export function NotificationCenter() {
     notifications,
     unreadCount,
     isLoading,
+    hasMore,
+    loadMore,
+    markAsRead,
     deleteNotification,
     requestPermission,
   } = useNotifications();
@@ -93,6 +98,17 @@ export function NotificationCenter() {
       <PopoverContent className="w-96 p-0" align="end">
         <div className="flex items-center justify-between px-4 py-3 border-b">
           <h3 className="font-semibold text-sm">Notificações</h3>
+          {unreadCount > 0 && (
+            <Button
+              variant="ghost"
+              size="sm"
+              className="h-7 text-xs"
+              onClick={() => markAsRead()}
+            >
+              <CheckCheck className="h-3.5 w-3.5 mr-1" />
+              Marcar todas como lidas
+            </Button>
+          )}
         </div>
 
         <ScrollArea className="h-[400px]">
@@ -115,6 +131,16 @@ export function NotificationCenter() {
                   onDelete={deleteNotification}
                 />
               ))}
+              {hasMore && (
+                <Button
+                  variant="ghost"
+                  size="sm"
+                  className="w-full text-xs"
+                  onClick={loadMore}
+                >
+                  Carregar mais
+                </Button>
+              )}
             </div>
           )}
         </ScrollArea>
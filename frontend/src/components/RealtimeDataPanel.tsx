@@ -4,6 +4,7 @@ import { Button } from '@/components/ui/button';
 import { Badge } from '@/components/ui/badge';
 import { RefreshCw, Cloud, TrendingUp, AlertCircle } from 'lucide-react';
 import { apiClient } from '@/lib/api-client';
+import { useEventStream, type StreamEvent } from '@/hooks/useEventStream';
 import { format } from 'date-fns';
 
 interface RealtimeWeather {
@@ -18,6 +19,18 @@ interface RealtimeWeather {
   };
 }
 
+interface QuoteEvent {
+  key: string;
+  value: {
+    value?: number;
+    source?: string;
+    temp?: number;
+    precipitation?: number;
+    weather_code?: number;
+    time?: string;
+  } | null;
+}
+
 interface RealtimeMarket {
   timestamp: string;
   market: {
@@ -55,16 +68,38 @@ export function RealtimeDataPanel() {
     }
   };
 
-  // Auto-refresh a cada 5 minutos
-  useEffect(() => {
-    if (autoRefresh) {
-      const interval = setInterval(() => {
-        fetchRealtimeData();
-      }, 5 * 60 * 1000); // 5 minutos
-
-      return () => clearInterval(interval);
+  // Modo ao vivo: cotações chegam por push (SSE) em vez de polling
+  const applyQuote = (event: StreamEvent) => {
+    if (event.type === 'reset') {
+      fetchRealtimeData();
+      return;
     }
-  }, [autoRefresh]);
+    const { key, value } = event.data as QuoteEvent;
+    if (!value) return;
+    if (key.startsWith('weather:')) {
+      setWeather((current) => current && {
+        ...current,
+        current: {
+          temperature: value.temp ?? current.current.temperature,
+          precipitation: value.precipitation ?? current.current.precipitation,
+          weather_code: value.weather_code ?? current.current.weather_code,
+          time: value.time ?? current.current.time,
+        },
+      });
+    } else if (key === 'dolar' || key === 'jbs' || key === 'boi_gordo') {
+      setMarket((current) => current && {
+        ...current,
+        timestamp: new Date().toISOString(),
+        market: {
+          ...current.market,
+          [key]: { value: value.value ?? current.market[key].value, source: value.source ?? current.market[key].source },
+        },
+      });
+    }
+    setLastUpdate(new Date());
+  };
+
+  useEventStream(['quote'], applyQuote, autoRefresh);
 
   // Buscar dados inicialmente
   useEffect(() => {
@@ -101,7 +136,7 @@ export function RealtimeDataPanel() {
             size="sm"
             onClick={() => setAutoRefresh(!autoRefresh)}
           >
-            {autoRefresh ? '🔄 Auto (5min)' : 'Manual'}
+            {autoRefresh ? '🔄 Ao vivo' : 'Manual'}
           </Button>
           <Button
             variant="outline"
@@ -254,7 +289,7 @@ export function RealtimeDataPanel() {
                 <li><strong>Boi Gordo</strong>: CEPEA/USP (não tem API pública - usa cache)</li>
               </ul>
               <p className="pt-2 text-xs">
-                💡 <strong>Dica</strong>: Ative "Auto (5min)" para atualização automática a cada 5 minutos
+                💡 <strong>Dica</strong>: Ative "Ao vivo" para receber as cotações assim que mudarem
               </p>
             </div>
           </div>
@@ -0,0 +1,95 @@
+import { useEffect, useRef } from 'react';
+import { apiClient } from '@/lib/api-client';
+import { logger } from '@/lib/logger';
+
+export type StreamEventType = 'quote' | 'fact_mercado' | 'fact_clima' | 'invalidate';
+
+export interface StreamEvent<T = unknown> {
+  id: string;
+  type: StreamEventType | 'reset';
+  data: T;
+}
+
+const RECONNECT_BASE_MS = 1000;
+const RECONNECT_MAX_MS = 30000;
+
+/**
+ * Assina /api/events/stream (Server-Sent Events) no lugar de polling.
+ * O EventSource reconecta sozinho enviando Last-Event-ID, então os eventos
+ * perdidos durante a queda chegam no replay; "reset" indica que o replay não
+ * cobre a lacuna e os dados devem ser recarregados.
+ * Se o servidor recusa a reconexão (ex.: 401 com o JWT vencido na URL), o
+ * EventSource fecha de vez: reabrimos com um token novo, com backoff, e
+ * tratamos como "reset".
+ */
+export function useEventStream(
+  types: StreamEventType[],
+  onEvent: (event: StreamEvent) => void,
+  enabled: boolean = true
+) {
+  const handler = useRef(onEvent);
+  handler.current = onEvent;
+  const key = types.join(',');
+
+  useEffect(() => {
+    if (!enabled || !key || typeof EventSource === 'undefined') return;
+
+    let source: EventSource | null = null;
+    let cancelled = false;
+    let attempt = 0;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+
+    const listener = (message: MessageEvent) => {
+      try {
+        handler.current({
+          id: message.lastEventId,
+          type: message.type as StreamEvent['type'],
+          data: JSON.parse(message.data),
+        });
+      } catch (error) {
+        logger.warn('Evento SSE inválido', { action: 'event_stream', error: String(error) });
+      }
+    };
+
+    const scheduleReconnect = () => {
+      if (cancelled) return;
+      const delay = Math.min(RECONNECT_MAX_MS, RECONNECT_BASE_MS * 2 ** attempt);
+      attempt += 1;
+      retryTimer = setTimeout(connect, delay);
+    };
+
+    const connect = () => {
+      const reconnecting = attempt > 0;
+      // URL nova a cada abertura: getEventStreamUrl lê o token atual da sessão
+      apiClient.getEventStreamUrl(key.split(',')).then((url) => {
+        if (cancelled) return;
+        const current = new EventSource(url);
+        source = current;
+        [...key.split(','), 'reset'].forEach((type) => current.addEventListener(type, listener));
+        current.onopen = () => {
+          attempt = 0;
+          // Eventos perdidos enquanto a conexão estava fechada: recarregar
+          if (reconnecting) handler.current({ id: '', type: 'reset', data: { reason: 'reconnect' } });
+        };
+        current.onerror = () => {
+          // CONNECTING = o próprio EventSource está reconectando (com Last-Event-ID)
+          if (current.readyState !== EventSource.CLOSED) return;
+          current.close();
+          logger.warn('Stream SSE fechado, reconectando', { action: 'event_stream', attempt });
+          scheduleReconnect();
+        };
+      }).catch((error) => {
+        logger.warn('Falha ao abrir stream SSE', { action: 'event_stream', error: String(error) });
+        scheduleReconnect();
+      });
+    };
+
+    connect();
+
+    return () => {
+      cancelled = true;
+      clearTimeout(retryTimer);
+      source?.close();
+    };
+  }, [key, enabled]);
+}
@@ -202,6 +202,18 @@ export function useAnalytics({ period, customRange }: UseAnalyticsProps) {
 
 // ... Mantendo ExecutiveStats e useMarketData (tabela) que são independentes ...
 
+// fact_clima tem uma linha por dia e região; somar as linhas multiplica a chuva
+// pelo número de regiões. view_clima_diario já traz a média diária entre elas.
+async function fetchChuvaAcumulada30d(): Promise<number> {
+  const thirtyDaysAgo = format(subDays(new Date(), 30), 'yyyy-MM-dd');
+  const { data, error } = await supabase
+    .from('view_clima_diario')
+    .select('data_fk, chuva_mm')
+    .gte('data_fk', thirtyDaysAgo);
+  if (error) throw error;
+  return data?.reduce((sum, row) => sum + (row.chuva_mm || 0), 0) || 0;
+}
+
 export function useExecutiveStats() {
   // Mantendo implementação original React Query pois funciona bem para dados simples e não conflitava
   const { data, isLoading } = useQuery({
@@ -215,14 +227,7 @@ export function useExecutiveStats() {
         .maybeSingle();
       if (mercadoError) throw mercadoError;
       
-      const thirtyDaysAgo = format(subDays(new Date(), 30), 'yyyy-MM-dd');
-      const { data: climaData, error: climaError } = await supabase
-        .from('fact_clima')
-        .select('data_fk, chuva_mm, temp_max')
-        .gte('data_fk', thirtyDaysAgo);
-      if (climaError) throw climaError;
-      
-      const chuvaAcumulada = climaData?.reduce((sum, row) => sum + (row.chuva_mm || 0), 0) || 0;
+      const chuvaAcumulada = await fetchChuvaAcumulada30d();
       
       return {
         valorJbs: mercadoData?.valor_jbs || 0,
@@ -248,13 +253,7 @@ export function useCurrentMarketData() {
             .limit(1)
             .maybeSingle();
           if (mercadoError) throw mercadoError;
-          const thirtyDaysAgo = format(subDays(new Date(), 30), 'yyyy-MM-dd');
-          const { data: climaData, error: climaError } = await supabase
-            .from('fact_clima')
-            .select('data_fk, chuva_mm, temp_max')
-            .gte('data_fk', thirtyDaysAgo);
-          if (climaError) throw climaError;
-          const chuvaAcumulada = climaData?.reduce((sum, row) => sum + (row.chuva_mm || 0), 0) || 0;
+          const chuvaAcumulada = await fetchChuvaAcumulada30d();
           return {
             ultimoBoiGordo: mercadoData?.valor_boi_gordo || 0,
             ultimoJbs: mercadoData?.valor_jbs || 0,
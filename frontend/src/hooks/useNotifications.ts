@@ -1,8 +1,7 @@
-import { useEffect, useState, useCallback } from 'react';
+import { useEffect, useState, useCallback, useRef } from 'react';
 import { supabase } from '@/integrations/supabase/client';
 import { useAuth } from '@/contexts/AuthContext';
 import { apiClient } from '@/lib/api-client';
-import { createMarketAlertNotifications, detectClimateAlerts } from '@/lib/market-alerts';
 
 export interface Notification {
   id: number;
@@ -10,8 +9,13 @@ export interface Notification {
   title: string;
   body: string;
   created_at: string;
+  is_read?: boolean;
+  category?: string | null;
+  level?: string | null;
 }
 
+const PAGE_SIZE = 50;
+
 // Feature flag: Use FastAPI backend or Supabase direct
 const USE_FASTAPI = import.meta.env.VITE_USE_FASTAPI === 'true';
 
@@ -20,21 +24,35 @@ export function useNotifications() {
   const [notifications, setNotifications] = useState<Notification[]>([]);
   const [unreadCount, setUnreadCount] = useState(0);
   const [isLoading, setIsLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const notificationsRef = useRef<Notification[]>([]);
+
+  useEffect(() => {
+    notificationsRef.current = notifications;
+  }, [notifications]);
+
+  // Só notificações do próprio usuário têm estado de leitura (globais não contam)
+  const isUnread = useCallback(
+    (n: Notification) => !!user && n.user_id === user.id && !n.is_read,
+    [user]
+  );
 
-  // Fetch existing notifications
+  // Fetch existing notifications (página + contador numa requisição)
   const fetchNotifications = useCallback(async () => {
     if (!user) {
       setNotifications([]);
       setUnreadCount(0);
+      setNextCursor(null);
       return;
     }
 
     try {
-      let data: Notification[];
-
       if (USE_FASTAPI) {
         // NEW: Use FastAPI backend
-        data = await apiClient.getNotifications(50);
+        const page = await apiClient.getNotifications(PAGE_SIZE);
+        setNotifications(page.items);
+        setUnreadCount(page.unread_count);
+        setNextCursor(page.next_cursor);
       } else {
         // LEGACY: Use Supabase direct (fallback)
         const { data: supabaseData, error } = await supabase
@@ -42,20 +60,69 @@ export function useNotifications() {
           .select('*')
           .or(`user_id.eq.${user.id},user_id.is.null`)
           .order('created_at', { ascending: false })
-          .limit(50);
+          .order('id', { ascending: false })
+          .limit(PAGE_SIZE);
 
         if (error) throw error;
-        data = (supabaseData as Notification[]) || [];
+        const data = (supabaseData as Notification[]) || [];
+        setNotifications(data);
+        setUnreadCount(data.filter(isUnread).length);
+        setNextCursor(null);
       }
-
-      setNotifications(data);
-      setUnreadCount(data.length);
     } catch (error) {
       console.error('Error fetching notifications:', error);
     } finally {
       setIsLoading(false);
     }
-  }, [user]);
+  }, [user, isUnread]);
+
+  // Próxima página (keyset: cursor devolvido pela API)
+  const loadMore = useCallback(async () => {
+    if (!user || !USE_FASTAPI || !nextCursor) return;
+
+    try {
+      const page = await apiClient.getNotifications(PAGE_SIZE, nextCursor);
+      setNotifications(prev => {
+        const seen = new Set(prev.map(n => n.id));
+        return [...prev, ...page.items.filter(n => !seen.has(n.id))];
+      });
+      setUnreadCount(page.unread_count);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Error loading more notifications:', error);
+    }
+  }, [user, nextCursor]);
+
+  // Marcar como lidas em lote (sem ids = todas)
+  const markAsRead = useCallback(async (ids?: number[]) => {
+    if (!user) return;
+    if (ids && ids.length === 0) return;
+
+    try {
+      if (USE_FASTAPI) {
+        const result = await apiClient.markNotificationsRead(ids);
+        setUnreadCount(result.unread_count);
+      } else {
+        let query = supabase
+          .from('notifications')
+          .update({ is_read: true })
+          .eq('user_id', user.id)
+          .eq('is_read', false);
+        if (ids) query = query.in('id', ids);
+
+        const { error } = await query;
+        if (error) throw error;
+        const changed = notificationsRef.current.filter(n => isUnread(n) && (!ids || ids.includes(n.id))).length;
+        setUnreadCount(prev => (ids ? Math.max(0, prev - changed) : 0));
+      }
+
+      setNotifications(prev =>
+        prev.map(n => (n.user_id === user.id && (!ids || ids.includes(n.id)) ? { ...n, is_read: true } : n))
+      );
+    } catch (error) {
+      console.error('Error marking notifications as read:', error);
+    }
+  }, [user, isUnread]);
 
   // Delete notification
   const deleteNotification = useCallback(async (notificationId: number) => {
@@ -76,12 +143,15 @@ export function useNotifications() {
         if (error) throw error;
       }
 
+      const target = notificationsRef.current.find(n => n.id === notificationId);
       setNotifications(prev => prev.filter(n => n.id !== notificationId));
-      setUnreadCount(prev => Math.max(0, prev - 1));
+      if (target && isUnread(target)) {
+        setUnreadCount(prev => Math.max(0, prev - 1));
+      }
     } catch (error) {
       console.error('Error deleting notification:', error);
     }
-  }, [user]);
+  }, [user, isUnread]);
 
   // Create test notification if none exists
   const createTestNotification = useCallback(async () => {
@@ -125,16 +195,7 @@ export function useNotifications() {
     fetchNotifications();
     createTestNotification();
 
-    // Verificar alertas de mercado e clima a cada 30 minutos
-    const checkAlerts = async () => {
-      await createMarketAlertNotifications(user.id);
-      await detectClimateAlerts(user.id);
-      await fetchNotifications(); // Refresh após criar alertas
-    };
-
-    // Executar imediatamente e depois a cada 30 minutos
-    checkAlerts();
-    const alertInterval = setInterval(checkAlerts, 30 * 60 * 1000);
+    // Alertas de mercado/clima são gerados no servidor (api/lib/alerts.py) e chegam pelo canal abaixo
 
     // Subscribe to new notifications
     const channel = supabase
@@ -171,18 +232,21 @@ export function useNotifications() {
           filter: `user_id=eq.${user.id}`,
         },
         (payload) => {
+          // Já removida localmente (deleteNotification) não desconta de novo
           const deletedId = payload.old.id;
+          const target = notificationsRef.current.find(n => n.id === deletedId);
           setNotifications(prev => prev.filter(n => n.id !== deletedId));
-          setUnreadCount(prev => Math.max(0, prev - 1));
+          if (target && isUnread(target)) {
+            setUnreadCount(prev => Math.max(0, prev - 1));
+          }
         }
       )
       .subscribe();
 
     return () => {
-      clearInterval(alertInterval);
       supabase.removeChannel(channel);
     };
-  }, [user, fetchNotifications, createTestNotification]);
+  }, [user, fetchNotifications, createTestNotification, isUnread]);
 
   // Request browser notification permission
   const requestPermission = useCallback(async () => {
@@ -197,6 +261,9 @@ export function useNotifications() {
     notifications,
     unreadCount,
     isLoading,
+    hasMore: nextCursor !== null,
+    loadMore,
+    markAsRead,
     deleteNotification,
     requestPermission,
     refetch: fetchNotifications,
@@ -145,6 +145,10 @@ export type Database = {
           title: string
           body: string
           created_at: string
+          is_read: boolean
+          category: string | null
+          level: string | null
+          dedup_key: string | null
         }
         Insert: {
           id?: number
@@ -152,6 +156,10 @@ export type Database = {
           title: string
           body: string
           created_at?: string
+          is_read?: boolean
+          category?: string | null
+          level?: string | null
+          dedup_key?: string | null
         }
         Update: {
           id?: number
@@ -159,6 +167,10 @@ export type Database = {
           title?: string
           body?: string
           created_at?: string
+          is_read?: boolean
+          category?: string | null
+          level?: string | null
+          dedup_key?: string | null
         }
         Relationships: []
       }
@@ -230,6 +242,23 @@ export type Database = {
           },
         ]
       }
+      view_clima_diario: {
+        Row: {
+          chuva_mm: number | null
+          data_fk: string | null
+          n_localizacoes: number | null
+          temp_max: number | null
+        }
+        Relationships: [
+          {
+            foreignKeyName: "fact_clima_data_fk_fkey"
+            columns: ["data_fk"]
+            isOneToOne: false
+            referencedRelation: "dim_calendario"
+            referencedColumns: ["data_pk"]
+          },
+        ]
+      }
       view_lag_chuva_60d_boi: {
         Row: {
           ano_preco: number | null
@@ -41,6 +41,20 @@ export interface Notification {
   title: string;
   body: string;
   created_at: string;
+  is_read?: boolean;
+  category?: string | null;
+  level?: string | null;
+}
+
+export interface NotificationPage {
+  items: Notification[];
+  next_cursor: string | null;
+  unread_count: number;
+}
+
+export interface MarkNotificationsReadResponse {
+  updated: number;
+  unread_count: number;
 }
 
 export interface AdminUser {
@@ -227,10 +241,27 @@ class APIClient {
 
   // ============ NOTIFICATIONS ============
 
-  async getNotifications(limit: number = 50): Promise<Notification[]> {
-    return this.request<Notification[]>(
-      `/api/notifications?limit=${limit}`
-    );
+  async getNotifications(
+    limit: number = 50,
+    cursor?: string | null,
+    unreadOnly: boolean = false
+  ): Promise<NotificationPage> {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor) params.set('cursor', cursor);
+    if (unreadOnly) params.set('unread_only', 'true');
+    return this.request<NotificationPage>(`/api/notifications?${params}`);
+  }
+
+  async getUnreadNotificationCount(): Promise<{ unread_count: number }> {
+    return this.request<{ unread_count: number }>(`/api/notifications/unread-count`);
+  }
+
+  // ids omitido = marcar todas como lidas
+  async markNotificationsRead(ids?: number[]): Promise<MarkNotificationsReadResponse> {
+    return this.request<MarkNotificationsReadResponse>(`/api/notifications/read`, {
+      method: 'POST',
+      body: JSON.stringify(ids ? { ids } : { all: true })
+    });
   }
 
   async deleteNotification(notificationId: number): Promise<DeleteNotificationResponse> {
@@ -391,6 +422,17 @@ class APIClient {
   async getRealtimeStatus(): Promise<{ last_weather_at: string | null; last_market_at: string | null; last_refresh_ok: string | null; }> {
     return this.request<{ last_weather_at: string | null; last_market_at: string | null; last_refresh_ok: string | null; }>(`/api/realtime/status`);
   }
+
+  // ============ EVENTS (SSE) ============
+
+  /** URL de /api/events/stream; o EventSource não envia headers, então o token vai na query */
+  async getEventStreamUrl(types: string[]): Promise<string> {
+    const params = new URLSearchParams();
+    params.append('types', types.join(','));
+    const token = await this.getAuthToken();
+    if (token) params.append('access_token', token);
+    return `${API_BASE_URL}/api/events/stream?${params.toString()}`;
+  }
 }
 
 export interface ImportResult {
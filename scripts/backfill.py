@@ -0,0 +1,308 @@
+"""
+Backfill histórico das séries de mercado e clima
+- Percorre o intervalo em janelas do tamanho que cada API aguenta
+- PTAX: paginação OData ($top/$skip) dentro de cada janela
+- Clima: API de arquivo do Open-Meteo (várias coordenadas por request)
+- Boi gordo: uma página do IMEA por dia útil (só com IMEA_HISTORY_URL configurado)
+- Janelas rodam concorrentemente, com limite de concorrência e intervalo
+  mínimo entre requests por fonte
+- Cada janela é gravada (COPY via bulk_loader ou REST em lotes) assim que
+  termina e vai para o checkpoint; após uma falha, rodar de novo retoma das
+  janelas que faltam
+
+Uso:
+    python backfill.py 2015-01-01 2024-12-31
+    python backfill.py 2015-01-01 2024-12-31 --sources dolar clima --force
+    IMEA_HISTORY_URL='https://.../indicador-boi?data={date_br}' python backfill.py 2024-01-01 2024-12-31 --sources imea
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+import httpx
+import pandas as pd
+
+import bulk_loader
+from data_fetcher import (
+    PTAX_URL,
+    WEATHER_BATCH_SIZE,
+    WEATHER_LOCATIONS,
+    parse_dollar_response,
+    parse_weather_response,
+    stock_request,
+    supabase,
+)
+
+# data_fetcher já colocou a raiz do repo no path (api/lib/serialization)
+from api.lib.serialization import frame_to_records
+from batch_uploader import upload_records
+from calendar_dim import ensure_calendar
+from checkpoint import Checkpoint
+from http_client import SourceRequest, create_client, fetch_source
+import imea_scraper
+
+WEATHER_ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+PTAX_PAGE_SIZE = int(os.getenv("PTAX_PAGE_SIZE", "1000"))
+
+Record = Dict[str, object]
+
+
+@dataclass(frozen=True)
+class Window:
+    source: str
+    start: date
+    end: date
+
+    @property
+    def id(self) -> str:
+        return f"{self.start.isoformat()}:{self.end.isoformat()}"
+
+
+class RateLimiter:
+    """Limita requests simultâneos e espaça o início de cada um em min_interval segundos"""
+
+    def __init__(self, max_concurrency: int, min_interval: float):
+        self.min_interval = min_interval
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.min_interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._semaphore.release()
+
+
+Fetcher = Callable[[httpx.AsyncClient, Window, RateLimiter], Awaitable[List[Record]]]
+
+
+@dataclass
+class BackfillSource:
+    name: str
+    table: str
+    window_days: int
+    max_concurrency: int
+    min_interval: float  # segundos entre requests
+    fetch: Fetcher
+
+
+async def _get(client: httpx.AsyncClient, limiter: RateLimiter, request: SourceRequest) -> List[Record]:
+    """Request com o retry do http_client; falha definitiva levanta (a janela não vai para o checkpoint)"""
+    async with limiter:
+        result = await fetch_source(client, request)
+    if not result.ok:
+        raise RuntimeError(f"{request.name}: {result.error}")
+    return result.records
+
+
+def _in_window(records: Iterable[Record], window: Window, key: str = "data") -> List[Record]:
+    start, end = window.start.isoformat(), window.end.isoformat()
+    return [r for r in records if start <= str(r[key])[:10] <= end]
+
+
+# ============ Fontes ============
+async def fetch_dollar_window(client: httpx.AsyncClient, window: Window, limiter: RateLimiter) -> List[Record]:
+    """PTAX por período, paginado com $top/$skip até a página vir incompleta"""
+    records: List[Record] = []
+    skip = 0
+    while True:
+        params = {
+            '@dataInicial': f"'{window.start.strftime('%m-%d-%Y')}'",
+            '@dataFinalCotacao': f"'{window.end.strftime('%m-%d-%Y')}'",
+            '$top': PTAX_PAGE_SIZE,
+            '$skip': skip,
+            '$orderby': 'dataHoraCotacao',
+            '$format': 'json',
+            '$select': 'cotacaoCompra,dataHoraCotacao',
+        }
+        page = await _get(client, limiter, SourceRequest("dolar", PTAX_URL, parse_dollar_response, params=params, timeout=30))
+        records.extend(page)
+        if len(page) < PTAX_PAGE_SIZE:
+            return _in_window(records, window)
+        skip += PTAX_PAGE_SIZE
+
+
+async def fetch_stock_window(client: httpx.AsyncClient, window: Window, limiter: RateLimiter) -> List[Record]:
+    """Brapi só aceita um range contado a partir de hoje: pede o menor que cobre a janela (brapi_range) e recorta"""
+    days = (date.today() - window.start).days + 1
+    records = await _get(client, limiter, stock_request("JBSS3", days))
+    return _in_window(records, window)
+
+
+async def fetch_weather_window(client: httpx.AsyncClient, window: Window, limiter: RateLimiter) -> List[Record]:
+    """Arquivo do Open-Meteo, WEATHER_BATCH_SIZE coordenadas por request"""
+    records: List[Record] = []
+    for i in range(0, len(WEATHER_LOCATIONS), WEATHER_BATCH_SIZE):
+        batch = WEATHER_LOCATIONS[i:i + WEATHER_BATCH_SIZE]
+        params = {
+            'latitude': ",".join(str(lat) for _, lat, _ in batch),
+            'longitude': ",".join(str(lon) for _, _, lon in batch),
+            'start_date': window.start.isoformat(),
+            'end_date': window.end.isoformat(),
+            'daily': 'temperature_2m_max,precipitation_sum',
+            'timezone': 'America/Sao_Paulo',
+        }
+        parse = partial(parse_weather_response, names=[name for name, _, _ in batch])
+        records.extend(await _get(client, limiter, SourceRequest("clima", WEATHER_ARCHIVE_URL, parse, params=params, timeout=60)))
+    return records
+
+
+async def fetch_imea_window(client: httpx.AsyncClient, window: Window, limiter: RateLimiter) -> List[Record]:
+    """Uma página por dia útil, em paralelo (o limiter da fonte segura a concorrência)"""
+    # Fim de semana o IMEA repete o último indicador, que seria gravado com a data errada
+    days = [window.start + timedelta(days=i) for i in range((window.end - window.start).days + 1)]
+    pages = await asyncio.gather(*(_get(client, limiter, imea_scraper.history_request(day)) for day in days if day.weekday() < 5))
+    return [record for page in pages for record in page]
+
+
+SOURCES: Dict[str, BackfillSource] = {
+    "dolar": BackfillSource("dolar", "fact_mercado", 365, 2, 0.5, fetch_dollar_window),
+    "jbs": BackfillSource("jbs", "fact_mercado", 3650, 1, 1.0, fetch_stock_window),
+    "clima": BackfillSource("clima", "fact_clima", 366, 1, 1.0, fetch_weather_window),
+    "imea": BackfillSource("imea", "fact_mercado", 31, imea_scraper.IMEA_HISTORY_CONCURRENCY, 0.25, fetch_imea_window),
+}
+
+
+def default_sources() -> List[str]:
+    """IMEA só entra quando a URL do histórico está configurada"""
+    return [name for name in SOURCES if name != "imea" or imea_scraper.IMEA_HISTORY_URL]
+
+
+# ============ Janelas / gravação ============
+def make_windows(source: BackfillSource, start: date, end: date) -> List[Window]:
+    windows = []
+    current = start
+    while current <= end:
+        window_end = min(end, current + timedelta(days=source.window_days - 1))
+        windows.append(Window(source.name, current, window_end))
+        current = window_end + timedelta(days=1)
+    return windows
+
+
+def backfill_fingerprint(sources: Iterable[str], start: date, end: date) -> str:
+    """Mesmo intervalo + fontes + tamanhos de janela = mesmo checkpoint"""
+    spec = ";".join(f"{name}:{SOURCES[name].window_days}" for name in sorted(sources))
+    return "backfill-" + hashlib.sha256(f"{spec}|{start}|{end}".encode()).hexdigest()[:16]
+
+
+def write_window(table: str, records: List[Record]) -> int:
+    """Grava a janela (COPY se disponível, senão REST); erro levanta para a janela ser refeita"""
+    if not records:
+        return 0
+    df = pd.DataFrame(records).rename(columns={'data': 'data_fk'})
+    key = bulk_loader.TABLES[table].key
+    df = df.dropna(subset=['data_fk']).drop_duplicates(subset=key, keep='last')
+
+    if bulk_loader.is_available():
+        return bulk_loader.bulk_load({table: df}, with_calendar=True).get(table, 0)
+
+    ensure_calendar(supabase, df['data_fk'].min(), df['data_fk'].max())
+    result = upload_records(supabase, table, frame_to_records(df), on_conflict=bulk_loader.conflict_target(table))
+    if result.rejected:
+        raise RuntimeError(f"{result.rejected} linhas rejeitadas em {table} ({result.dead_letter_path})")
+    return result.sent
+
+
+async def run_backfill(
+    start: date,
+    end: date,
+    sources: Iterable[str],
+    checkpoint: Checkpoint,
+    client: Optional[httpx.AsyncClient] = None,
+    writer: Callable[[str, List[Record]], int] = write_window,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Busca e grava todas as janelas pendentes. Retorna por fonte:
+    {"windows", "skipped", "done", "failed", "rows"}
+    """
+    own_client = client is None
+    client = client or create_client()
+    report = {name: {"windows": 0, "skipped": 0, "done": 0, "failed": 0, "rows": 0} for name in sources}
+
+    async def run_window(source: BackfillSource, window: Window, limiter: RateLimiter) -> None:
+        stats = report[source.name]
+        try:
+            records = await source.fetch(client, window, limiter)
+            # Gravação é síncrona (psycopg2/PostgREST): roda numa thread para não travar as outras janelas
+            written = await asyncio.to_thread(writer, source.table, records)
+            stats["rows"] += written
+            checkpoint.mark_done(source.name, window.id)
+            stats["done"] += 1
+            print(f"✅ {source.name} {window.id}: {len(records)} registros")
+        except Exception as e:
+            stats["failed"] += 1
+            print(f"❌ {source.name} {window.id}: {e}")
+
+    tasks = []
+    for name in sources:
+        source = SOURCES[name]
+        limiter = RateLimiter(source.max_concurrency, source.min_interval)
+        for window in make_windows(source, start, end):
+            report[name]["windows"] += 1
+            if checkpoint.is_done(name, window.id):
+                report[name]["skipped"] += 1
+                continue
+            tasks.append(run_window(source, window, limiter))
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        if own_client:
+            await client.aclose()
+
+    if not any(stats["failed"] for stats in report.values()):
+        checkpoint.finish()
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, int]]) -> None:
+    print("\n📊 Backfill:")
+    for name, stats in report.items():
+        icon = "✅" if not stats["failed"] else "⚠️"
+        print(
+            f"   {icon} {name:<6} janelas={stats['windows']} concluídas={stats['done']} "
+            f"já feitas={stats['skipped']} falhas={stats['failed']} linhas={stats['rows']}"
+        )
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill histórico de mercado e clima")
+    parser.add_argument("start", type=_parse_date, help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("end", type=_parse_date, help="Data final (YYYY-MM-DD)")
+    parser.add_argument("--sources", nargs="+", choices=sorted(SOURCES), default=default_sources())
+    parser.add_argument("--force", action="store_true", help="Ignora o checkpoint e refaz todas as janelas")
+    args = parser.parse_args()
+    if "imea" in args.sources and not imea_scraper.IMEA_HISTORY_URL:
+        parser.error("--sources imea requer IMEA_HISTORY_URL (ex.: https://.../indicador-boi?data={date_br})")
+
+    checkpoint = Checkpoint(backfill_fingerprint(args.sources, args.start, args.end))
+    if args.force:
+        checkpoint.reset()
+    elif checkpoint.finished:
+        print("✅ Backfill já concluído para este intervalo (use --force para refazer)")
+        raise SystemExit(0)
+
+    report = asyncio.run(run_backfill(args.start, args.end, args.sources, checkpoint))
+    print_report(report)
+    if any(stats["failed"] for stats in report.values()):
+        print("⚠️ Rode o mesmo comando de novo para retomar as janelas que falharam")
+        raise SystemExit(1)
@@ -0,0 +1,275 @@
+"""
+Upload em lotes via REST (PostgREST) quando o COPY não está disponível
+- Lotes dimensionados por bytes de payload, não por um número fixo de linhas
+- Envio concorrente com um pool limitado de workers
+- Lote com erro de dados é dividido ao meio até isolar as linhas ruins
+- Linhas rejeitadas vão para um arquivo dead-letter (JSONL) em vez de sumirem,
+  gravadas lote a lote antes do checkpoint marcar o lote como concluído
+- Com um Checkpoint, lotes já concluídos numa execução anterior são pulados
+"""
+
+import json
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(256 * 1024)))
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "1000"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_RETRIES = int(os.getenv("UPLOAD_RETRIES", "2"))
+DEAD_LETTER_DIR = os.getenv("DEAD_LETTER_DIR", "dead_letter")
+
+Record = Dict[str, Any]
+
+# Falhas transitórias: repetidas com backoff, nunca bisseccionadas
+TRANSIENT_HTTP_STATUS = {408, 429}
+TRANSIENT_PGRST_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}  # conexão/pool/schema cache/timeout
+# SQLSTATE: 08 conexão, 40 deadlock/serialização, 53 recursos, 57 timeout/shutdown
+TRANSIENT_SQLSTATE_CLASSES = {"08", "40", "53", "57"}
+
+
+@dataclass
+class UploadResult:
+    table: str
+    sent: int
+    rejected: int
+    batches: int
+    requests: int
+    seconds: float
+    dead_letter_path: Optional[str] = None
+    skipped: int = 0
+    incomplete: int = 0  # lotes com falha transitória (não entram no checkpoint)
+
+    @property
+    def complete(self) -> bool:
+        return self.incomplete == 0
+
+    def summary(self) -> str:
+        text = f"{self.sent} enviados, {self.rejected} rejeitados em {self.batches} lotes ({self.requests} requests, {self.seconds:.1f}s)"
+        if self.skipped:
+            text += f", {self.skipped} lotes já concluídos (checkpoint)"
+        if self.incomplete:
+            text += f", {self.incomplete} lotes incompletos (reexecutar)"
+        if self.dead_letter_path:
+            text += f" — rejeitados em {self.dead_letter_path}"
+        return text
+
+
+def json_safe(record: Record) -> Record:
+    """NaN/inf não são JSON válido para o PostgREST: vira null"""
+    return {
+        k: None if isinstance(v, float) and (math.isnan(v) or math.isinf(v)) else v
+        for k, v in record.items()
+    }
+
+
+def iter_batches(records: Iterable[Record], max_bytes: int = BATCH_MAX_BYTES, max_rows: int = BATCH_MAX_ROWS) -> Iterator[List[Record]]:
+    """Agrupa registros (lidos sob demanda) em lotes de até max_bytes de JSON e max_rows linhas"""
+    current: List[Record] = []
+    current_bytes = 2  # colchetes do array
+    for record in records:
+        size = len(json.dumps(record, default=str)) + 1  # + vírgula
+        if current and (current_bytes + size > max_bytes or len(current) >= max_rows):
+            yield current
+            current, current_bytes = [], 2
+        current.append(record)
+        current_bytes += size
+    if current:
+        yield current
+
+
+def batch_id(index: int, batch: List[Record]) -> str:
+    """Identificador estável do lote: posição + tamanho + CRC do conteúdo"""
+    crc = zlib.crc32(json.dumps(batch, sort_keys=True, default=str).encode())
+    return f"{index}:{len(batch)}:{crc:08x}"
+
+
+def make_batches(records: List[Record], max_bytes: int = BATCH_MAX_BYTES, max_rows: int = BATCH_MAX_ROWS) -> List[List[Record]]:
+    return list(iter_batches(records, max_bytes, max_rows))
+
+
+def is_data_error(error: APIError) -> bool:
+    """
+    O postgrest-py levanta APIError para qualquer resposta não-2xx. Só erro de
+    dados (SQLSTATE 22/23/42..., PGRST1xx/2xx, 4xx) justifica dividir o lote;
+    5xx, 408/429 e falhas de conexão do banco são transitórios.
+    """
+    code = str(error.code or "")
+    if code.isdigit():
+        # Resposta sem JSON (gateway/proxy): o código é o status HTTP
+        status = int(code)
+        return 400 <= status < 500 and status not in TRANSIENT_HTTP_STATUS
+    if not code or code in TRANSIENT_PGRST_CODES or code[:2] in TRANSIENT_SQLSTATE_CLASSES:
+        return False
+    return True
+
+
+class BatchUploader:
+    """Envia registros para uma tabela via PostgREST (upsert com on_conflict ou insert)"""
+
+    def __init__(
+        self,
+        client,
+        table: str,
+        on_conflict: Optional[str] = None,
+        max_bytes: int = BATCH_MAX_BYTES,
+        max_rows: int = BATCH_MAX_ROWS,
+        workers: int = UPLOAD_WORKERS,
+        retries: int = UPLOAD_RETRIES,
+        dead_letter_dir: str = DEAD_LETTER_DIR,
+        checkpoint=None,
+    ):
+        self.client = client
+        self.table = table
+        self.on_conflict = on_conflict
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.workers = workers
+        self.retries = retries
+        self.dead_letter_dir = dead_letter_dir
+        self.checkpoint = checkpoint
+        self._lock = threading.Lock()
+        self._requests = 0
+
+    def _send(self, batch: List[Record]) -> None:
+        with self._lock:
+            self._requests += 1
+        query = self.client.table(self.table)
+        if self.on_conflict:
+            query.upsert(batch, on_conflict=self.on_conflict).execute()
+        else:
+            query.insert(batch).execute()
+
+    def _send_with_retry(self, batch: List[Record]) -> None:
+        """Erros de rede/5xx/429 são repetidos com backoff; erro de dados sobe na hora"""
+        for attempt in range(self.retries + 1):
+            try:
+                self._send(batch)
+                return
+            except APIError as e:
+                if is_data_error(e) or attempt == self.retries:
+                    raise
+                time.sleep(random.uniform(0, min(4.0, 0.5 * 2 ** attempt)))
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(random.uniform(0, min(4.0, 0.5 * 2 ** attempt)))
+
+    def _upload_batch(self, batch: List[Record]) -> Tuple[int, List[Tuple[Record, str]], bool]:
+        """
+        Envia o lote; se o PostgREST rejeitar os dados, divide ao meio até isolar
+        as linhas ruins. Retorna (enviados, rejeitados, completo). Falha
+        transitória persistente (rede, 5xx, 429) não é bisseccionada: o lote vai
+        inteiro para o dead-letter e fica incompleto (uma reexecução com
+        checkpoint tenta de novo).
+        """
+        try:
+            self._send_with_retry(batch)
+            return len(batch), [], True
+        except APIError as e:
+            if not is_data_error(e):
+                return 0, [(record, f"transient: {e}") for record in batch], False
+            if len(batch) == 1:
+                return 0, [(batch[0], str(e))], True
+        except Exception as e:
+            return 0, [(record, f"{type(e).__name__}: {e}") for record in batch], False
+        middle = len(batch) // 2
+        sent_left, rejects_left, complete_left = self._upload_batch(batch[:middle])
+        sent_right, rejects_right, complete_right = self._upload_batch(batch[middle:])
+        return sent_left + sent_right, rejects_left + rejects_right, complete_left and complete_right
+
+    def _dead_letter_path(self) -> str:
+        """Um arquivo por upload (timestamp do início + pid para não colidir entre processos)"""
+        return os.path.join(self.dead_letter_dir, f"{self.table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.jsonl")
+
+    def upload(self, records: Iterable[Record]) -> UploadResult:
+        """
+        Envia os registros; aceita um gerador (só ~2 lotes por worker ficam em memória)
+        """
+        started = time.perf_counter()
+        self._requests = 0
+        sent = 0
+        batches = 0
+        skipped = 0
+        rejected = 0
+        incomplete = 0
+        dead_letter_path = self._dead_letter_path()
+        dead_letter = None
+
+        def write_rejects(batch_rejects: List[Tuple[Record, str]]) -> None:
+            nonlocal dead_letter, rejected
+            if dead_letter is None:
+                os.makedirs(self.dead_letter_dir, exist_ok=True)
+                dead_letter = open(dead_letter_path, "a")
+            for record, error in batch_rejects:
+                dead_letter.write(json.dumps({"table": self.table, "error": error, "record": record}, default=str) + "\n")
+            dead_letter.flush()
+            rejected += len(batch_rejects)
+
+        def collect(futures) -> None:
+            nonlocal sent, incomplete
+            for future in futures:
+                count, batch_rejects, complete = future.result()
+                sent += count
+                # Rejeitados gravados antes do checkpoint: um crash depois do
+                # mark_done não perde linhas que a reexecução vai pular
+                if batch_rejects:
+                    write_rejects(batch_rejects)
+                current = pending_ids.pop(future, None)
+                if not complete:
+                    incomplete += 1
+                elif self.checkpoint is not None:
+                    self.checkpoint.mark_done(self.table, current)
+
+        max_in_flight = max(1, self.workers) * 2
+        pending_ids = {}
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+                pending = set()
+                for index, batch in enumerate(iter_batches((json_safe(r) for r in records), self.max_bytes, self.max_rows)):
+                    batches += 1
+                    if self.checkpoint is not None:
+                        current_id = batch_id(index, batch)
+                        if self.checkpoint.is_done(self.table, current_id):
+                            skipped += 1
+                            continue
+                    if len(pending) >= max_in_flight:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    future = pool.submit(self._upload_batch, batch)
+                    pending.add(future)
+                    if self.checkpoint is not None:
+                        pending_ids[future] = current_id
+                collect(wait(pending).done)
+        finally:
+            if dead_letter is not None:
+                dead_letter.close()
+
+        return UploadResult(
+            table=self.table,
+            sent=sent,
+            rejected=rejected,
+            batches=batches,
+            requests=self._requests,
+            seconds=time.perf_counter() - started,
+            dead_letter_path=dead_letter_path if rejected else None,
+            skipped=skipped,
+            incomplete=incomplete,
+        )
+
+
+def upload_records(client, table: str, records: Iterable[Record], on_conflict: Optional[str] = None, **kwargs) -> UploadResult:
+    """Atalho: envia e imprime o resumo"""
+    result = BatchUploader(client, table, on_conflict=on_conflict, **kwargs).upload(records)
+    icon = "✅" if not result.rejected and result.complete else "⚠️"
+    print(f"{icon} {table}: {result.summary()}")
+    return result
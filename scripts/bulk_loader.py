@@ -0,0 +1,208 @@
+"""
+Loader em massa via conexão direta ao Postgres (COPY FROM STDIN)
+- Faz streaming do DataFrame limpo como CSV, sem materializar o arquivo inteiro
+- COPY para uma tabela de staging temporária e merge (INSERT ... ON CONFLICT)
+  em dim_calendario / fact_mercado / fact_clima, tudo em uma única transação
+- Ativado quando DATABASE_URL está definido e psycopg2 está instalado;
+  caso contrário os scripts seguem pelo caminho REST (PostgREST em lotes)
+"""
+
+import io
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from calendar_dim import CALENDAR_COLUMNS, build_calendar
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+COPY_CHUNK_ROWS = int(os.getenv("COPY_CHUNK_ROWS", "5000"))
+
+
+@dataclass
+class TableSpec:
+    name: str
+    key: List[str]
+    columns: List[str]
+
+
+Frames = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+# Ordem importa: dim_calendario antes das fatos (FK data_fk -> data_pk)
+TABLES: Dict[str, TableSpec] = {
+    "dim_calendario": TableSpec("dim_calendario", ["data_pk"], CALENDAR_COLUMNS),
+    "fact_mercado": TableSpec("fact_mercado", ["data_fk"], ["data_fk", "valor_dolar", "valor_jbs", "valor_boi_gordo"]),
+    "fact_clima": TableSpec("fact_clima", ["data_fk", "localizacao"], ["data_fk", "temp_max", "chuva_mm", "localizacao"]),
+}
+
+
+def conflict_target(name: str) -> str:
+    """Chave natural da tabela no formato do on_conflict do PostgREST (ex.: "data_fk,localizacao")"""
+    return ",".join(TABLES[name].key)
+
+
+def is_available(dsn: Optional[str] = None) -> bool:
+    """True se dá para usar o caminho COPY (driver instalado + DATABASE_URL)"""
+    return psycopg2 is not None and bool(dsn or DATABASE_URL)
+
+
+def connect(dsn: Optional[str] = None):
+    if psycopg2 is None:
+        raise RuntimeError("psycopg2 não instalado (pip install psycopg2-binary)")
+    dsn = dsn or DATABASE_URL
+    if not dsn:
+        raise RuntimeError("DATABASE_URL não definido")
+    return psycopg2.connect(dsn)
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class DataFrameCSVStream(io.RawIOBase):
+    """
+    File-like que gera o CSV do DataFrame sob demanda, COPY_CHUNK_ROWS linhas por vez.
+    NaN/None viram campo vazio, que o COPY ... CSV interpreta como NULL.
+    """
+
+    def __init__(self, df: pd.DataFrame, chunk_rows: int = COPY_CHUNK_ROWS):
+        self.df = df
+        self.chunk_rows = chunk_rows
+        self._offset = 0
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_chunk(self) -> bytes:
+        chunk = self.df.iloc[self._offset:self._offset + self.chunk_rows]
+        self._offset += self.chunk_rows
+        return chunk.to_csv(header=False, index=False).encode("utf-8")
+
+    def read(self, size: int = -1) -> bytes:
+        while (size < 0 or len(self._buffer) < size) and self._offset < len(self.df):
+            self._buffer += self._next_chunk()
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def staging_sql(spec: TableSpec, staging: str) -> str:
+    return f"CREATE TEMP TABLE {_quote(staging)} (LIKE public.{_quote(spec.name)} INCLUDING DEFAULTS) ON COMMIT DROP"
+
+
+def copy_sql(spec: TableSpec, staging: str) -> str:
+    columns = ", ".join(_quote(c) for c in spec.columns)
+    return f"COPY {_quote(staging)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+
+def merge_sql(spec: TableSpec, staging: str) -> str:
+    """Upsert da staging na tabela final (DISTINCT ON evita a mesma chave duas vezes no lote)"""
+    columns = ", ".join(_quote(c) for c in spec.columns)
+    key = ", ".join(_quote(c) for c in spec.key)
+    updates = [c for c in spec.columns if c not in spec.key]
+    if updates:
+        action = "DO UPDATE SET " + ", ".join(f"{_quote(c)} = EXCLUDED.{_quote(c)}" for c in updates)
+    else:
+        action = "DO NOTHING"
+    return (
+        f"INSERT INTO public.{_quote(spec.name)} ({columns}) "
+        f"SELECT DISTINCT ON ({key}) {columns} FROM {_quote(staging)} ORDER BY {key} "
+        f"ON CONFLICT ({key}) {action}"
+    )
+
+
+def partial_spec(spec: TableSpec, columns: Iterable[str]) -> TableSpec:
+    """
+    Restringe a spec às colunas presentes no frame (sempre com a chave).
+    Carga só de valor_dolar não sobrescreve valor_jbs com NULL no merge.
+    """
+    present = set(columns)
+    return TableSpec(spec.name, spec.key, [c for c in spec.columns if c in present or c in spec.key])
+
+
+def calendar_frame(dates: pd.Series) -> pd.DataFrame:
+    """Linhas de dim_calendario cobrindo todas as datas (necessário pela FK das fatos)"""
+    dates = pd.to_datetime(dates, errors="coerce").dropna()
+    if dates.empty:
+        return pd.DataFrame(columns=CALENDAR_COLUMNS)
+    return build_calendar(dates.min(), dates.max())
+
+
+def _chunks(frames: Frames) -> Iterator[pd.DataFrame]:
+    if isinstance(frames, pd.DataFrame):
+        yield frames
+    else:
+        yield from frames
+
+
+def bulk_load(frames: Dict[str, Frames], dsn: Optional[str] = None, with_calendar: bool = False) -> Dict[str, int]:
+    """
+    Carrega {tabela: DataFrame ou iterável de chunks} via COPY + merge em uma única transação.
+    Os chunks são copiados para a staging à medida que chegam (memória constante).
+    - with_calendar: gera dim_calendario cobrindo o intervalo de datas das fatos
+    - frames com só parte das colunas atualizam só essas colunas (partial_spec)
+    Retorna as linhas afetadas por tabela; em erro faz rollback de tudo.
+    """
+    unknown = set(frames) - set(TABLES)
+    if unknown:
+        raise ValueError(f"Tabelas não suportadas: {sorted(unknown)}")
+
+    conn = connect(dsn)
+    copied: Dict[str, int] = {}
+    loaded: Dict[str, int] = {}
+    date_range: List[pd.Timestamp] = []
+    started = time.perf_counter()
+    try:
+        with conn:  # commit ao sair, rollback em exceção
+            with conn.cursor() as cur:
+                names = [name for name in TABLES if name in frames or (with_calendar and name == "dim_calendario")]
+                for name in names:
+                    cur.execute(staging_sql(TABLES[name], f"stg_{name}"))
+
+                specs = {name: TABLES[name] for name in names}
+                for name in names:
+                    for chunk in _chunks(frames.get(name, [])):
+                        if chunk.empty:
+                            continue
+                        if name not in copied:
+                            specs[name] = partial_spec(TABLES[name], chunk.columns)
+                        spec = specs[name]
+                        cur.copy_expert(copy_sql(spec, f"stg_{name}"), DataFrameCSVStream(chunk.reindex(columns=spec.columns)))
+                        copied[name] = copied.get(name, 0) + len(chunk)
+                        if with_calendar and name != "dim_calendario":
+                            dates = pd.to_datetime(chunk[spec.key[0]], errors="coerce").dropna()
+                            if not dates.empty:
+                                date_range = [min([dates.min()] + date_range[:1]), max([dates.max()] + date_range[1:])]
+
+                if with_calendar and date_range:
+                    calendar = calendar_frame(pd.Series(date_range))
+                    cur.copy_expert(copy_sql(TABLES["dim_calendario"], "stg_dim_calendario"), DataFrameCSVStream(calendar))
+                    copied["dim_calendario"] = copied.get("dim_calendario", 0) + len(calendar)
+
+                # Merge na ordem da FK (calendário primeiro)
+                for name in names:
+                    if not copied.get(name):
+                        continue
+                    cur.execute(merge_sql(specs[name], f"stg_{name}"))
+                    loaded[name] = cur.rowcount
+                    print(f"✅ {name}: {loaded[name]} linhas (COPY)")
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    total = sum(loaded.values())
+    print(f"⚡ Bulk load: {total} linhas em {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} linhas/s)")
+    return loaded
@@ -0,0 +1,205 @@
+"""
+Manutenção incremental da DIM_CALENDARIO
+- Atributos calculados uma vez na geração: semana ISO, trimestre, dia da semana,
+  feriados nacionais e dias de pregão da B3
+- ensure_calendar() só gera os intervalos que ainda não existem na tabela
+  (uma contagem no caso comum) e grava tudo em um único upsert
+- Chamado antes dos upserts do data_fetcher (FK fact_*.data_fk -> data_pk) e no ETL
+"""
+
+import argparse
+import os
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+from supabase import create_client
+
+CALENDAR_TABLE = "dim_calendario"
+CALENDAR_COLUMNS = [
+    "data_pk", "ano", "mes", "is_business_day",
+    "dia_semana", "semana", "trimestre", "is_feriado", "nome_feriado", "is_trading_day",
+]
+PAGE_SIZE = 1000
+
+
+def easter(year: int) -> date:
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def brazil_holidays(year: int) -> Tuple[Dict[date, str], Dict[date, str]]:
+    """
+    Retorna (feriados nacionais, demais dias sem pregão na B3) do ano.
+    Carnaval e Corpus Christi são ponto facultativo, mas a B3 não abre.
+    """
+    pascoa = easter(year)
+    national = {
+        date(year, 1, 1): "Confraternização Universal",
+        pascoa - timedelta(days=2): "Sexta-feira Santa",
+        date(year, 4, 21): "Tiradentes",
+        date(year, 5, 1): "Dia do Trabalho",
+        date(year, 9, 7): "Independência do Brasil",
+        date(year, 10, 12): "Nossa Senhora Aparecida",
+        date(year, 11, 2): "Finados",
+        date(year, 11, 15): "Proclamação da República",
+        date(year, 12, 25): "Natal",
+    }
+    if year >= 2024:  # Lei 14.759/2023
+        national[date(year, 11, 20)] = "Dia Nacional de Zumbi e da Consciência Negra"
+
+    b3_closed = {
+        pascoa - timedelta(days=48): "Carnaval",
+        pascoa - timedelta(days=47): "Carnaval",
+        pascoa + timedelta(days=60): "Corpus Christi",
+        date(year, 12, 24): "Véspera de Natal",
+        date(year, 12, 31): "Último dia do ano",
+    }
+    return national, b3_closed
+
+
+def build_calendar(start, end) -> pd.DataFrame:
+    """Linhas de dim_calendario de start a end (inclusive), com todos os atributos"""
+    dates = pd.date_range(start=start, end=end, freq="D")
+    if dates.empty:
+        return pd.DataFrame(columns=CALENDAR_COLUMNS)
+
+    national: Dict[date, str] = {}
+    b3_closed: Dict[date, str] = {}
+    for year in range(dates[0].year, dates[-1].year + 1):
+        year_national, year_b3 = brazil_holidays(year)
+        national.update(year_national)
+        b3_closed.update(year_b3)
+
+    as_date = pd.Series(dates.date)
+    holiday_name = as_date.map(national)
+    closed_name = as_date.map(b3_closed)
+    weekday = dates.dayofweek < 5
+    name = holiday_name.where(holiday_name.notna(), closed_name)
+
+    return pd.DataFrame({
+        "data_pk": dates.strftime("%Y-%m-%d"),
+        "ano": dates.year,
+        "mes": dates.month,
+        "is_business_day": weekday,  # seg-sex (semântica original, usada pelas views)
+        "dia_semana": dates.isocalendar().day.to_numpy(dtype=int),  # 1=segunda ... 7=domingo
+        "semana": dates.isocalendar().week.to_numpy(dtype=int),
+        "trimestre": dates.quarter,
+        "is_feriado": holiday_name.notna().to_numpy(),
+        "nome_feriado": name.astype(object).where(name.notna(), None).to_numpy(),
+        "is_trading_day": weekday & holiday_name.isna().to_numpy() & closed_name.isna().to_numpy(),
+    })
+
+
+def _missing_spans(existing: List[str], start: date, end: date) -> List[Tuple[date, date]]:
+    """Intervalos contínuos de [start, end] que não estão em existing"""
+    present = set(pd.to_datetime(pd.Series(existing, dtype=object)).dt.date) if existing else set()
+    spans: List[Tuple[date, date]] = []
+    span_start: Optional[date] = None
+    current = start
+    while current <= end:
+        if current not in present:
+            span_start = span_start or current
+        elif span_start is not None:
+            spans.append((span_start, current - timedelta(days=1)))
+            span_start = None
+        current += timedelta(days=1)
+    if span_start is not None:
+        spans.append((span_start, end))
+    return spans
+
+
+def _existing_dates(client, start: str, end: str, expected: int) -> Optional[List[str]]:
+    """None se o intervalo já está completo (1 query); senão as datas presentes"""
+    response = (
+        client.table(CALENDAR_TABLE)
+        .select("data_pk", count="exact")
+        .gte("data_pk", start)
+        .lte("data_pk", end)
+        .limit(1)
+        .execute()
+    )
+    if response.count is not None and response.count >= expected:
+        return None
+
+    dates: List[str] = []
+    offset = 0
+    while True:
+        page = (
+            client.table(CALENDAR_TABLE)
+            .select("data_pk")
+            .gte("data_pk", start)
+            .lte("data_pk", end)
+            .order("data_pk")
+            .range(offset, offset + PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = page.data or []
+        dates.extend(str(row["data_pk"])[:10] for row in rows)
+        if len(rows) < PAGE_SIZE:
+            return dates
+        offset += PAGE_SIZE
+
+
+def ensure_calendar(client, start, end) -> int:
+    """
+    Garante dim_calendario para todas as datas de start a end.
+    Só os intervalos faltantes são gerados; retorna quantas linhas foram gravadas.
+    """
+    start = pd.Timestamp(start).date()
+    end = pd.Timestamp(end).date()
+    if end < start:
+        return 0
+
+    expected = (end - start).days + 1
+    existing = _existing_dates(client, start.isoformat(), end.isoformat(), expected)
+    if existing is None:
+        return 0
+
+    spans = _missing_spans(existing, start, end)
+    if not spans:
+        return 0
+    missing = pd.concat([build_calendar(span_start, span_end) for span_start, span_end in spans], ignore_index=True)
+
+    # Um único statement para todos os intervalos faltantes
+    records = missing.astype(object).where(missing.notna(), None).to_dict("records")
+    client.table(CALENDAR_TABLE).upsert(records, on_conflict="data_pk").execute()
+    print(f"📅 dim_calendario: {len(records)} datas adicionadas em {len(spans)} intervalo(s)")
+    return len(records)
+
+
+def refresh_calendar(client, start, end) -> int:
+    """Regrava os atributos de todo o intervalo (ex.: após a migração que criou as colunas)"""
+    calendar = build_calendar(start, end)
+    records = calendar.astype(object).where(calendar.notna(), None).to_dict("records")
+    client.table(CALENDAR_TABLE).upsert(records, on_conflict="data_pk").execute()
+    print(f"📅 dim_calendario: {len(records)} datas recalculadas")
+    return len(records)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Manutenção da dim_calendario")
+    parser.add_argument("start", help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("end", help="Data final (YYYY-MM-DD)")
+    parser.add_argument("--refresh", action="store_true", help="Recalcula os atributos de todo o intervalo")
+    args = parser.parse_args()
+
+    url = os.getenv("SUPABASE_URL") or os.getenv("VITE_SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    client = create_client(url, key)
+    if args.refresh:
+        refresh_calendar(client, args.start, args.end)
+    else:
+        ensure_calendar(client, args.start, args.end)
@@ -0,0 +1,100 @@
+"""
+Change detection antes do upsert no warehouse
+Lê as linhas já gravadas no intervalo em uma única query, compara de forma
+vetorizada (com tolerância por coluna para arredondamento de float) e separa
+inserts, updates reais e linhas inalteradas.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Tolerância absoluta padrão por coluna (abaixo disso a diferença é arredondamento)
+DEFAULT_TOLERANCE = 1e-6
+
+Tolerance = Union[float, Dict[str, float]]
+
+
+@dataclass
+class DiffResult:
+    inserts: pd.DataFrame
+    updates: pd.DataFrame
+    unchanged: int
+
+    @property
+    def changed(self) -> pd.DataFrame:
+        """Linhas a enviar no upsert (inserts + updates)"""
+        return pd.concat([self.inserts, self.updates], ignore_index=True)
+
+    def summary(self) -> str:
+        return f"{len(self.inserts)} novas, {len(self.updates)} alteradas, {self.unchanged} inalteradas"
+
+
+def fetch_existing(client, table: str, key: str, columns: List[str], start: str, end: str) -> pd.DataFrame:
+    """Linhas já gravadas em `table` com key entre start e end, indexadas pela key"""
+    response = (
+        client.table(table)
+        .select(", ".join([key] + columns))
+        .gte(key, start)
+        .lte(key, end)
+        .execute()
+    )
+    existing = pd.DataFrame(response.data or [], columns=[key] + columns)
+    existing[key] = existing[key].astype(str).str[:10]
+    return existing.set_index(key)
+
+
+def _column_tolerance(tolerance: Tolerance, column: str) -> float:
+    if isinstance(tolerance, dict):
+        return tolerance.get(column, DEFAULT_TOLERANCE)
+    return tolerance
+
+
+def _equal(new: pd.Series, old: pd.Series, tolerance: float) -> np.ndarray:
+    """Igualdade elemento a elemento; NaN == NaN e floats dentro da tolerância"""
+    if pd.api.types.is_numeric_dtype(new) and pd.api.types.is_numeric_dtype(old):
+        return np.isclose(new.to_numpy(dtype=float), old.to_numpy(dtype=float), rtol=0, atol=tolerance, equal_nan=True)
+    both_missing = new.isna().to_numpy() & old.isna().to_numpy()
+    return both_missing | (new.astype(object) == old.astype(object)).to_numpy()
+
+
+def diff_frames(
+    new: pd.DataFrame,
+    existing: pd.DataFrame,
+    key: str,
+    columns: Optional[List[str]] = None,
+    tolerance: Tolerance = DEFAULT_TOLERANCE,
+    fill_missing: bool = True,
+) -> DiffResult:
+    """
+    Compara `new` (com coluna key) com `existing` (indexado por key).
+    - fill_missing: valores ausentes em `new` herdam o valor gravado, para que
+      uma fonte que falhou não apague o dado das outras colunas
+    """
+    columns = columns or [c for c in new.columns if c != key]
+    columns = [c for c in columns if c in new.columns]
+
+    new = new.drop_duplicates(subset=[key], keep="last").set_index(key)
+    current = existing.reindex(new.index)
+    for column in columns:
+        if column not in current.columns:
+            current[column] = np.nan
+    is_new = ~new.index.isin(existing.index)
+
+    numeric = [c for c in columns if pd.api.types.is_numeric_dtype(new[c]) or new[c].isna().all()]
+    new[numeric] = new[numeric].apply(pd.to_numeric, errors="coerce")
+    current[numeric] = current[numeric].apply(pd.to_numeric, errors="coerce")
+
+    if fill_missing:
+        new[columns] = new[columns].where(new[columns].notna(), current[columns])
+
+    same = np.ones(len(new), dtype=bool)
+    for column in columns:
+        same &= _equal(new[column], current[column], _column_tolerance(tolerance, column))
+
+    inserts = new[is_new].reset_index()
+    updates = new[~is_new & ~same].reset_index()
+    unchanged = int((~is_new & same).sum())
+    return DiffResult(inserts=inserts, updates=updates, unchanged=unchanged)
@@ -0,0 +1,88 @@
+"""
+Checkpoints da carga do ETL
+- Cada entrada (arquivos + parâmetros de lote) tem um fingerprint
+- Os lotes concluídos são gravados em .etl_checkpoints/<fingerprint>.json à
+  medida que terminam; uma nova execução com a mesma entrada pula esses lotes
+- Ao final a carga é marcada como concluída e reexecutar vira no-op
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+CHECKPOINT_DIR = os.getenv("ETL_CHECKPOINT_DIR", ".etl_checkpoints")
+
+
+def file_fingerprint(paths: Iterable[str], extra: str = "") -> str:
+    """sha256 do conteúdo dos arquivos (lidos em blocos) + parâmetros que mudam os lotes"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    digest.update(extra.encode())
+    return digest.hexdigest()[:16]
+
+
+class Checkpoint:
+    """Estado da carga de uma entrada; thread-safe (o uploader marca lotes de vários workers)"""
+
+    def __init__(self, fingerprint: str, directory: str = CHECKPOINT_DIR):
+        self.fingerprint = fingerprint
+        self.path = os.path.join(directory, f"{fingerprint}.json")
+        self._lock = threading.Lock()
+        self._state: Dict[str, Any] = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            state["completed"] = {table: set(ids) for table, ids in state.get("completed", {}).items()}
+            return state
+        except (OSError, ValueError):
+            return {"fingerprint": self.fingerprint, "started_at": datetime.utcnow().isoformat(), "finished": False, "completed": {}}
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        state = dict(self._state)
+        state["completed"] = {table: sorted(ids) for table, ids in self._state["completed"].items()}
+        state["updated_at"] = datetime.utcnow().isoformat()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def finished(self) -> bool:
+        return bool(self._state.get("finished"))
+
+    def is_done(self, table: str, batch_id: str) -> bool:
+        with self._lock:
+            return batch_id in self._state["completed"].get(table, ())
+
+    def mark_done(self, table: str, batch_id: str) -> None:
+        with self._lock:
+            self._state["completed"].setdefault(table, set()).add(batch_id)
+            self._save()
+
+    def done_count(self, table: Optional[str] = None) -> int:
+        with self._lock:
+            if table is not None:
+                return len(self._state["completed"].get(table, ()))
+            return sum(len(ids) for ids in self._state["completed"].values())
+
+    def finish(self) -> None:
+        with self._lock:
+            self._state["finished"] = True
+            self._state["finished_at"] = datetime.utcnow().isoformat()
+            self._save()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = {"fingerprint": self.fingerprint, "started_at": datetime.utcnow().isoformat(), "finished": False, "completed": {}}
+            if os.path.exists(self.path):
+                os.remove(self.path)
@@ -9,14 +9,26 @@ APIs utilizadas:
 - Banco Central: Dólar (PTAX)
 """
 
-import requests
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 from supabase import create_client, Client
 import os
+import sys
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
+from functools import partial
+from typing import List, Tuple
+
+# api/lib/serialization é compartilhado com a API (raiz do repo no path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.lib.alerts import run_alerts
+from api.lib.serialization import frame_to_records
+from batch_uploader import upload_records
+from calendar_dim import ensure_calendar
+from change_detection import diff_frames, fetch_existing
+from http_client import SourceRequest, print_latency_report, run_sources
+from imea_scraper import BROWSER_HEADERS, IMEA_URL, parse_imea_page
+from watermarks import latest_date, load_watermarks, lookback_days, save_watermarks
 
 load_dotenv()
 
@@ -51,122 +63,206 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 
-def fetch_weather_data(lat: float = -15.6014, lon: float = -56.0979, days: int = 7):
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+BRAPI_URL = "https://brapi.dev/api/quote/{ticker}"
+# Valores de range aceitos pela Brapi e quantos dias cada um cobre (além deles, "max")
+BRAPI_RANGES = [("1d", 1), ("5d", 5), ("1mo", 31), ("3mo", 92), ("6mo", 183), ("1y", 366), ("2y", 731), ("5y", 1827), ("10y", 3653)]
+PTAX_URL = "https://olinda.bcb.gov.br/olinda/servico/PTAX/versao/v1/odata/CotacaoDolarPeriodo(dataInicial=@dataInicial,dataFinalCotacao=@dataFinalCotacao)"
+# TTL do cache de respostas por fonte (segundos); as execuções do dia se sobrepõem
+CACHE_TTL = {
+    "clima": 60 * 60,
+    "jbs": 15 * 60,
+    "dolar": 60 * 60,
+    "imea": 6 * 60 * 60,
+}
+
+
+# ============ Clima (Open-Meteo) ============
+# Regiões produtoras de MT; sobrescreva com WEATHER_LOCATIONS="Nome:lat:lon;Nome:lat:lon"
+DEFAULT_WEATHER_LOCATIONS = [
+    ("Cuiabá", -15.6014, -56.0979),
+    ("Sorriso", -12.5425, -55.7211),
+    ("Sinop", -11.8604, -55.5091),
+    ("Lucas do Rio Verde", -13.0588, -55.9042),
+    ("Rondonópolis", -16.4673, -54.6372),
+    ("Primavera do Leste", -15.5561, -54.2811),
+]
+# Coordenadas por request (o Open-Meteo aceita várias separadas por vírgula)
+WEATHER_BATCH_SIZE = int(os.getenv("WEATHER_BATCH_SIZE", "50"))
+WEATHER_CONFLICT = "data_fk,localizacao"
+
+Location = Tuple[str, float, float]
+
+
+def parse_locations(spec: str) -> List[Location]:
+    """ "Cuiabá:-15.60:-56.09;Sorriso:-12.54:-55.72" -> [(nome, lat, lon), ...]"""
+    locations = []
+    for item in spec.split(";"):
+        if not item.strip():
+            continue
+        name, lat, lon = item.rsplit(":", 2)
+        locations.append((name.strip(), float(lat), float(lon)))
+    return locations
+
+
+WEATHER_LOCATIONS = parse_locations(os.getenv("WEATHER_LOCATIONS", "")) or DEFAULT_WEATHER_LOCATIONS
+
+
+def weather_request(locations: List[Location] = None, days: int = 7, name: str = "clima") -> SourceRequest:
     """
-    Busca dados climáticos do Open-Meteo (sem API key!)
-    Coordenadas padrão: Cuiabá, MT
+    Busca dados climáticos do Open-Meteo (sem API key!) para várias
+    coordenadas em um único request
     https://open-meteo.com/
     """
-    print(f"🌦️ Buscando dados climáticos (Open-Meteo)...")
-    
-    url = "https://api.open-meteo.com/v1/forecast"
+    locations = locations or WEATHER_LOCATIONS
     params = {
-        'latitude': lat,
-        'longitude': lon,
+        'latitude': ",".join(str(lat) for _, lat, _ in locations),
+        'longitude': ",".join(str(lon) for _, _, lon in locations),
         'daily': 'temperature_2m_max,precipitation_sum',
         'timezone': 'America/Sao_Paulo',
         'forecast_days': days
     }
+    names = [location_name for location_name, _, _ in locations]
+    return SourceRequest(name, WEATHER_URL, partial(parse_weather_response, names=names), params=params, timeout=15, cache_ttl=CACHE_TTL["clima"])
+
+
+def weather_requests(locations: List[Location] = None, days: int = 7) -> List[SourceRequest]:
+    """Um request por lote de WEATHER_BATCH_SIZE coordenadas (clima, clima_2, ...)"""
+    locations = locations or WEATHER_LOCATIONS
+    return [
+        weather_request(locations[i:i + WEATHER_BATCH_SIZE], days, "clima" if i == 0 else f"clima_{i // WEATHER_BATCH_SIZE + 1}")
+        for i in range(0, len(locations), WEATHER_BATCH_SIZE)
+    ]
+
+
+def parse_weather_response(response, names: List[str] = ("Cuiabá",)) -> list:
+    data = response.json()
+    # Uma coordenada: objeto; várias: lista na mesma ordem dos parâmetros
+    payloads = data if isinstance(data, list) else [data]
+    records = []
     
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        records = []
-        daily = data.get('daily', {})
-        
-        for i in range(len(daily.get('time', []))):
+    for name, payload in zip(names, payloads):
+        daily = payload.get('daily', {})
+        for day, temp_max, chuva_mm in zip(daily.get('time', []), daily.get('temperature_2m_max', []), daily.get('precipitation_sum', [])):
             records.append({
-                'data_fk': daily['time'][i],
-                'temp_max': daily['temperature_2m_max'][i],
-                'chuva_mm': daily['precipitation_sum'][i],
-                'localizacao': 'Cuiabá'
+                'data_fk': day,
+                'temp_max': temp_max,
+                'chuva_mm': chuva_mm,
+                'localizacao': name
             })
-        
-        return records
-        
-    except Exception as e:
-        print(f"❌ Erro ao buscar clima: {e}")
-        return []
+    
+    return records
 
 
-def fetch_stock_data(ticker: str = "JBSS3", days: int = 30):
+def weather_records(results: dict) -> list:
+    """Junta os registros de todos os lotes de clima"""
+    return [
+        record
+        for name, result in results.items()
+        if name == "clima" or name.startswith("clima_")
+        for record in result.records
+    ]
+
+
+def fetch_weather_data(locations: List[Location] = None, days: int = 7):
+    print(f"🌦️ Buscando dados climáticos (Open-Meteo)...")
+    results = run_sources(weather_requests(locations, days))
+    for result in results.values():
+        if not result.ok:
+            print(f"❌ Erro ao buscar clima ({result.name}): {result.error}")
+    return weather_records(results)
+
+
+# ============ Ações (Brapi) ============
+def brapi_range(days: int) -> str:
+    """Menor range da Brapi que cobre os últimos N dias ("30d" não existe: vira "1mo")"""
+    return next((name for name, covered in BRAPI_RANGES if covered >= days), "max")
+
+
+def stock_request(ticker: str = "JBSS3", days: int = 30) -> SourceRequest:
     """
     Busca dados de ações brasileiras via Brapi.dev (API gratuita)
     Ticker JBS: JBSS3
     https://brapi.dev/
     """
-    print(f"📈 Buscando dados de {ticker} via Brapi...")
+    params = {
+        'range': brapi_range(days),  # cobre os últimos N dias; o excesso é recortado no parse
+        'interval': '1d',
+    }
     
-    try:
-        # Brapi.dev - API gratuita para ações brasileiras
-        url = f"https://brapi.dev/api/quote/{ticker}"
-        params = {
-            'range': f'{days}d',  # Últimos N dias
-            'interval': '1d',
-        }
-        
-        # Opcional: Usar token se disponível para evitar Rate Limit/401
-        brapi_token = os.getenv("BRAPI_API_TOKEN")
-        if brapi_token:
-            params['token'] = brapi_token
-            
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if not data.get('results'):
-            print(f"⚠️ Nenhum dado encontrado para {ticker}")
-            return []
-        
-        records = []
-        result = data['results'][0]
-        
-        # Tentar pegar dados históricos
-        historical = result.get('historicalDataPrice', [])
-        
-        if not historical:
-            # Se não houver histórico, usar o preço atual
-            print(f"⚠️ Sem histórico para {ticker}, usando preço atual")
-            current_price = result.get('regularMarketPrice', 0)
-            if current_price:
-                records.append({
-                    'data': datetime.now().strftime('%Y-%m-%d'),
-                    'valor_jbs': round(float(current_price), 2)
-                })
-            return records
-        
-        for item in historical:
-            try:
-                records.append({
-                    'data': item.get('date') or item.get('data'),
-                    'valor_jbs': round(float(item.get('close') or item.get('fechamento')), 2)
-                })
-            except (KeyError, ValueError, TypeError):
-                continue
-        
-        print(f"✅ {len(records)} cotações de {ticker} obtidas")
-        return records
-        
-    except Exception as e:
-        print(f"⚠️ Erro ao buscar {ticker} (Brapi): {e}")
+    # Opcional: Usar token se disponível para evitar Rate Limit/401
+    brapi_token = os.getenv("BRAPI_API_TOKEN")
+    if brapi_token:
+        params['token'] = brapi_token
+    
+    parse = partial(parse_stock_response, ticker=ticker, days=days)
+    return SourceRequest("jbs", BRAPI_URL.format(ticker=ticker), parse, params=params, timeout=10, cache_ttl=CACHE_TTL["jbs"])
+
+
+def parse_stock_response(response, ticker: str = "JBSS3", days: int = None) -> list:
+    data = response.json()
+    
+    if not data.get('results'):
+        print(f"⚠️ Nenhum dado encontrado para {ticker}")
         return []
+    
+    records = []
+    result = data['results'][0]
+    
+    # Tentar pegar dados históricos
+    historical = result.get('historicalDataPrice', [])
+    
+    if not historical:
+        # Se não houver histórico, usar o preço atual
+        print(f"⚠️ Sem histórico para {ticker}, usando preço atual")
+        current_price = result.get('regularMarketPrice', 0)
+        if current_price:
+            records.append({
+                'data': datetime.now().strftime('%Y-%m-%d'),
+                'valor_jbs': round(float(current_price), 2)
+            })
+        return records
+    
+    for item in historical:
+        try:
+            date_value = item.get('date') or item.get('data')
+            # Brapi retorna epoch (segundos) no histórico
+            if isinstance(date_value, (int, float)):
+                date_value = datetime.fromtimestamp(date_value).strftime('%Y-%m-%d')
+            records.append({
+                'data': date_value,
+                'valor_jbs': round(float(item.get('close') or item.get('fechamento')), 2)
+            })
+        except (KeyError, ValueError, TypeError):
+            continue
+    
+    if days is not None:
+        # O range pedido pode cobrir bem mais que a janela (ex.: 40 dias -> 3mo)
+        cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        records = [r for r in records if str(r['data']) >= cutoff]
+    
+    print(f"✅ {len(records)} cotações de {ticker} obtidas")
+    return records
 
 
-def fetch_dollar_data(days: int = 30):
+def fetch_stock_data(ticker: str = "JBSS3", days: int = 30):
+    print(f"📈 Buscando dados de {ticker} via Brapi...")
+    result = run_sources([stock_request(ticker, days)])["jbs"]
+    if not result.ok:
+        print(f"⚠️ Erro ao buscar {ticker} (Brapi): {result.error}")
+    return result.records
+
+
+# ============ Dólar (PTAX / Banco Central) ============
+def dollar_request(days: int = 30) -> SourceRequest:
     """
     Busca cotação do Dólar do Banco Central
     API: https://olinda.bcb.gov.br/
     """
-    print("💵 Buscando cotação do Dólar...")
-    
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
     
     # Formato correto da API do BC
-    url = "https://olinda.bcb.gov.br/olinda/servico/PTAX/versao/v1/odata/CotacaoDolarPeriodo(dataInicial=@dataInicial,dataFinalCotacao=@dataFinalCotacao)"
     params = {
         '@dataInicial': f"'{start_date.strftime('%m-%d-%Y')}'",
         '@dataFinalCotacao': f"'{end_date.strftime('%m-%d-%Y')}'",
@@ -174,94 +270,71 @@ def fetch_dollar_data(days: int = 30):
         '$format': 'json',
         '$select': 'cotacaoCompra,dataHoraCotacao'
     }
+    return SourceRequest("dolar", PTAX_URL, parse_dollar_response, params=params, timeout=10, cache_ttl=CACHE_TTL["dolar"])
+
+
+def parse_dollar_response(response) -> list:
+    data = response.json()
     
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        records = []
-        for item in data.get('value', []):
-            try:
-                # Parse da data
-                date_str = item['dataHoraCotacao'].split(' ')[0]
-                date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-                
-                records.append({
-                    'data': date_obj.strftime('%Y-%m-%d'),
-                    'valor_dolar': round(float(item['cotacaoCompra']), 4)
-                })
-            except (KeyError, ValueError) as e:
-                continue
-        
-        print(f"✅ {len(records)} cotações do dólar obtidas")
-        return records
-        
-    except requests.exceptions.Timeout:
-        print(f"⚠️ Timeout na API do BC - usando dados históricos")
-        return []
-    except Exception as e:
-        print(f"❌ Erro ao buscar dólar: {e}")
-        return []
+    records = []
+    for item in data.get('value', []):
+        try:
+            # Parse da data
+            date_str = item['dataHoraCotacao'].split(' ')[0]
+            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+            
+            records.append({
+                'data': date_obj.strftime('%Y-%m-%d'),
+                'valor_dolar': round(float(item['cotacaoCompra']), 4)
+            })
+        except (KeyError, ValueError) as e:
+            continue
+    
+    print(f"✅ {len(records)} cotações do dólar obtidas")
+    return records
 
 
-def fetch_imea_cattle_price():
+def fetch_dollar_data(days: int = 30):
+    print("💵 Buscando cotação do Dólar...")
+    result = run_sources([dollar_request(days)])["dolar"]
+    if not result.ok:
+        print(f"❌ Erro ao buscar dólar: {result.error}")
+    return result.records
+
+
+# ============ Boi Gordo (IMEA) ============
+def imea_request() -> SourceRequest:
     """
     Busca o indicador do Boi Gordo direto do IMEA (MT).
     Focado na cotação 'À Vista'.
     """
-    print("🐄 Buscando indicadores reais do IMEA (Mato Grosso)...")
-    url = "https://www.imea.com.br/imea-site/indicador-boi"
+    return SourceRequest("imea", IMEA_URL, parse_imea_response, headers=BROWSER_HEADERS, timeout=15, cache_ttl=CACHE_TTL["imea"])
+
+
+def parse_imea_response(response) -> list:
+    # Só a linha 'Mato Grosso' da tabela de indicadores é parseada (imea_scraper)
+    records = parse_imea_page(response)
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+    if records:
+        print(f"✅ Preço IMEA obtido: R$ {records[0]['valor_boi_gordo']}/@")
+    else:
+        print("⚠️ Não foi possível encontrar a linha 'Mato Grosso' no IMEA.")
+    return records
 
-    try:
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Localizando o valor de 'Mato Grosso' na tabela de indicadores
-        rows = soup.find_all('tr')
-        records = []
-        
-        for row in rows:
-            cols = row.find_all('td')
-            if cols and len(cols) > 1 and 'Mato Grosso' in cols[0].text:
-                try:
-                    preco_str = cols[1].text.strip().replace('.', '').replace(',', '.')
-                    preco_real = float(preco_str)
-                    
-                    records.append({
-                        'data': datetime.now().strftime('%Y-%m-%d'),
-                        'valor_boi_gordo': round(preco_real, 2)
-                    })
-                    break
-                except (ValueError, IndexError):
-                    continue
-        
-        if records:
-            print(f"✅ Preço IMEA obtido: R$ {records[0]['valor_boi_gordo']}/@")
-            return records
-        else:
-            print("⚠️ Não foi possível encontrar a linha 'Mato Grosso' no IMEA.")
-            return []
 
-    except Exception as e:
-        print(f"❌ Erro ao acessar IMEA: {e}")
-        return []
+def fetch_imea_cattle_price():
+    print("🐄 Buscando indicadores reais do IMEA (Mato Grosso)...")
+    result = run_sources([imea_request()])["imea"]
+    if not result.ok:
+        print(f"❌ Erro ao acessar IMEA: {result.error}")
+    return result.records
 
 
-def fetch_cattle_price(days: int = 30):
+def build_cattle_history(imea_data: list, days: int = 30):
     """
-    Busca preço do Boi Gordo do IMEA (Instituto Mato-Grossense de Economia Agropecuária)
-    IMEA é a referência oficial para MT
+    Monta a série de Boi Gordo a partir do preço do IMEA
+    (Instituto Mato-Grossense de Economia Agropecuária, referência oficial para MT)
     """
-    # Tentar pegar dados reais do IMEA
-    imea_data = fetch_imea_cattle_price()
-    
     if imea_data:
         # Se conseguir dados reais do IMEA, usar como base e simular histórico
         current_price = imea_data[0]['valor_boi_gordo']
@@ -301,18 +374,54 @@ def fetch_cattle_price(days: int = 30):
     return records
 
 
-def merge_and_save_market_data():
+def fetch_cattle_price(days: int = 30):
+    return build_cattle_history(fetch_imea_cattle_price(), days)
+
+
+# Fontes de mercado com watermark própria em ingestion_state
+MARKET_SOURCES = ("dolar", "jbs", "imea")
+MARKET_COLUMNS = ["valor_dolar", "valor_jbs", "valor_boi_gordo"]
+# Diferenças menores que isso são arredondamento da fonte, não alteração real
+MARKET_TOLERANCE = {"valor_dolar": 1e-4, "valor_jbs": 1e-3, "valor_boi_gordo": 1e-2}
+
+
+def fetch_all_sources(days=30) -> dict:
     """
-    Combina dados de diferentes fontes e salva no banco
+    Busca todas as fontes concorrentemente com um único pool de conexões.
+    O tempo total passa a ser o da fonte mais lenta, não a soma.
+    days: janela única (int) ou dias por fonte ({"dolar": 4, "jbs": 4, ...})
+    """
+    if not isinstance(days, dict):
+        days = {source: days for source in MARKET_SOURCES}
+    print("🌐 Buscando fontes em paralelo (Dólar, JBS, IMEA, Clima)...")
+    results = run_sources([
+        dollar_request(days["dolar"]),
+        stock_request("JBSS3", days["jbs"]),  # Brapi usa JBSS3 (sem .SA)
+        imea_request(),
+        *weather_requests(days=7),
+    ])
+    print_latency_report(results)
+    return results
+
+
+def merge_and_save_market_data(results: dict = None, days=30) -> int:
+    """
+    Combina dados de diferentes fontes e salva no banco.
+    Retorna o número de linhas gravadas (só as que mudaram).
     """
     print("\n" + "="*60)
     print("🚀 INICIANDO ATUALIZAÇÃO DE DADOS")
     print("="*60)
     
-    # Buscar dados
-    dollar_data = fetch_dollar_data(30)
-    stock_data = fetch_stock_data("JBSS3", 30)  # Brapi usa JBSS3 (sem .SA)
-    cattle_data = fetch_cattle_price(30)
+    if not isinstance(days, dict):
+        days = {source: days for source in MARKET_SOURCES}
+    
+    # Buscar dados (concorrente, se não vierem prontos de run_daily_update)
+    if results is None:
+        results = fetch_all_sources(days)
+    dollar_data = results["dolar"].records
+    stock_data = results["jbs"].records
+    cattle_data = build_cattle_history(results["imea"].records, days["imea"])
     
     print(f"📊 Dados obtidos: Dólar={len(dollar_data)}, JBS={len(stock_data)}, Boi={len(cattle_data)}")
     
@@ -335,7 +444,7 @@ def merge_and_save_market_data():
     # Verificar se temos ao menos um dataset com dados
     if df_dollar.empty and df_stock.empty and df_cattle.empty:
         print("⚠️ Nenhum dado disponível para processar")
-        return
+        return 0
     
     # Merge por data
     df_merged = df_dollar.merge(df_stock, on='data', how='outer')
@@ -347,21 +456,20 @@ def merge_and_save_market_data():
     # Remove linhas sem data_fk
     df_merged = df_merged.dropna(subset=['data_fk'])
     
-    # Limpar valores problemáticos para JSON
-    # 1. Substituir inf/-inf por NaN
-    df_merged = df_merged.replace([np.inf, -np.inf], np.nan)
-    
-    # 2. Converter NaN para None (JSON-compliant)
-    df_merged = df_merged.where(pd.notna(df_merged), None)
-    
-    # 3. Garantir que não há outros valores inválidos
-    for col in df_merged.columns:
-        if df_merged[col].dtype in ['float64', 'float32']:
-            # Remove linhas com valores inválidos em colunas numéricas
-            df_merged = df_merged[df_merged[col].apply(lambda x: x is None or (isinstance(x, (int, float)) and not np.isnan(x)))]
+    # Diff com o que já está gravado: só inserts e updates reais vão para o upsert
+    existing = fetch_existing(
+        supabase, 'fact_mercado', 'data_fk', MARKET_COLUMNS,
+        df_merged['data_fk'].min(), df_merged['data_fk'].max(),
+    )
+    diff = diff_frames(df_merged, existing, 'data_fk', MARKET_COLUMNS, MARKET_TOLERANCE)
+    print(f"🔎 fact_mercado: {diff.summary()}")
+    df_merged = diff.changed
+    if df_merged.empty:
+        print("✅ Nenhuma alteração em fact_mercado")
+        return 0
     
-    # Inserir no banco
-    records = df_merged.to_dict('records')
+    # Payload JSON-safe (NaN/inf -> null) montado direto das colunas
+    records = frame_to_records(df_merged)
     
     print(f"\n💾 Inserindo {len(records)} registros de mercado...")
     
@@ -370,28 +478,60 @@ def merge_and_save_market_data():
         print(f"📌 Primeiro registro: {records[0]}")
     
     try:
+        # FK data_fk -> dim_calendario: só os dias que faltam são criados
+        ensure_calendar(supabase, df_merged['data_fk'].min(), df_merged['data_fk'].max())
         supabase.table('fact_mercado').upsert(records, on_conflict='data_fk').execute()
         print(f"✅ {len(records)} registros de mercado atualizados")
+        return len(records)
     except Exception as e:
         print(f"❌ Erro ao salvar mercado: {e}")
         print(f"🔍 Registros com problema: {[r for r in records if not all(isinstance(v, (int, float, str, type(None))) for v in r.values())][:3]}")
         raise
 
 
-def save_weather_data():
+def save_weather_data(weather_data: list = None):
     """
-    Salva dados climáticos no banco
+    Salva dados climáticos no banco (todas as localizações em um upsert por lote)
     """
-    # Coordenadas de Cuiabá, MT
-    weather_data = fetch_weather_data(lat=-15.6014, lon=-56.0979, days=7)
+    if weather_data is None:
+        weather_data = fetch_weather_data(days=7)
     
     if weather_data:
-        print(f"\n💾 Inserindo {len(weather_data)} registros climáticos...")
+        # Uma linha por (data, localização): a última ocorrência vence
+        rows = list({(row['data_fk'], row['localizacao']): row for row in weather_data}.values())
+        print(f"\n💾 Inserindo {len(rows)} registros climáticos ({len({row['localizacao'] for row in rows})} localizações)...")
         try:
-            supabase.table('fact_clima').upsert(weather_data, on_conflict='data_fk').execute()
-            print(f"✅ {len(weather_data)} registros climáticos atualizados")
+            dates = [row['data_fk'] for row in rows]
+            ensure_calendar(supabase, min(dates), max(dates))
+            upload_records(supabase, 'fact_clima', rows, on_conflict=WEATHER_CONFLICT)
+            return len(rows)
         except Exception as e:
             print(f"❌ Erro ao salvar clima: {e}")
+    return 0
+
+
+def evaluate_alerts(tables: List[str]):
+    """
+    Regras de alerta (api/lib/alerts.py) sobre as tabelas que receberam dados
+    novos; notificações gravadas em lote para os usuários inscritos
+    """
+    if not tables:
+        return
+    try:
+        summary = run_alerts(supabase, tables)
+        print(f"🔔 Alertas ({', '.join(tables)}): {summary['alerts']} disparos, {summary['inserted']} notificações novas")
+    except Exception as e:
+        # Alerta não bloqueia a ingestão
+        print(f"⚠️ Erro ao avaliar alertas: {type(e).__name__}: {e}")
+
+
+def source_watermarks(results: dict) -> dict:
+    """Última data por fonte que respondeu; cache stale (ok=False) não avança a watermark"""
+    return {
+        source: latest_date(results[source].records)
+        for source in MARKET_SOURCES
+        if results[source].ok and latest_date(results[source].records)
+    }
 
 
 def run_daily_update():
@@ -402,8 +542,19 @@ def run_daily_update():
     print(f"📅 ATUALIZAÇÃO DIÁRIA - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*60)
     
-    merge_and_save_market_data()
-    save_weather_data()
+    # Janela por fonte a partir da última data gravada com sucesso
+    watermarks = load_watermarks(supabase)
+    days = {source: lookback_days(watermarks.get(source)) for source in MARKET_SOURCES}
+    print(f"🔖 Janela por fonte (dias): {days}")
+    
+    results = fetch_all_sources(days)
+    rows_written = merge_and_save_market_data(results, days)
+    weather_written = save_weather_data(weather_records(results))
+    
+    # Só avança a watermark das fontes que responderam (após o upsert ter sucesso)
+    save_watermarks(supabase, source_watermarks(results), rows_written, watermarks)
+    
+    evaluate_alerts([table for table, written in (('fact_mercado', rows_written), ('fact_clima', weather_written)) if written])
     
     print("\n" + "="*60)
     print("✅ ATUALIZAÇÃO CONCLUÍDA")
@@ -411,4 +562,15 @@ def run_daily_update():
 
 
 if __name__ == "__main__":
-    run_daily_update()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Atualiza mercado e clima no Supabase")
+    parser.add_argument("--daemon", action="store_true", help="Processo contínuo com polling por fonte (ingestion_daemon)")
+    args = parser.parse_args()
+
+    if args.daemon:
+        # Import tardio: ingestion_daemon importa este módulo
+        from ingestion_daemon import run_daemon
+        run_daemon()
+    else:
+        run_daily_update()
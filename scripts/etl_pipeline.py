@@ -12,9 +12,17 @@ Atende aos requisitos:
 import pandas as pd
 import numpy as np
 from supabase import create_client, Client
+import argparse
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional
+
+import bulk_loader
+from batch_uploader import BATCH_MAX_BYTES, BATCH_MAX_ROWS, UploadResult, upload_records
+from calendar_dim import build_calendar, ensure_calendar
+from checkpoint import Checkpoint, file_fingerprint
+from number_parser import parse_numeric_columns
 
 load_dotenv()
 
@@ -24,71 +32,112 @@ SUPABASE_KEY = os.getenv("VITE_SUPABASE_ANON_KEY")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 
-def create_dim_calendario(start_date: str, end_date: str):
+def build_dim_calendario(start_date: str, end_date: str) -> pd.DataFrame:
     """
-    Cria dimensão calendário com todos os dias (úteis e não úteis)
+    Dimensão calendário com todos os dias (úteis e não úteis)
     Essencial para análise de lag entre clima e mercado
     """
-    print("📅 Criando DIM_CALENDARIO...")
-    
-    date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    df_calendario = pd.DataFrame({
-        'data_pk': date_range.strftime('%Y-%m-%d'),
-        'ano': date_range.year,
-        'mes': date_range.month,
-        'is_business_day': date_range.dayofweek < 5  # True se seg-sex
-    })
-    
-    # Inserir em lotes
-    records = df_calendario.to_dict('records')
-    batch_size = 100
-    
-    for i in range(0, len(records), batch_size):
-        batch = records[i:i + batch_size]
-        try:
-            supabase.table('dim_calendario').upsert(batch, on_conflict='data_pk').execute()
-        except Exception as e:
-            print(f"Erro ao inserir calendário: {e}")
+    return build_calendar(start_date, end_date)
+
+
+def create_dim_calendario(start_date: str, end_date: str):
+    """
+    Garante a dimensão calendário via REST: só os intervalos que faltam
+    são gerados, em um único upsert
+    """
+    print("📅 Verificando DIM_CALENDARIO...")
+    added = ensure_calendar(supabase, start_date, end_date)
+    if not added:
+        print("✅ Calendário já cobre o intervalo")
+
+
+# Nome da coluna no CSV (normalizado: strip + lower) -> nome no warehouse
+FINANCE_COLUMN_MAP = {
+    'date': 'data',
+    'dolar': 'valor_dolar',
+    'jbs': 'valor_jbs',
+    'boi_gordo': 'valor_boi_gordo',
+}
+WEATHER_COLUMN_MAP = {
+    'date': 'data',
+    'chuva': 'chuva_mm',
+    'chuva_mm': 'chuva_mm',
+    'temp': 'temp_max',
+    'temp_max': 'temp_max',
+    'localizacao': 'localizacao',
+}
+FINANCE_VALUES = ['valor_dolar', 'valor_jbs', 'valor_boi_gordo']
+WEATHER_VALUES = ['chuva_mm', 'temp_max']
+
+# Linhas por chunk no modo streaming (0 = arquivo inteiro em memória)
+ETL_CHUNK_ROWS = int(os.getenv("ETL_CHUNK_ROWS", "0"))
+
+
+def _read_plan(csv_path: str, column_map: dict):
+    """Casa os nomes reais do cabeçalho (ex.: "Boi_Gordo ") com o mapa, lendo só o cabeçalho"""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    rename = {raw: column_map[raw.strip().lower()] for raw in header if raw.strip().lower() in column_map}
+    date_cols = [raw for raw, name in rename.items() if name == 'data']
+    return rename, date_cols
+
+
+def read_source_csv(csv_path: str, column_map: dict) -> pd.DataFrame:
+    """
+    Lê o CSV uma única vez só com as colunas do column_map (usecols),
+    com dtypes explícitos e data já convertida, e renomeia para o schema do banco.
+    """
+    rename, date_cols = _read_plan(csv_path, column_map)
+    dtypes = {
+        raw: 'float64' if name in FINANCE_VALUES + WEATHER_VALUES else 'string'
+        for raw, name in rename.items() if name != 'data'
+    }
     
-    print(f"✅ {len(records)} datas criadas")
-    return df_calendario
+    try:
+        df = pd.read_csv(csv_path, usecols=list(rename), dtype=dtypes, parse_dates=date_cols)
+    except ValueError:
+        # Números com formatação suja: lê como texto e o transform converte
+        df = pd.read_csv(csv_path, usecols=list(rename), dtype='string', parse_dates=date_cols)
+    return df.rename(columns=rename)
 
 
-def extract_and_clean_finance(csv_path: str) -> pd.DataFrame:
+def iter_source_csv(csv_path: str, column_map: dict, chunksize: int) -> Iterator[pd.DataFrame]:
     """
-    Extrai e limpa dados de mercado (finance.csv)
+    Versão em chunks de read_source_csv. Os valores numéricos não recebem dtype
+    fixo (um chunk sujo não derruba a leitura no meio); o transform converte.
+    """
+    rename, date_cols = _read_plan(csv_path, column_map)
+    dtypes = {raw: 'string' for raw, name in rename.items() if name == 'localizacao'}
+    for chunk in pd.read_csv(csv_path, usecols=list(rename), dtype=dtypes, parse_dates=date_cols, chunksize=chunksize):
+        yield chunk.rename(columns=rename)
+
+
+def clean_finance(df: pd.DataFrame, carry: Optional[pd.Series] = None, locales: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Transform de mercado (DataFrame -> DataFrame)
     
     Tratamento de NaN:
     - Forward fill (ffill) para dias não úteis
     - Mantém estrutura de 252 dias úteis/ano
+    - carry: últimos valores do chunk anterior (ffill atravessa chunks no streaming)
+    - locales: formato numérico por coluna (reaproveitado entre chunks)
     """
-    print("💰 Processando dados de mercado...")
-    
-    df = pd.read_csv(csv_path)
+    df = df.copy()
     
-    # Normalizar colunas
-    df.columns = df.columns.str.strip().str.lower()
-    column_map = {
-        'date': 'data',
-        'dolar': 'valor_dolar',
-        'jbs': 'valor_jbs',
-        'boi_gordo': 'valor_boi_gordo',
-    }
-    df = df.rename(columns=column_map)
-    
-    # Converter data para formato padrão
+    # Converter data para formato padrão (no-op se já veio como datetime)
     df['data'] = pd.to_datetime(df['data'], errors='coerce')
     
-    # Limpar números (remove separadores, converte vírgula)
-    for col in ['valor_dolar', 'valor_jbs', 'valor_boi_gordo']:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').round(4)
+    # Garantir numérico (colunas já float passam direto; texto pt-BR/en é detectado)
+    parse_numeric_columns(df, FINANCE_VALUES, locales, decimals=4)
+    for col in FINANCE_VALUES:
+        if col not in df.columns:
+            df[col] = np.nan
     
     # IMPORTANTE: Forward fill para preencher fins de semana
     # Isso mantém o último valor de sexta para sábado/domingo
     df = df.sort_values('data')
-    df[['valor_dolar', 'valor_jbs', 'valor_boi_gordo']] = df[['valor_dolar', 'valor_jbs', 'valor_boi_gordo']].ffill()
+    df[FINANCE_VALUES] = df[FINANCE_VALUES].ffill()
+    if carry is not None:
+        df[FINANCE_VALUES] = df[FINANCE_VALUES].fillna(carry)
     
     # Remover linhas sem data
     df = df.dropna(subset=['data'])
@@ -96,38 +145,27 @@ def extract_and_clean_finance(csv_path: str) -> pd.DataFrame:
     # Formatar data final
     df['data'] = df['data'].dt.strftime('%Y-%m-%d')
     
-    print(f"✅ {len(df)} registros de mercado processados")
-    return df
+    return df[['data'] + FINANCE_VALUES]
 
 
-def extract_and_clean_weather(csv_path: str) -> pd.DataFrame:
+def clean_weather(df: pd.DataFrame, locales: Optional[dict] = None) -> pd.DataFrame:
     """
-    Extrai e limpa dados climáticos (weather.csv)
+    Transform climático (DataFrame -> DataFrame)
     
     Tratamento de NaN:
     - Mantém NULL quando não há medição
     - Clima é contínuo (365 dias/ano)
     """
-    print("🌦️ Processando dados climáticos...")
-    
-    df = pd.read_csv(csv_path)
-    
-    # Normalizar colunas
-    df.columns = df.columns.str.strip().str.lower()
-    column_map = {
-        'date': 'data',
-        'chuva': 'chuva_mm',
-        'temp': 'temp_max',
-    }
-    df = df.rename(columns=column_map)
+    df = df.copy()
     
     # Converter data
     df['data'] = pd.to_datetime(df['data'], errors='coerce')
     
-    # Limpar números
-    for col in ['chuva_mm', 'temp_max']:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').round(2)
+    # Garantir numérico (colunas já float passam direto; texto pt-BR/en é detectado)
+    parse_numeric_columns(df, WEATHER_VALUES, locales, decimals=2)
+    for col in WEATHER_VALUES:
+        if col not in df.columns:
+            df[col] = np.nan
     
     # Localização padrão
     if 'localizacao' not in df.columns:
@@ -139,67 +177,162 @@ def extract_and_clean_weather(csv_path: str) -> pd.DataFrame:
     df = df.dropna(subset=['data'])
     df['data'] = df['data'].dt.strftime('%Y-%m-%d')
     
+    return df[['data'] + WEATHER_VALUES + ['localizacao']]
+
+
+def extract_and_clean_finance(csv_path: str) -> pd.DataFrame:
+    """
+    Extrai e limpa dados de mercado (finance.csv)
+    """
+    print("💰 Processando dados de mercado...")
+    df = clean_finance(read_source_csv(csv_path, FINANCE_COLUMN_MAP))
+    print(f"✅ {len(df)} registros de mercado processados")
+    return df
+
+
+def extract_and_clean_weather(csv_path: str) -> pd.DataFrame:
+    """
+    Extrai e limpa dados climáticos (weather.csv)
+    """
+    print("🌦️ Processando dados climáticos...")
+    df = clean_weather(read_source_csv(csv_path, WEATHER_COLUMN_MAP))
     print(f"✅ {len(df)} registros climáticos processados")
     return df
 
 
-def load_to_warehouse(df_finance: pd.DataFrame, df_weather: pd.DataFrame):
+def extract_and_clean_unified(csv_path: str):
+    """
+    Arquivo unificado (dados_agro.csv): um único parse, os dois transforms
+    aplicados sobre o mesmo DataFrame, sem arquivos temporários
+    """
+    print("📦 Processando dados_agro.csv (unificado)...")
+    df = read_source_csv(csv_path, {**FINANCE_COLUMN_MAP, **WEATHER_COLUMN_MAP})
+    df_finance = clean_finance(df[['data'] + [c for c in FINANCE_VALUES if c in df.columns]])
+    df_weather = clean_weather(df[[c for c in df.columns if c == 'data' or c not in FINANCE_VALUES]])
+    print(f"✅ {len(df_finance)} registros de mercado e {len(df_weather)} climáticos processados")
+    return df_finance, df_weather
+
+
+def stream_finance(csv_path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Mercado em chunks limpos. O ffill carrega o último valor entre chunks,
+    então o resultado bate com o caminho em memória desde que o arquivo esteja
+    em ordem cronológica (o caso dos históricos exportados).
+    """
+    carry = None
+    last_date = None
+    locales = {}
+    for chunk in iter_source_csv(csv_path, FINANCE_COLUMN_MAP, chunksize):
+        df = clean_finance(chunk, carry, locales)
+        if df.empty:
+            continue
+        if last_date is not None and df['data'].iloc[0] < last_date:
+            print(f"⚠️ {csv_path} fora de ordem cronológica: ffill entre chunks pode divergir")
+        carry = df[FINANCE_VALUES].iloc[-1]
+        last_date = df['data'].iloc[-1]
+        yield df
+
+
+def stream_weather(csv_path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Clima em chunks limpos (sem ffill, nada a carregar entre chunks)"""
+    locales = {}
+    for chunk in iter_source_csv(csv_path, WEATHER_COLUMN_MAP, chunksize):
+        df = clean_weather(chunk, locales)
+        if not df.empty:
+            yield df
+
+
+def iter_records(chunks: Iterable[pd.DataFrame]) -> Iterator[dict]:
+    """Registros (data -> data_fk) gerados chunk a chunk"""
+    for chunk in chunks:
+        yield from chunk.rename(columns={'data': 'data_fk'}).to_dict('records')
+
+
+def with_calendar(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """
+    Garante dim_calendario (FK das fatos) para cada chunk antes de repassá-lo.
+    O intervalo coberto é contínuo, inclusive nos dias entre um chunk e outro.
+    """
+    covered_until = None
+    for chunk in chunks:
+        start = chunk['data'].min() if covered_until is None else min(chunk['data'].min(), covered_until)
+        end = chunk['data'].max() if covered_until is None else max(chunk['data'].max(), covered_until)
+        create_dim_calendario(start, end)
+        covered_until = end
+        yield chunk
+
+
+def load_to_warehouse(df_finance: pd.DataFrame, df_weather: pd.DataFrame, checkpoint: Optional[Checkpoint] = None) -> List[UploadResult]:
     """
     Carrega dados no Data Warehouse (Supabase)
     Star Schema: DIM_CALENDARIO + FACT_MERCADO + FACT_CLIMA
+    
+    Idempotente: tudo é upsert nas tabelas existentes (sem truncate), então os
+    dashboards continuam servindo durante a carga. No caminho REST cada lote
+    concluído vai para o checkpoint e uma reexecução pula esses lotes.
+    Retorna os resultados do upload REST (vazio no COPY, que é transacional).
     """
     print("\n📦 Carregando no Data Warehouse...")
     
-    # Limpar tabelas primeiro
-    print("🗑️ Limpando dados antigos...")
-    try:
-        supabase.table('fact_mercado').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        supabase.table('fact_clima').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        supabase.table('dim_calendario').delete().neq('data_pk', '1900-01-01').execute()
-        print("✅ Tabelas limpas")
-    except Exception as e:
-        print(f"⚠️ Aviso: {e}")
-    
-    # 1. Criar dimensão calendário
     min_date = min(df_finance['data'].min(), df_weather['data'].min())
     max_date = max(df_finance['data'].max(), df_weather['data'].max())
+    
+    # Caminho rápido: COPY direto no Postgres, merge das 3 tabelas em uma transação
+    if bulk_loader.is_available():
+        print("⚡ DATABASE_URL definido, carregando via COPY FROM STDIN...")
+        bulk_loader.bulk_load({
+            'dim_calendario': build_dim_calendario(min_date, max_date),
+            'fact_mercado': df_finance.rename(columns={'data': 'data_fk'}),
+            'fact_clima': df_weather.rename(columns={'data': 'data_fk'}),
+        })
+        return []
+    
+    # 1. Criar dimensão calendário
     create_dim_calendario(min_date, max_date)
     
     # 2. Carregar FACT_MERCADO
     print("\n💰 Carregando FACT_MERCADO...")
     records_finance = df_finance.rename(columns={'data': 'data_fk'}).to_dict('records')
-    
-    batch_size = 100
-    success_finance = 0
-    
-    for i in range(0, len(records_finance), batch_size):
-        batch = records_finance[i:i + batch_size]
-        try:
-            supabase.table('fact_mercado').insert(batch).execute()
-            success_finance += len(batch)
-        except Exception as e:
-            print(f"Erro: {e}")
-    
-    print(f"✅ {success_finance} registros de mercado inseridos")
+    finance_result = upload_records(supabase, 'fact_mercado', records_finance, on_conflict=bulk_loader.conflict_target('fact_mercado'), checkpoint=checkpoint)
     
     # 3. Carregar FACT_CLIMA
     print("\n🌦️ Carregando FACT_CLIMA...")
     records_weather = df_weather.rename(columns={'data': 'data_fk'}).to_dict('records')
+    weather_result = upload_records(supabase, 'fact_clima', records_weather, on_conflict=bulk_loader.conflict_target('fact_clima'), checkpoint=checkpoint)
+    return [finance_result, weather_result]
+
+
+def load_stream_to_warehouse(
+    finance_chunks: Iterable[pd.DataFrame],
+    weather_chunks: Iterable[pd.DataFrame],
+    checkpoint: Optional[Checkpoint] = None,
+) -> List[UploadResult]:
+    """
+    Carga em streaming: os chunks vão direto para o loader, sem juntar o
+    arquivo inteiro em memória (mesma semântica de upsert + checkpoint)
+    """
+    print("\n📦 Carregando no Data Warehouse (streaming)...")
+    
+    if bulk_loader.is_available():
+        print("⚡ DATABASE_URL definido, carregando via COPY FROM STDIN...")
+        def to_schema(chunks):
+            return (chunk.rename(columns={'data': 'data_fk'}) for chunk in chunks)
+        
+        bulk_loader.bulk_load({
+            'fact_mercado': to_schema(finance_chunks),
+            'fact_clima': to_schema(weather_chunks),
+        }, with_calendar=True)
+        return []
     
-    success_weather = 0
-    
-    for i in range(0, len(records_weather), batch_size):
-        batch = records_weather[i:i + batch_size]
-        try:
-            supabase.table('fact_clima').insert(batch).execute()
-            success_weather += len(batch)
-        except Exception as e:
-            print(f"Erro: {e}")
+    print("\n💰 Carregando FACT_MERCADO...")
+    finance_result = upload_records(supabase, 'fact_mercado', iter_records(with_calendar(finance_chunks)), on_conflict=bulk_loader.conflict_target('fact_mercado'), checkpoint=checkpoint)
     
-    print(f"✅ {success_weather} registros climáticos inseridos")
+    print("\n🌦️ Carregando FACT_CLIMA...")
+    weather_result = upload_records(supabase, 'fact_clima', iter_records(with_calendar(weather_chunks)), on_conflict=bulk_loader.conflict_target('fact_clima'), checkpoint=checkpoint)
+    return [finance_result, weather_result]
 
 
-def run_etl_pipeline():
+def run_etl_pipeline(chunksize: int = ETL_CHUNK_ROWS, force: bool = False):
     """
     Pipeline ETL completo
     Atende aos requisitos do case Verde Futuro Capital
@@ -214,41 +347,50 @@ def run_etl_pipeline():
     unified_path = 'csv/dados_agro.csv'
     finance_path = 'csv/finance_data.csv'
     weather_path = 'csv/weather_data.csv'
+    
+    sources = [unified_path] if os.path.exists(unified_path) else [finance_path, weather_path]
+    
+    # Checkpoint por entrada: mesmos arquivos + mesmos parâmetros de lote = mesmos lotes
+    fingerprint = file_fingerprint(
+        sources, extra=f"chunks={chunksize};bytes={BATCH_MAX_BYTES};rows={BATCH_MAX_ROWS}"
+    )
+    checkpoint = Checkpoint(fingerprint)
+    if force:
+        checkpoint.reset()
+    if checkpoint.finished:
+        print(f"✅ Esta entrada já foi carregada (checkpoint {fingerprint}). Use --force para recarregar.")
+        return
+    if checkpoint.done_count():
+        print(f"♻️ Retomando carga: {checkpoint.done_count()} lotes já concluídos (checkpoint {fingerprint})")
 
-    if os.path.exists(unified_path):
-        print("📦 Detectado dados_agro.csv (unificado). Gerando DF de mercado e clima...")
-        df = pd.read_csv(unified_path)
-        df.columns = df.columns.str.strip().str.lower()
-        # mapear nomes
-        df = df.rename(columns={
-            'date': 'data',
-            'dolar': 'valor_dolar',
-            'jbs': 'valor_jbs',
-            'boi_gordo': 'valor_boi_gordo',
-            'temp_max': 'temp_max',
-            'chuva_mm': 'chuva_mm'
-        })
-        # separar cópias e aplicar mesmas limpezas das funções dedicadas
-        df_f = df[['data','valor_dolar','valor_jbs','valor_boi_gordo']].copy()
-        df_w = df[['data','temp_max','chuva_mm']].copy()
-
-        # Reaproveitar lógicas de limpeza
-        df_f.to_csv('csv/_tmp_finance.csv', index=False)
-        df_w.to_csv('csv/_tmp_weather.csv', index=False)
-        df_finance = extract_and_clean_finance('csv/_tmp_finance.csv')
-        df_weather = extract_and_clean_weather('csv/_tmp_weather.csv')
-        # limpar temporários
-        try:
-            os.remove('csv/_tmp_finance.csv')
-            os.remove('csv/_tmp_weather.csv')
-        except Exception:
-            pass
+    if chunksize:
+        # Streaming: memória constante; o unificado é lido em duas passadas
+        # (só as colunas de cada fato em cada uma)
+        print(f"🌊 Modo streaming: chunks de {chunksize} linhas")
+        source_finance = unified_path if os.path.exists(unified_path) else finance_path
+        source_weather = unified_path if os.path.exists(unified_path) else weather_path
+        results = load_stream_to_warehouse(
+            stream_finance(source_finance, chunksize),
+            stream_weather(source_weather, chunksize),
+            checkpoint,
+        )
     else:
-        df_finance = extract_and_clean_finance(finance_path)
-        df_weather = extract_and_clean_weather(weather_path)
-    
-    # Load
-    load_to_warehouse(df_finance, df_weather)
+        if os.path.exists(unified_path):
+            df_finance, df_weather = extract_and_clean_unified(unified_path)
+        else:
+            df_finance = extract_and_clean_finance(finance_path)
+            df_weather = extract_and_clean_weather(weather_path)
+        
+        # Load
+        results = load_to_warehouse(df_finance, df_weather, checkpoint)
+    
+    # Lote com falha transitória não está no checkpoint: a entrada só é
+    # marcada como carregada quando todos os lotes terminaram
+    incomplete = sum(result.incomplete for result in results)
+    if incomplete:
+        print(f"\n⚠️ {incomplete} lotes não concluídos (falha de rede/servidor). Rode de novo para retomar.")
+        return
+    checkpoint.finish()
     
     print("\n" + "=" * 60)
     print("✅ ETL PIPELINE CONCLUÍDO")
@@ -261,4 +403,10 @@ def run_etl_pipeline():
 
 
 if __name__ == "__main__":
-    run_etl_pipeline()
+    parser = argparse.ArgumentParser(description="ETL AgroData Nexus")
+    parser.add_argument("--chunksize", type=int, default=ETL_CHUNK_ROWS,
+                        help="Linhas por chunk (streaming para arquivos grandes); 0 = tudo em memória")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignora o checkpoint e recarrega a entrada inteira")
+    args = parser.parse_args()
+    run_etl_pipeline(args.chunksize, args.force)
@@ -0,0 +1,181 @@
+"""
+HTTP client compartilhado pelas fontes do data_fetcher
+- Sessão httpx assíncrona com pool de conexões
+- Timeout por fonte e retry com backoff exponencial + jitter
+- Execução concorrente das fontes com relatório de latência
+- Fontes com cache_ttl passam pelo cache em disco (response_cache)
+"""
+
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+from response_cache import ResponseCache, default_cache
+
+DEFAULT_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "15"))  # seconds
+DEFAULT_RETRIES = int(os.getenv("FETCH_RETRIES", "3"))
+DEFAULT_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+
+# Status que valem nova tentativa (rate limit / instabilidade do upstream)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+Parser = Callable[[httpx.Response], List[Dict[str, Any]]]
+
+
+@dataclass
+class SourceRequest:
+    """Uma chamada a uma fonte externa + como transformar a resposta em registros"""
+    name: str
+    url: str
+    parse: Parser
+    params: Dict[str, Any] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+    timeout: float = DEFAULT_TIMEOUT
+    retries: int = DEFAULT_RETRIES
+    backoff_base: float = 0.5
+    backoff_cap: float = 8.0
+    cache_ttl: Optional[float] = None  # segundos; None = sem cache
+
+
+@dataclass
+class SourceResult:
+    name: str
+    records: List[Dict[str, Any]]
+    latency_ms: float
+    attempts: int
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    cache: Optional[str] = None  # hit | revalidated | stored | stale | offline
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Backoff exponencial com full jitter: uniforme em [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def create_client(max_connections: int = 20, **kwargs) -> httpx.AsyncClient:
+    """Cliente com pool compartilhado (keep-alive entre as chamadas de uma execução)"""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return httpx.AsyncClient(limits=limits, timeout=DEFAULT_TIMEOUT, follow_redirects=True, **kwargs)
+
+
+async def fetch_source(client: httpx.AsyncClient, request: SourceRequest, cache: Optional[ResponseCache] = None) -> SourceResult:
+    """Executa uma fonte com retry; nunca levanta exceção (erro vai no SourceResult)"""
+    started = time.perf_counter()
+    status_code = None
+    error = None
+
+    cache = cache or default_cache()
+    use_cache = request.cache_ttl is not None and cache.enabled
+    cached = cache.load(request.url, request.params) if use_cache else None
+
+    def from_cache(entry, label: str) -> SourceResult:
+        records = request.parse(entry.to_response())
+        return SourceResult(request.name, records, (time.perf_counter() - started) * 1000, 0, entry.status_code, cache=label)
+
+    if use_cache and cache.offline:
+        if cached is None:
+            return SourceResult(request.name, [], 0.0, 0, error="cache miss (HTTP_CACHE_MODE=offline)", cache="offline")
+        try:
+            return from_cache(cached, "offline")
+        except Exception as e:
+            return SourceResult(request.name, [], 0.0, 0, error=f"{type(e).__name__}: {e}", cache="offline")
+    if cached is not None and cached.is_fresh(request.cache_ttl):
+        try:
+            return from_cache(cached, "hit")
+        except Exception:
+            cached = None  # entrada inválida: busca de novo
+
+    headers = dict(request.headers)
+    if cached is not None:
+        headers.update(cached.validators())
+
+    for attempt in range(request.retries + 1):
+        try:
+            response = await client.get(request.url, params=request.params, headers=headers, timeout=request.timeout)
+            status_code = response.status_code
+            if status_code == 304 and cached is not None:
+                refreshed = cache.touch(request.url, request.params, cached, response)
+                result = from_cache(refreshed, "revalidated")
+                result.attempts = attempt + 1
+                return result
+            if status_code in RETRY_STATUS and attempt < request.retries:
+                error = f"HTTP {status_code}"
+                await asyncio.sleep(backoff_delay(attempt, request.backoff_base, request.backoff_cap))
+                continue
+            response.raise_for_status()
+            records = request.parse(response)
+            # Só grava depois do parse: resposta que não parseia não vira fixture
+            label = None
+            if use_cache:
+                cache.store(request.url, request.params, response)
+                label = "stored"
+            return SourceResult(request.name, records, (time.perf_counter() - started) * 1000, attempt + 1, status_code, cache=label)
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            if attempt < request.retries:
+                await asyncio.sleep(backoff_delay(attempt, request.backoff_base, request.backoff_cap))
+                continue
+        except Exception as e:
+            # Erro HTTP definitivo (4xx) ou falha de parsing: não adianta repetir
+            error = f"{type(e).__name__}: {e}"
+        break
+
+    if cached is not None:
+        # Upstream fora do ar: a última resposta boa é melhor que nada, mas a
+        # fonte continua em erro (ok=False) para watermark/saúde/relatório
+        try:
+            result = from_cache(cached, "stale")
+            result.attempts = attempt + 1
+            result.error = f"stale: {error}"
+            return result
+        except Exception:
+            pass
+    return SourceResult(request.name, [], (time.perf_counter() - started) * 1000, attempt + 1, status_code, error)
+
+
+async def fetch_all(
+    requests: Iterable[SourceRequest],
+    client: Optional[httpx.AsyncClient] = None,
+    max_concurrency: int = DEFAULT_CONCURRENCY,
+) -> Dict[str, SourceResult]:
+    """Executa as fontes concorrentemente (limitado por max_concurrency)"""
+    requests = list(requests)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    own_client = client is None
+    client = client or create_client()
+
+    async def bounded(request: SourceRequest) -> SourceResult:
+        async with semaphore:
+            return await fetch_source(client, request)
+
+    try:
+        results = await asyncio.gather(*(bounded(r) for r in requests))
+    finally:
+        if own_client:
+            await client.aclose()
+    return {result.name: result for result in results}
+
+
+def run_sources(requests: Iterable[SourceRequest], **kwargs) -> Dict[str, SourceResult]:
+    """Versão síncrona de fetch_all (para scripts/cron)"""
+    return asyncio.run(fetch_all(requests, **kwargs))
+
+
+def print_latency_report(results: Dict[str, SourceResult]) -> None:
+    print("\n⏱️ Latência por fonte:")
+    for result in sorted(results.values(), key=lambda r: -r.latency_ms):
+        status_icon = "✅" if result.ok else "❌"
+        detail = f"{len(result.records)} registros" if result.ok else result.error
+        if result.cache:
+            detail += f"  cache={result.cache}"
+        print(f"   {status_icon} {result.name:<10} {result.latency_ms:>8.0f} ms  tentativas={result.attempts}  {detail}")
@@ -0,0 +1,136 @@
+"""
+Scraper do indicador do Boi Gordo (IMEA)
+- Só a linha da região é parseada: seletor CSS/XPath direto na tabela do
+  indicador, em vez de montar a árvore da página inteira com html.parser
+- Backend mais rápido disponível: selectolax -> lxml -> recorte da <tr> (stdlib + bs4)
+- Histórico: uma página por data (IMEA_HISTORY_URL), buscadas em paralelo pelo
+  backfill (--sources imea)
+"""
+
+import os
+from datetime import date, datetime
+from functools import partial
+from typing import Callable, Dict, Optional
+
+from bs4 import BeautifulSoup
+
+from http_client import SourceRequest
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+IMEA_URL = "https://www.imea.com.br/imea-site/indicador-boi"
+# Página de uma data; placeholders {date} (YYYY-MM-DD) e {date_br} (DD/MM/YYYY)
+IMEA_HISTORY_URL = os.getenv("IMEA_HISTORY_URL", "")
+IMEA_REGION = "Mato Grosso"
+IMEA_ROW_SELECTOR = os.getenv("IMEA_ROW_SELECTOR", "table tr")
+IMEA_HISTORY_CONCURRENCY = int(os.getenv("IMEA_HISTORY_CONCURRENCY", "4"))  # páginas simultâneas no backfill
+# Página de uma data passada não muda
+IMEA_HISTORY_CACHE_TTL = 30 * 24 * 60 * 60
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+Parser = Callable[[str, str], Optional[float]]
+
+
+def _price(text: str) -> Optional[float]:
+    """ "R$ 1.310,50" -> 1310.5"""
+    cleaned = text.strip().replace("R$", "").replace(".", "").replace(",", ".").strip()
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def parse_selectolax(html: str, region: str = IMEA_REGION) -> Optional[float]:
+    for row in SelectolaxParser(html).css(IMEA_ROW_SELECTOR):
+        cells = row.css("td")
+        if len(cells) > 1 and region in cells[0].text():
+            price = _price(cells[1].text())
+            if price is not None:
+                return price
+    return None
+
+
+def parse_lxml(html: str, region: str = IMEA_REGION) -> Optional[float]:
+    doc = lxml_html.fromstring(html)
+    for row in doc.xpath("//table//tr[td[2] and contains(td[1], $region)]", region=region):
+        price = _price(row.xpath("string(td[2])"))
+        if price is not None:
+            return price
+    return None
+
+
+def parse_targeted(html: str, region: str = IMEA_REGION) -> Optional[float]:
+    """
+    Sem selectolax/lxml: localiza a região no texto, recorta a <tr> em volta
+    e só esse trecho passa pelo BeautifulSoup
+    """
+    lower = html.lower()
+    pos = html.find(region)
+    while pos >= 0:
+        start = lower.rfind("<tr", 0, pos)
+        end = lower.find("</tr>", pos)
+        if start >= 0 and end >= 0 and lower.rfind("<table", 0, start) >= 0:
+            cells = BeautifulSoup(html[start:end + 5], "html.parser").find_all("td")
+            if len(cells) > 1 and region in cells[0].get_text():
+                price = _price(cells[1].get_text())
+                if price is not None:
+                    return price
+        pos = html.find(region, pos + len(region))
+    return None
+
+
+def parse_full_tree(html: str, region: str = IMEA_REGION) -> Optional[float]:
+    """Parser antigo (árvore inteira com html.parser + varredura de todas as <tr>); referência do benchmark"""
+    for row in BeautifulSoup(html, "html.parser").find_all("tr"):
+        cols = row.find_all("td")
+        if cols and len(cols) > 1 and region in cols[0].text:
+            price = _price(cols[1].text)
+            if price is not None:
+                return price
+    return None
+
+
+def available_parsers() -> Dict[str, Parser]:
+    """Backends instalados, do mais rápido para o mais lento"""
+    parsers: Dict[str, Parser] = {}
+    if SelectolaxParser is not None:
+        parsers["selectolax"] = parse_selectolax
+    if lxml_html is not None:
+        parsers["lxml"] = parse_lxml
+    parsers["targeted"] = parse_targeted
+    return parsers
+
+
+def parse_cattle_price(html: str, region: str = IMEA_REGION) -> Optional[float]:
+    """Preço à vista da região (R$/@) com o backend mais rápido disponível"""
+    return next(iter(available_parsers().values()))(html, region)
+
+
+def parse_imea_page(response, as_of: Optional[date] = None) -> list:
+    price = parse_cattle_price(response.text)
+    if price is None:
+        return []
+    day = as_of or datetime.now().date()
+    return [{'data': day.strftime('%Y-%m-%d'), 'valor_boi_gordo': round(price, 2)}]
+
+
+# ============ Histórico ============
+def history_request(day: date, template: Optional[str] = None) -> SourceRequest:
+    template = template or IMEA_HISTORY_URL
+    if not template:
+        raise ValueError("IMEA_HISTORY_URL não configurado (ex.: https://.../indicador-boi?data={date_br})")
+    url = template.format(date=day.isoformat(), date_br=day.strftime("%d/%m/%Y"))
+    return SourceRequest(
+        f"imea_{day.isoformat()}", url, partial(parse_imea_page, as_of=day),
+        headers=BROWSER_HEADERS, timeout=15, cache_ttl=IMEA_HISTORY_CACHE_TTL,
+    )
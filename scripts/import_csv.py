@@ -8,6 +8,10 @@ from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
 
+import bulk_loader
+from batch_uploader import upload_records
+from number_parser import parse_numeric_columns
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
@@ -16,13 +20,23 @@ SUPABASE_KEY = os.getenv("VITE_SUPABASE_ANON_KEY")
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-def clean_and_import_finance(csv_path: str):
-    """Importa dados de mercado (finance_data.csv)"""
-    print(f"📊 Lendo {csv_path}...")
-    
-    # Ler CSV com Pandas
-    df = pd.read_csv(csv_path)
-    
+# Linhas por chunk na leitura do CSV (memória constante em arquivos grandes)
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "50000"))
+
+
+def read_csv_chunks(csv_path: str, chunksize: int = IMPORT_CHUNK_ROWS):
+    """Lê o CSV em chunks (chunksize=0 lê o arquivo inteiro de uma vez)"""
+    if chunksize:
+        yield from pd.read_csv(csv_path, chunksize=chunksize)
+    else:
+        yield pd.read_csv(csv_path)
+
+
+def clean_finance_chunk(df: pd.DataFrame, locales: dict = None) -> pd.DataFrame:
+    """
+    Limpa um chunk de finance_data.csv (colunas no schema de fact_mercado)
+    locales: formato numérico por coluna, detectado no primeiro chunk
+    """
     # Normalizar nomes de colunas
     df.columns = df.columns.str.strip().str.lower()
     
@@ -40,63 +54,23 @@ def clean_and_import_finance(csv_path: str):
     # Converter data para formato correto
     df['data'] = pd.to_datetime(df['data'], errors='coerce').dt.strftime('%Y-%m-%d')
     
-    # Limpar e converter números
+    # Limpar e converter números (pt-BR "1.234,56" ou en "1,234.56", detectado por coluna)
+    parse_numeric_columns(df, ['valor_dolar', 'valor_jbs', 'valor_boi_gordo'], locales, decimals=4)
     for col in ['valor_dolar', 'valor_jbs', 'valor_boi_gordo']:
-        if col in df.columns:
-            df[col] = (
-                df[col]
-                .astype(str)
-                .str.replace('.', '', regex=False)  # Remove separador de milhar
-                .str.replace(',', '.', regex=False)  # Converte vírgula decimal
-                .str.strip()
-            )
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            df[col] = df[col].round(4)  # Arredondar para 4 casas decimais
+        if col not in df.columns:
+            df[col] = None
     
     # Remover linhas com data inválida
     df = df.dropna(subset=['data'])
     
-    # Preparar dados para inserção
-    records = df[['data', 'valor_dolar', 'valor_jbs', 'valor_boi_gordo']].to_dict('records')
-    
-    # Renomear 'data' para 'data_fk'
-    records = [
-        {
-            'data_fk': r['data'],
-            'valor_dolar': r['valor_dolar'],
-            'valor_jbs': r['valor_jbs'],
-            'valor_boi_gordo': r['valor_boi_gordo']
-        }
-        for r in records
-    ]
-    
-    print(f"✅ {len(records)} registros prontos para inserção")
-    
-    # Inserir em lotes de 100
-    batch_size = 100
-    success = 0
-    errors = 0
-    
-    for i in range(0, len(records), batch_size):
-        batch = records[i:i + batch_size]
-        try:
-            response = supabase.table('fact_mercado').insert(batch).execute()
-            success += len(batch)
-            print(f"✅ Lote {i//batch_size + 1}: {len(batch)} registros inseridos")
-        except Exception as e:
-            errors += len(batch)
-            print(f"❌ Erro no lote {i//batch_size + 1}: {e}")
-    
-    print(f"\n📊 Resultado: {success} sucesso, {errors} erros")
-
-
-def clean_and_import_weather(csv_path: str):
-    """Importa dados climáticos (weather_data.csv)"""
-    print(f"🌦️ Lendo {csv_path}...")
-    
-    # Ler CSV com Pandas
-    df = pd.read_csv(csv_path)
-    
+    return df[['data', 'valor_dolar', 'valor_jbs', 'valor_boi_gordo']].rename(columns={'data': 'data_fk'})
+
+
+def clean_weather_chunk(df: pd.DataFrame, locales: dict = None) -> pd.DataFrame:
+    """
+    Limpa um chunk de weather_data.csv (colunas no schema de fact_clima)
+    locales: formato numérico por coluna, detectado no primeiro chunk
+    """
     # Normalizar nomes de colunas
     df.columns = df.columns.str.strip().str.lower()
     
@@ -116,18 +90,11 @@ def clean_and_import_weather(csv_path: str):
     # Converter data para formato correto
     df['data'] = pd.to_datetime(df['data'], errors='coerce').dt.strftime('%Y-%m-%d')
     
-    # Limpar e converter números
+    # Limpar e converter números (pt-BR "1.234,56" ou en "1,234.56", detectado por coluna)
+    parse_numeric_columns(df, ['chuva_mm', 'temp_max'], locales, decimals=4)
     for col in ['chuva_mm', 'temp_max']:
-        if col in df.columns:
-            df[col] = (
-                df[col]
-                .astype(str)
-                .str.replace('.', '', regex=False)
-                .str.replace(',', '.', regex=False)
-                .str.strip()
-            )
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            df[col] = df[col].round(4)
+        if col not in df.columns:
+            df[col] = None
     
     # Preencher localização padrão
     if 'localizacao' not in df.columns:
@@ -138,38 +105,44 @@ def clean_and_import_weather(csv_path: str):
     # Remover linhas com data inválida
     df = df.dropna(subset=['data'])
     
-    # Preparar dados para inserção
-    records = df[['data', 'chuva_mm', 'temp_max', 'localizacao']].to_dict('records')
-    
-    # Renomear 'data' para 'data_fk'
-    records = [
-        {
-            'data_fk': r['data'],
-            'chuva_mm': r['chuva_mm'],
-            'temp_max': r['temp_max'],
-            'localizacao': r['localizacao']
-        }
-        for r in records
-    ]
-    
-    print(f"✅ {len(records)} registros prontos para inserção")
-    
-    # Inserir em lotes de 100
-    batch_size = 100
-    success = 0
-    errors = 0
-    
-    for i in range(0, len(records), batch_size):
-        batch = records[i:i + batch_size]
-        try:
-            response = supabase.table('fact_clima').insert(batch).execute()
-            success += len(batch)
-            print(f"✅ Lote {i//batch_size + 1}: {len(batch)} registros inseridos")
-        except Exception as e:
-            errors += len(batch)
-            print(f"❌ Erro no lote {i//batch_size + 1}: {e}")
-    
-    print(f"\n🌦️ Resultado: {success} sucesso, {errors} erros")
+    return df[['data', 'chuva_mm', 'temp_max', 'localizacao']].rename(columns={'data': 'data_fk'})
+
+
+def iter_records(chunks):
+    """Registros gerados chunk a chunk (nunca o arquivo inteiro em memória)"""
+    for chunk in chunks:
+        yield from chunk.to_dict('records')
+
+
+def import_chunks(table: str, chunks) -> int:
+    """Envia os chunks limpos para a tabela; retorna o número de linhas gravadas"""
+    # Caminho rápido: COPY direto no Postgres (uma transação, com dim_calendario)
+    if bulk_loader.is_available():
+        loaded = bulk_loader.bulk_load({table: chunks}, with_calendar=True)
+        return loaded.get(table, 0)
+    
+    # Caminho REST: lotes por tamanho de payload, em paralelo, rejeitados em dead-letter
+    # Upsert pela data: reimportar o mesmo arquivo não duplica linhas
+    result = upload_records(supabase, table, iter_records(chunks), on_conflict=bulk_loader.conflict_target(table))
+    return result.sent
+
+
+def clean_and_import_finance(csv_path: str, chunksize: int = IMPORT_CHUNK_ROWS):
+    """Importa dados de mercado (finance_data.csv)"""
+    print(f"📊 Lendo {csv_path}...")
+    locales = {}
+    chunks = (clean_finance_chunk(chunk, locales) for chunk in read_csv_chunks(csv_path, chunksize))
+    success = import_chunks('fact_mercado', chunks)
+    print(f"\n📊 Resultado: {success} registros gravados")
+
+
+def clean_and_import_weather(csv_path: str, chunksize: int = IMPORT_CHUNK_ROWS):
+    """Importa dados climáticos (weather_data.csv)"""
+    print(f"🌦️ Lendo {csv_path}...")
+    locales = {}
+    chunks = (clean_weather_chunk(chunk, locales) for chunk in read_csv_chunks(csv_path, chunksize))
+    success = import_chunks('fact_clima', chunks)
+    print(f"\n🌦️ Resultado: {success} registros gravados")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,348 @@
+"""
+Modo daemon do data_fetcher (python data_fetcher.py --daemon)
+- Um processo de longa duração no lugar das três execuções fixas do cron
+- Agendador asyncio com intervalo próprio por fonte, mais curto durante o
+  pregão da B3 (dias úteis sem feriado, 10h-18h de Brasília), com jitter
+- Um único pool de conexões (http_client.create_client) para todas as fontes
+- Estado quente entre os polls: última resposta boa de cada fonte (o merge de
+  fact_mercado reaproveita as outras fontes) e watermarks em memória
+- Respostas em cache são sempre revalidadas (ETag/Last-Modified) em vez de
+  servidas do disco dentro do TTL
+- Linhas gravadas são anunciadas à API (POST /api/events/publish, se
+  EVENTS_PUBLISH_URL estiver definido) para o push SSE dos dashboards
+- Endpoint HTTP de status: GET /status (última execução/sucesso por fonte) e
+  GET /health (503 se alguma fonte está sem sucesso há mais de 3 intervalos)
+"""
+
+import asyncio
+import json
+import os
+import random
+import signal
+import time
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time as dt_time
+from typing import Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import httpx
+
+from calendar_dim import brazil_holidays
+from data_fetcher import (
+    MARKET_SOURCES,
+    dollar_request,
+    evaluate_alerts,
+    imea_request,
+    merge_and_save_market_data,
+    save_weather_data,
+    stock_request,
+    supabase,
+    weather_records,
+    weather_requests,
+)
+from http_client import SourceRequest, SourceResult, create_client, fetch_all, print_latency_report
+from watermarks import latest_date, load_watermarks, lookback_days, merge_watermarks, save_watermarks
+
+B3_TZ = ZoneInfo("America/Sao_Paulo")
+# Pregão regular + call de fechamento; PTAX e Brapi não mudam fora disso
+B3_OPEN = dt_time(10, 0)
+B3_CLOSE = dt_time(18, 0)
+
+DAEMON_STATUS_HOST = os.getenv("DAEMON_STATUS_HOST", "0.0.0.0")
+DAEMON_STATUS_PORT = int(os.getenv("DAEMON_STATUS_PORT", os.getenv("PORT", "8080")))
+DAEMON_JITTER = float(os.getenv("DAEMON_JITTER", "0.1"))  # ±10% no intervalo
+DAEMON_RETRY_AFTER = float(os.getenv("DAEMON_RETRY_AFTER", "60"))  # 1ª nova tentativa após falha (s)
+# Ex.: https://api.exemplo.com/api/events/publish (token em EVENTS_PUBLISH_TOKEN)
+EVENTS_PUBLISH_URL = os.getenv("EVENTS_PUBLISH_URL", "")
+EVENTS_PUBLISH_TOKEN = os.getenv("EVENTS_PUBLISH_TOKEN", "")
+# Fonte sem sucesso há mais de N intervalos deixa o /health em 503
+STALE_AFTER_INTERVALS = 3
+
+
+def is_b3_session(now: Optional[datetime] = None) -> bool:
+    """Dentro do horário de pregão da B3 (horário de Brasília, sem feriados/dias sem pregão)"""
+    now = (now or datetime.now(B3_TZ)).astimezone(B3_TZ)
+    if now.weekday() >= 5:
+        return False
+    national, b3_closed = brazil_holidays(now.year)
+    if now.date() in national or now.date() in b3_closed:
+        return False
+    return B3_OPEN <= now.time() < B3_CLOSE
+
+
+@dataclass
+class PollingSource:
+    """Fonte agendada: requests a partir dos dias de lookback + intervalos (s) no pregão / fora dele"""
+    name: str
+    requests: Callable[[int], List[SourceRequest]]
+    session_interval: float
+    offhours_interval: float
+
+    def interval(self, now: Optional[datetime] = None) -> float:
+        return self.session_interval if is_b3_session(now) else self.offhours_interval
+
+    def build(self, days: int) -> List[SourceRequest]:
+        # TTL 0: toda execução revalida no upstream (304 reaproveita o corpo salvo)
+        return [replace(r, cache_ttl=0) if r.cache_ttl is not None else r for r in self.requests(days)]
+
+
+def default_sources() -> List[PollingSource]:
+    return [
+        PollingSource("jbs", lambda days: [stock_request("JBSS3", days)], 5 * 60, 60 * 60),
+        PollingSource("dolar", lambda days: [dollar_request(days)], 15 * 60, 2 * 60 * 60),
+        # Indicador do IMEA e clima são diários: mesmo intervalo o dia todo
+        PollingSource("imea", lambda days: [imea_request()], 60 * 60, 60 * 60),
+        PollingSource("clima", lambda days: weather_requests(days=7), 60 * 60, 60 * 60),
+    ]
+
+
+@dataclass
+class SourceStatus:
+    polls: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    rows_written: int = 0
+    last_run_at: Optional[float] = None
+    last_success_at: Optional[float] = None
+    last_latency_ms: Optional[float] = None
+    last_error: Optional[str] = None
+    next_run_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, object]:
+        def iso(ts: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(ts, B3_TZ).isoformat() if ts else None
+
+        return {
+            "polls": self.polls,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "rows_written": self.rows_written,
+            "last_run_at": iso(self.last_run_at),
+            "last_success_at": iso(self.last_success_at),
+            "last_latency_ms": round(self.last_latency_ms, 1) if self.last_latency_ms is not None else None,
+            "last_error": self.last_error,
+            "next_run_at": iso(self.next_run_at),
+        }
+
+
+Writer = Callable[[str, Dict[str, SourceResult], Dict[str, int]], int]
+
+
+def save_source(name: str, results: Dict[str, SourceResult], days: Dict[str, int]) -> int:
+    """Grava a fonte que acabou de responder (mercado usa a última resposta boa das outras)"""
+    if name in MARKET_SOURCES:
+        table, written = "fact_mercado", merge_and_save_market_data(results, days)
+    else:
+        table, written = "fact_clima", save_weather_data(weather_records(results))
+    # Uma avaliação de alertas por gravação com dados novos
+    if written:
+        evaluate_alerts([table])
+    return written
+
+
+class IngestionDaemon:
+    def __init__(
+        self,
+        sources: Optional[List[PollingSource]] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        writer: Writer = save_source,
+        jitter: float = DAEMON_JITTER,
+        watermarks: Optional[Dict[str, date]] = None,
+    ):
+        self.sources = {source.name: source for source in (sources or default_sources())}
+        self.client = client
+        self.writer = writer
+        self.jitter = jitter
+        self.watermarks: Dict[str, date] = dict(watermarks or {})
+        self.status: Dict[str, SourceStatus] = {name: SourceStatus() for name in self.sources}
+        # Última resposta boa por request (estado quente entre os polls)
+        self.results: Dict[str, SourceResult] = {}
+        self.started_at = time.time()
+        self._stopping = asyncio.Event()
+        # O client do Supabase é síncrono: uma gravação por vez, fora do event loop
+        self._write_lock = asyncio.Lock()
+
+    # ============ Agendamento ============
+    def next_delay(self, source: PollingSource, now: Optional[datetime] = None) -> float:
+        interval = source.interval(now)
+        failures = self.status[source.name].consecutive_failures
+        if failures:
+            interval = min(interval, DAEMON_RETRY_AFTER * 2 ** (failures - 1))
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def lookback(self) -> Dict[str, int]:
+        return {name: lookback_days(self.watermarks.get(name)) for name in MARKET_SOURCES}
+
+    def _market_results(self) -> Dict[str, SourceResult]:
+        """Fontes de mercado ainda sem resposta boa entram vazias (como no cron quando falham)"""
+        results = dict(self.results)
+        for name in MARKET_SOURCES:
+            results.setdefault(name, SourceResult(name, [], 0.0, 0, error="sem resposta ainda"))
+        return results
+
+    def _failed(self, source: PollingSource, error: str) -> bool:
+        status = self.status[source.name]
+        status.failures += 1
+        status.consecutive_failures += 1
+        status.last_error = error
+        print(f"❌ {source.name}: {error}")
+        return False
+
+    async def _commit(self, source: PollingSource, results: Dict[str, SourceResult], days: Dict[str, int]) -> bool:
+        """Guarda as respostas boas no estado quente e grava a fonte se todas responderam"""
+        status = self.status[source.name]
+        status.polls += 1
+        status.last_run_at = time.time()
+        status.last_latency_ms = max((r.latency_ms for r in results.values()), default=0.0)
+        self.results.update({name: result for name, result in results.items() if result.ok})
+        failed = [result for result in results.values() if not result.ok]
+        if failed:
+            return self._failed(source, "; ".join(f"{r.name}: {r.error}" for r in failed))
+
+        try:
+            async with self._write_lock:
+                written = await asyncio.to_thread(self.writer, source.name, self._market_results(), days)
+                watermark = latest_date(record for result in results.values() for record in result.records)
+                if source.name in MARKET_SOURCES and watermark:
+                    await asyncio.to_thread(save_watermarks, supabase, {source.name: watermark}, written, dict(self.watermarks))
+                    self.watermarks.update(merge_watermarks(self.watermarks, {source.name: watermark}))
+        except Exception as e:
+            return self._failed(source, f"gravação: {type(e).__name__}: {e}")
+
+        if written:
+            table = "fact_mercado" if source.name in MARKET_SOURCES else "fact_clima"
+            latest = watermark or latest_date((r for result in results.values() for r in result.records), key="data_fk")
+            latest = latest.isoformat() if latest else None
+            await self.publish_event(table, {"source": source.name, "rows": written, "latest": latest})
+            await self.publish_event("invalidate", {"tables": [table]})
+
+        status.rows_written += written
+        status.consecutive_failures = 0
+        status.last_error = None
+        status.last_success_at = time.time()
+        print(f"✅ {source.name}: {written} linhas gravadas ({status.last_latency_ms:.0f} ms)")
+        return True
+
+    async def publish_event(self, event_type: str, data: Dict[str, object]) -> None:
+        """Best effort: API fora do ar não afeta a ingestão"""
+        if not EVENTS_PUBLISH_URL:
+            return
+        headers = {"Authorization": f"Bearer {EVENTS_PUBLISH_TOKEN}"} if EVENTS_PUBLISH_TOKEN else {}
+        try:
+            response = await self.client.post(EVENTS_PUBLISH_URL, json={"type": event_type, "data": data}, headers=headers, timeout=5)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"⚠️ Evento {event_type} não publicado: {type(e).__name__}: {e}")
+
+    async def poll(self, source: PollingSource) -> bool:
+        days = self.lookback()
+        results = await fetch_all(source.build(days.get(source.name, 7)), client=self.client)
+        return await self._commit(source, results, days)
+
+    async def warm_up(self) -> None:
+        """
+        Primeira rodada com todas as fontes juntas (como o cron): o merge de
+        fact_mercado só roda depois que dólar, JBS e IMEA responderam
+        """
+        days = self.lookback()
+        requests = {source.name: source.build(days.get(source.name, 7)) for source in self.sources.values()}
+        results = await fetch_all([r for batch in requests.values() for r in batch], client=self.client)
+        print_latency_report(results)
+        for name, batch in requests.items():
+            await self._commit(self.sources[name], {r.name: results[r.name] for r in batch}, days)
+
+    async def _run_source(self, source: PollingSource) -> None:
+        while not self._stopping.is_set():
+            delay = self.next_delay(source)
+            self.status[source.name].next_run_at = time.time() + delay
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                break
+            except asyncio.TimeoutError:
+                pass
+            await self.poll(source)
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    # ============ Status ============
+    def is_healthy(self, now: Optional[float] = None) -> bool:
+        now = now or time.time()
+        for name, source in self.sources.items():
+            last = self.status[name].last_success_at or self.started_at
+            if now - last > STALE_AFTER_INTERVALS * max(source.session_interval, source.offhours_interval):
+                return False
+        return True
+
+    def status_payload(self) -> Dict[str, object]:
+        return {
+            "started_at": datetime.fromtimestamp(self.started_at, B3_TZ).isoformat(),
+            "b3_session": is_b3_session(),
+            "healthy": self.is_healthy(),
+            "watermarks": {name: value.isoformat() for name, value in self.watermarks.items()},
+            "sources": {name: status.to_dict() for name, status in self.status.items()},
+        }
+
+    async def _handle_status(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await asyncio.wait_for(reader.readline(), timeout=5)).decode("latin-1").split()
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass  # headers ignorados
+            path = request_line[1].split("?")[0] if len(request_line) > 1 else "/"
+            if path in ("/", "/status"):
+                code, body = 200, self.status_payload()
+            elif path == "/health":
+                healthy = self.is_healthy()
+                code, body = (200 if healthy else 503), {"healthy": healthy}
+            else:
+                code, body = 404, {"detail": "Not Found"}
+            payload = json.dumps(body, ensure_ascii=False).encode()
+            reason = {200: "OK", 404: "Not Found", 503: "Service Unavailable"}[code]
+            writer.write(
+                f"HTTP/1.1 {code} {reason}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start_status_server(self, host: str = DAEMON_STATUS_HOST, port: int = DAEMON_STATUS_PORT) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle_status, host, port)
+
+    # ============ Execução ============
+    async def run(self, status_port: Optional[int] = DAEMON_STATUS_PORT) -> None:
+        own_client = self.client is None
+        self.client = self.client or create_client()
+        server = await self.start_status_server(port=status_port) if status_port is not None else None
+        if server:
+            print(f"📡 Status em http://{DAEMON_STATUS_HOST}:{server.sockets[0].getsockname()[1]}/status")
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows / fora da main thread
+
+        try:
+            await self.warm_up()
+            await asyncio.gather(*(self._run_source(source) for source in self.sources.values()))
+        finally:
+            if server:
+                server.close()
+                await server.wait_closed()
+            if own_client:
+                await self.client.aclose()
+            print("🛑 Daemon de ingestão encerrado")
+
+
+def run_daemon() -> None:
+    print("\n" + "="*60)
+    print(f"🔁 DAEMON DE INGESTÃO - {datetime.now(B3_TZ).strftime('%Y-%m-%d %H:%M:%S')}")
+    print("="*60)
+    daemon = IngestionDaemon(watermarks=load_watermarks(supabase))
+    for source in daemon.sources.values():
+        print(f"   {source.name:<6} pregão={source.session_interval / 60:.0f} min  fora={source.offhours_interval / 60:.0f} min")
+    asyncio.run(daemon.run())
@@ -0,0 +1,106 @@
+"""
+Parser numérico com detecção de locale por coluna (pt-BR x en)
+- pt-BR: 1.234,56 | en: 1,234.56 | também sem milhar: 1234,56 / 1234.56
+- Valores com formato inequívoco ("5,38", "1.234,56", "5.42") são lidos no
+  próprio formato; o locale da coluna (detectado numa amostra) só decide os
+  ambíguos ("1.234"), então colunas mistas não são reescritas 100x
+- Colunas já numéricas passam direto; nas de texto a troca de separadores é
+  vetorizada (Series.str.replace, sem regex)
+"""
+
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+LOCALE_EN = "en"
+LOCALE_PT_BR = "pt-BR"
+SAMPLE_SIZE = 1000
+
+# Formato inequívoco de um valor (já sem espaços nas pontas):
+# - '.' e ',' no mesmo valor: o que aparece por último é o decimal
+# - um único separador seguido de 0-2 ou 4+ dígitos: decimal ("5,38", "5.382900")
+# - separador repetido: milhar ("1.234.567", "1,234,567")
+# "1.234" / "1,234" (um separador + exatamente 3 dígitos) é ambíguo e não casa nenhum
+PATTERNS = {
+    LOCALE_PT_BR: re.compile(r"\..*,[^.,]*$|^[^.,]*,(?:\d{0,2}|\d{4,})$|^[^,]*\.[^,]*\.[^,]*$"),
+    LOCALE_EN: re.compile(r",.*\.[^.,]*$|^[^.,]*\.(?:\d{0,2}|\d{4,})$|^[^.]*,[^.]*,[^.]*$"),
+}
+OTHER_LOCALE = {LOCALE_PT_BR: LOCALE_EN, LOCALE_EN: LOCALE_PT_BR}
+
+
+def value_locales(text: pd.Series) -> pd.Series:
+    """Locale que cada valor indica sozinho (None quando ambíguo ou sem separador)"""
+    pt = text.str.contains(PATTERNS[LOCALE_PT_BR])
+    en = text.str.contains(PATTERNS[LOCALE_EN])
+    return pd.Series(np.select([pt, en], [LOCALE_PT_BR, LOCALE_EN], default=None), index=text.index)
+
+
+def detect_locale(values: pd.Series, sample_size: int = SAMPLE_SIZE) -> str:
+    """
+    Locale da coluna por votação em uma amostra (regras de value_locales).
+    Só decide os valores ambíguos; sem votos assume en.
+    """
+    sample = values.dropna()
+    if sample.empty or pd.api.types.is_numeric_dtype(sample):
+        return LOCALE_EN
+    votes = value_locales(sample.head(sample_size).astype(str).str.strip())
+    pt_votes = (votes == LOCALE_PT_BR).sum()
+    en_votes = (votes == LOCALE_EN).sum()
+    return LOCALE_PT_BR if pt_votes > en_votes else LOCALE_EN
+
+
+def _parse(values: pd.Series, locale: Optional[str] = None) -> Tuple[pd.Series, int]:
+    """(float64, quantos valores vieram num formato diferente do locale da coluna)"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64"), 0
+
+    locale = locale or detect_locale(values)
+    # None/NaN viram "None"/"nan" e caem no errors="coerce"
+    text = values.astype(str).str.strip()
+    # Valor inequívoco no outro formato usa o próprio formato; todo o resto
+    # (inclusive os ambíguos) segue o locale da coluna. Um só passe de regex.
+    foreign = text.str.contains(PATTERNS[OTHER_LOCALE[locale]]).to_numpy()
+    is_pt = foreign if locale == LOCALE_EN else ~foreign
+
+    cleaned = text.copy()
+    if is_pt.any():
+        cleaned[is_pt] = text[is_pt].str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    if not is_pt.all():
+        cleaned[~is_pt] = text[~is_pt].str.replace(",", "", regex=False)
+
+    return pd.to_numeric(cleaned, errors="coerce").astype("float64"), int(foreign.sum())
+
+
+def parse_numeric(values: pd.Series, locale: Optional[str] = None) -> pd.Series:
+    """
+    Converte a coluna para float64 (inválidos viram NaN).
+    Colunas numéricas não passam por string nenhuma; nas de texto a troca de
+    separadores é feita com Series.str.replace (sem regex) só nos valores que precisam.
+    """
+    return _parse(values, locale)[0]
+
+
+def parse_numeric_columns(
+    df: pd.DataFrame,
+    columns: Iterable[str],
+    locales: Optional[Dict[str, str]] = None,
+    decimals: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Converte as colunas in-place e devolve o DataFrame.
+    - locales: cache {coluna: locale}; no streaming, o locale detectado no
+      primeiro chunk vale para os seguintes (passe o mesmo dict)
+    """
+    locales = locales if locales is not None else {}
+    for column in columns:
+        if column not in df.columns:
+            continue
+        if column not in locales and not pd.api.types.is_numeric_dtype(df[column]):
+            locales[column] = detect_locale(df[column])
+        parsed, mixed = _parse(df[column], locales.get(column, LOCALE_EN))
+        if mixed:
+            print(f"⚠️ {column}: {mixed} valores com formato diferente do locale da coluna ({locales.get(column, LOCALE_EN)}), lidos no próprio formato")
+        df[column] = parsed.round(decimals) if decimals is not None else parsed
+    return df
@@ -0,0 +1,127 @@
+"""
+Cache em disco das respostas das fontes externas (data_fetcher)
+- Uma entrada por URL + parâmetros (o token da Brapi fica fora da chave)
+- Corpo gravado comprimido (gzip) junto com status, ETag e Last-Modified
+- Dentro do TTL a resposta sai do disco; depois disso o request vai com
+  If-None-Match / If-Modified-Since e um 304 reaproveita o corpo salvo
+- HTTP_CACHE_MODE=offline só lê do cache (dry runs locais/CI sem rede)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+# on: usa e grava | off: ignora | offline: só lê, sem rede | refresh: sempre busca e regrava
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "on").lower()
+CACHE_KEY_EXCLUDE = {"token"}
+STORED_HEADERS = ("content-type", "etag", "last-modified")
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    body: bytes
+    stored_at: float
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now or time.time()) - self.stored_at
+
+    def is_fresh(self, ttl: float, now: Optional[float] = None) -> bool:
+        return self.age(now) < ttl
+
+    def validators(self) -> Dict[str, str]:
+        """Headers do request condicional"""
+        headers = {}
+        if self.headers.get("etag"):
+            headers["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+    def to_response(self) -> httpx.Response:
+        """httpx.Response equivalente, para os parsers das fontes (json()/text)"""
+        return httpx.Response(
+            self.status_code,
+            headers=self.headers,
+            content=self.body,
+            request=httpx.Request("GET", self.url),
+        )
+
+
+def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    items = sorted((str(k), str(v)) for k, v in (params or {}).items() if k not in CACHE_KEY_EXCLUDE)
+    return hashlib.sha256(json.dumps([url, items]).encode()).hexdigest()[:32]
+
+
+class ResponseCache:
+    """Arquivos <chave>.gz: uma linha JSON de metadados + o corpo bruto"""
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, mode: str = HTTP_CACHE_MODE):
+        self.directory = directory
+        self.mode = mode
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def offline(self) -> bool:
+        return self.mode == "offline"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.gz")
+
+    def load(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[CachedResponse]:
+        if not self.enabled or self.mode == "refresh":
+            return None
+        try:
+            with gzip.open(self._path(cache_key(url, params)), "rb") as f:
+                meta_line, body = f.read().split(b"\n", 1)
+            meta = json.loads(meta_line)
+        except (OSError, ValueError, EOFError):
+            return None
+        return CachedResponse(meta["url"], meta["status_code"], meta["headers"], body, meta["stored_at"])
+
+    def store(self, url: str, params: Optional[Dict[str, Any]], response: httpx.Response) -> CachedResponse:
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        entry = CachedResponse(url, response.status_code, headers, response.content, time.time())
+        self._write(cache_key(url, params), entry)
+        return entry
+
+    def touch(self, url: str, params: Optional[Dict[str, Any]], entry: CachedResponse, response: httpx.Response) -> CachedResponse:
+        """304: mesmo corpo, validadores novos (se vierem) e TTL reiniciado"""
+        headers = dict(entry.headers)
+        headers.update({name: response.headers[name] for name in ("etag", "last-modified") if name in response.headers})
+        refreshed = CachedResponse(entry.url, entry.status_code, headers, entry.body, time.time())
+        self._write(cache_key(url, params), refreshed)
+        return refreshed
+
+    def _write(self, key: str, entry: CachedResponse) -> None:
+        if not self.enabled or self.offline:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {"url": entry.url, "status_code": entry.status_code, "headers": entry.headers, "stored_at": entry.stored_at}
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wb") as f:
+            f.write(json.dumps(meta).encode() + b"\n" + entry.body)
+        os.replace(tmp_path, path)
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def default_cache() -> ResponseCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
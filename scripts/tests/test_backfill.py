@@ -0,0 +1,135 @@
+import asyncio
+import os
+import sys
+import time
+from datetime import date
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O data_fetcher cria o client do Supabase no import (sem rede)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.test")
+
+import backfill  # noqa: E402
+import imea_scraper  # noqa: E402
+import response_cache  # noqa: E402
+from checkpoint import Checkpoint  # noqa: E402
+
+IMEA_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "imea_indicador_boi.html")
+
+
+def ptax_handler(total_days: int, fail_windows=()):
+    """PTAX fake: uma cotação por dia, respeitando $top/$skip"""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        start = params["@dataInicial"].strip("'")
+        calls.append((start, int(params["$skip"])))
+        if start in fail_windows:
+            return httpx.Response(400, json={"error": "bad request"})
+        month, day, year = map(int, start.split("-"))
+        first = date(year, month, day)
+        top, skip = int(params["$top"]), int(params["$skip"])
+        values = [
+            {"cotacaoCompra": 5.0 + i / 100, "dataHoraCotacao": f"{date.fromordinal(first.toordinal() + i)} 13:00:00.000"}
+            for i in range(total_days)
+        ][skip:skip + top]
+        return httpx.Response(200, json={"value": values})
+
+    return handler, calls
+
+
+def run(checkpoint, handler, writes, start=date(2024, 1, 1), end=date(2024, 1, 20)):
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await backfill.run_backfill(
+                start, end, ["dolar"], checkpoint, client=client,
+                writer=lambda table, records: writes.append((table, records)) or len(records),
+            )
+    return asyncio.run(go())
+
+
+def test_make_windows_cover_range_without_overlap():
+    source = backfill.BackfillSource("x", "fact_mercado", 7, 1, 0.0, None)
+    windows = backfill.make_windows(source, date(2024, 1, 1), date(2024, 1, 20))
+
+    assert [(w.start.day, w.end.day) for w in windows] == [(1, 7), (8, 14), (15, 20)]
+
+
+def test_ptax_pagination_and_resume_after_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill, "PTAX_PAGE_SIZE", 3)
+    monkeypatch.setitem(backfill.SOURCES, "dolar", backfill.BackfillSource(
+        "dolar", "fact_mercado", 7, 2, 0.0, backfill.fetch_dollar_window,
+    ))
+    checkpoint = Checkpoint("bf", directory=str(tmp_path))
+
+    # 1ª execução: a janela de 08/01 falha (4xx não tem retry)
+    handler, calls = ptax_handler(total_days=7, fail_windows=("01-08-2024",))
+    writes = []
+    report = run(checkpoint, handler, writes)
+
+    assert report["dolar"] == {"windows": 3, "skipped": 0, "done": 2, "failed": 1, "rows": 13}
+    # 7 dias com páginas de 3: $skip 0, 3, 6
+    assert sorted(skip for start, skip in calls if start == "01-01-2024") == [0, 3, 6]
+    assert not checkpoint.finished
+
+    # 2ª execução: só a janela que falhou é refeita
+    handler, calls = ptax_handler(total_days=7)
+    writes = []
+    report = run(Checkpoint("bf", directory=str(tmp_path)), handler, writes)
+
+    assert report["dolar"]["skipped"] == 2 and report["dolar"]["done"] == 1
+    assert {start for start, _ in calls} == {"01-08-2024"}
+    assert writes[0][0] == "fact_mercado" and len(writes[0][1]) == 7
+    assert Checkpoint("bf", directory=str(tmp_path)).finished
+
+
+def test_rate_limiter_spaces_requests():
+    async def go():
+        limiter = backfill.RateLimiter(max_concurrency=4, min_interval=0.05)
+        started = []
+
+        async def hit():
+            async with limiter:
+                started.append(time.monotonic())
+
+        await asyncio.gather(*(hit() for _ in range(4)))
+        return sorted(started)
+
+    started = asyncio.run(go())
+    gaps = [b - a for a, b in zip(started, started[1:])]
+    assert all(gap >= 0.04 for gap in gaps)
+
+
+def test_imea_history_fetches_one_page_per_weekday(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, "_default_cache", response_cache.ResponseCache(str(tmp_path)))
+    monkeypatch.setattr(imea_scraper, "IMEA_HISTORY_URL", "")
+    assert "imea" not in backfill.default_sources()
+
+    monkeypatch.setattr(imea_scraper, "IMEA_HISTORY_URL", "http://imea.test/indicador?data={date}")
+    assert "imea" in backfill.default_sources()
+    with open(IMEA_FIXTURE, encoding="utf-8") as f:
+        page = f.read()
+    requested = []
+
+    def handler(request):
+        day = request.url.params["data"]
+        requested.append(day)
+        return httpx.Response(200, text=page.replace("304,85", "3" + day[-2:] + ",00"))  # preço varia com o dia
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            window = backfill.Window("imea", date(2024, 1, 1), date(2024, 1, 7))  # segunda a domingo
+            return await backfill.fetch_imea_window(client, window, backfill.RateLimiter(4, 0.0))
+
+    records = asyncio.run(go())
+
+    assert sorted(requested) == [f"2024-01-0{d}" for d in range(1, 6)]
+    assert sorted(records, key=lambda r: r["data"])[:2] == [
+        {"data": "2024-01-01", "valor_boi_gordo": 301.0},
+        {"data": "2024-01-02", "valor_boi_gordo": 302.0},
+    ]
+    assert len(records) == 5
@@ -0,0 +1,186 @@
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from postgrest.exceptions import APIError
+
+from batch_uploader import BatchUploader, make_batches
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.rows = None
+
+    def insert(self, rows):
+        self.rows = rows
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.client.on_conflict = on_conflict
+        return self.insert(rows)
+
+    def execute(self):
+        with self.client.lock:
+            self.client.calls += 1
+        # PostgREST rejeita o lote inteiro se uma linha for inválida
+        if any(row.get("valor") == "bad" for row in self.rows):
+            raise APIError({"message": "invalid input syntax for type numeric", "code": "22P02"})
+        with self.client.lock:
+            self.client.stored.extend(self.rows)
+        return self
+
+
+class FakeClient:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.stored = []
+        self.on_conflict = None
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+def test_batches_respect_payload_bytes():
+    records = [{"data_fk": f"2024-01-{i:02d}", "valor": "x" * 40} for i in range(1, 31)]
+    batches = make_batches(records, max_bytes=400, max_rows=1000)
+
+    assert sum(len(b) for b in batches) == 30
+    assert all(len(json.dumps(b)) <= 400 for b in batches)
+    assert len(make_batches(records, max_bytes=10**6, max_rows=7)) == 5
+
+
+def test_bisect_isolates_bad_rows_and_writes_dead_letter(tmp_path):
+    records = [{"data_fk": f"2024-01-{i:02d}", "valor": i} for i in range(1, 29)]
+    records[5]["valor"] = "bad"
+    records[20]["valor"] = "bad"
+    client = FakeClient()
+
+    uploader = BatchUploader(client, "fact_mercado", on_conflict="data_fk", max_rows=16, workers=3, dead_letter_dir=str(tmp_path))
+    result = uploader.upload(records)
+
+    assert result.sent == 26
+    assert result.rejected == 2
+    assert len(client.stored) == 26
+    assert client.on_conflict == "data_fk"
+    with open(result.dead_letter_path) as f:
+        rejected = [json.loads(line) for line in f]
+    assert sorted(r["record"]["data_fk"] for r in rejected) == ["2024-01-06", "2024-01-21"]
+    assert "invalid input syntax" in rejected[0]["error"]
+
+
+def test_nan_becomes_null(tmp_path):
+    client = FakeClient()
+    result = BatchUploader(client, "fact_clima", dead_letter_dir=str(tmp_path)).upload([{"data_fk": "2024-01-01", "chuva_mm": float("nan")}])
+
+    assert result.sent == 1 and result.dead_letter_path is None
+    assert client.stored[0]["chuva_mm"] is None
+
+
+class FlakyClient(FakeClient):
+    """Simula a conexão caindo depois de N requests"""
+
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def table(self, name):
+        if self.calls >= self.fail_after:
+            raise ConnectionError("connection reset")
+        return FakeQuery(self, name)
+
+
+def test_checkpoint_resumes_only_pending_batches(tmp_path):
+    from checkpoint import Checkpoint
+
+    records = [{"data_fk": f"2024-{m:02d}-{d:02d}", "valor": d} for m in range(1, 4) for d in range(1, 29)]
+    checkpoint = Checkpoint("abc123", directory=str(tmp_path / "ckpt"))
+
+    flaky = FlakyClient(fail_after=3)
+    first = BatchUploader(flaky, "fact_mercado", on_conflict="data_fk", max_rows=10, workers=1, retries=0,
+                          dead_letter_dir=str(tmp_path), checkpoint=checkpoint).upload(records)
+    assert first.sent == 30
+    assert checkpoint.done_count("fact_mercado") == 3
+
+    # Nova execução (novo processo) lendo o mesmo checkpoint
+    client = FakeClient()
+    resumed = BatchUploader(client, "fact_mercado", on_conflict="data_fk", max_rows=10, workers=2,
+                            dead_letter_dir=str(tmp_path), checkpoint=Checkpoint("abc123", directory=str(tmp_path / "ckpt"))).upload(records)
+    assert resumed.skipped == 3
+    assert resumed.sent == len(records) - 30
+    assert client.calls == resumed.batches - 3
+
+
+class UnavailableClient(FakeClient):
+    """PostgREST/gateway respondendo 503 nas primeiras N requests"""
+
+    def __init__(self, failures, error):
+        super().__init__()
+        self.failures = failures
+        self.error = error
+
+    def table(self, name):
+        with self.lock:
+            self.calls += 1
+            failing = self.calls <= self.failures
+        if failing:
+            raise APIError(dict(self.error))
+        return FakeQuery(self, name)
+
+
+def test_server_errors_are_retried_not_bisected(tmp_path, monkeypatch):
+    from checkpoint import Checkpoint
+    from batch_uploader import is_data_error
+
+    monkeypatch.setattr("batch_uploader.time.sleep", lambda seconds: None)
+    records = [{"data_fk": f"2024-01-{i:02d}", "valor": i} for i in range(1, 11)]
+    gateway_503 = {"message": "JSON could not be generated", "code": 503}
+
+    client = UnavailableClient(2, gateway_503)
+    result = BatchUploader(client, "fact_mercado", max_rows=10, workers=1, retries=2, dead_letter_dir=str(tmp_path)).upload(records)
+    assert result.sent == 10 and result.rejected == 0
+    assert result.requests == 3  # 2 falhas + sucesso, sem dividir o lote
+
+    # 503 persistente: lote inteiro incompleto (não vira rejeição "concluída")
+    checkpoint = Checkpoint("down", directory=str(tmp_path / "ckpt"))
+    client = UnavailableClient(100, {"message": "timeout", "code": "PGRST003"})
+    result = BatchUploader(client, "fact_mercado", max_rows=10, workers=1, retries=1,
+                           dead_letter_dir=str(tmp_path), checkpoint=checkpoint).upload(records)
+    assert result.sent == 0 and result.requests == 2
+    assert checkpoint.done_count("fact_mercado") == 0
+
+    assert is_data_error(APIError({"code": "22P02"})) and is_data_error(APIError({"code": 400}))
+    assert not any(is_data_error(APIError({"code": code})) for code in (429, 502, "57014", "40001", "PGRST001", None))
+
+
+def test_rejects_hit_dead_letter_before_batch_is_checkpointed(tmp_path):
+    from checkpoint import Checkpoint
+
+    records = [{"data_fk": f"2024-01-{i:02d}", "valor": "bad" if i in (2, 15) else i} for i in range(1, 21)]
+    dead_letter_dir = tmp_path / "dl"
+
+    class CrashingCheckpoint(Checkpoint):
+        """Processo morre logo depois de marcar o primeiro lote"""
+
+        def mark_done(self, table, batch_id):
+            super().mark_done(table, batch_id)
+            raise KeyboardInterrupt
+
+    checkpoint = CrashingCheckpoint("crash", directory=str(tmp_path / "ckpt"))
+    try:
+        BatchUploader(FakeClient(), "fact_mercado", max_rows=10, workers=1, dead_letter_dir=str(dead_letter_dir), checkpoint=checkpoint).upload(records)
+    except KeyboardInterrupt:
+        pass
+
+    files = os.listdir(dead_letter_dir)
+    assert len(files) == 1
+    # Um lote marcado (qualquer um dos dois, a ordem de conclusão varia) e a rejeição dele já gravada
+    with open(dead_letter_dir / files[0]) as f:
+        rejected = [json.loads(line)["record"]["data_fk"] for line in f]
+    assert len(rejected) == 1 and rejected[0] in ("2024-01-02", "2024-01-15")
+    assert checkpoint.done_count("fact_mercado") == 1
@@ -0,0 +1,56 @@
+import csv
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_loader import TABLES, DataFrameCSVStream, calendar_frame, merge_sql, partial_spec
+
+
+def test_csv_stream_matches_full_csv_in_small_reads():
+    df = pd.DataFrame({
+        "data_fk": pd.date_range("2024-01-01", periods=25).strftime("%Y-%m-%d"),
+        "valor_dolar": np.linspace(5, 6, 25),
+        "valor_jbs": [np.nan if i % 7 == 0 else i for i in range(25)],
+    })
+    stream = DataFrameCSVStream(df, chunk_rows=4)
+    chunks = []
+    while True:
+        chunk = stream.read(37)
+        if not chunk:
+            break
+        chunks.append(chunk)
+
+    assert b"".join(chunks) == df.to_csv(header=False, index=False).encode()
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert len(rows) == 25
+    assert rows[0][2] == ""  # NaN -> campo vazio (NULL no COPY)
+
+
+def test_merge_sql_upserts_non_key_columns():
+    sql = merge_sql(TABLES["fact_mercado"], "stg_fact_mercado")
+
+    assert sql.startswith('INSERT INTO public."fact_mercado"')
+    assert 'DISTINCT ON ("data_fk")' in sql
+    assert 'ON CONFLICT ("data_fk") DO UPDATE SET "valor_dolar" = EXCLUDED."valor_dolar"' in sql
+    assert '"data_fk" = EXCLUDED' not in sql
+
+
+def test_calendar_frame_covers_gaps():
+    calendar = calendar_frame(pd.Series(["2024-01-05", "2024-01-01"]))
+
+    assert calendar["data_pk"].tolist() == [f"2024-01-0{d}" for d in range(1, 6)]
+    assert calendar["is_business_day"].tolist() == [True, True, True, True, True]
+
+
+def test_partial_spec_only_updates_loaded_columns():
+    spec = partial_spec(TABLES["fact_mercado"], ["valor_dolar", "data_fk"])
+    sql = merge_sql(spec, "stg_fact_mercado")
+
+    assert spec.columns == ["data_fk", "valor_dolar"]
+    assert '"valor_jbs"' not in sql
+    assert 'DO UPDATE SET "valor_dolar" = EXCLUDED."valor_dolar"' in sql
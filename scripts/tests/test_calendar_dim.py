@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendar_dim import _missing_spans, build_calendar, easter, ensure_calendar
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """Simula o PostgREST sobre um set de datas (data_pk)"""
+
+    def __init__(self, client):
+        self.client = client
+        self.filters = []
+        self.count = None
+        self.window = None
+        self.rows = None
+
+    def select(self, columns, count=None):
+        self.count = count
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda d: d >= value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda d: d <= value)
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, n):
+        self.window = (0, n - 1)
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end)
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.rows = rows
+        return self
+
+    def execute(self):
+        self.client.calls += 1
+        if self.rows is not None:
+            json.dumps(self.rows)  # precisa ser serializável para o PostgREST
+            self.client.upserts.append(self.rows)
+            self.client.dates.update(row["data_pk"] for row in self.rows)
+            return FakeResponse(self.rows)
+        matched = sorted(d for d in self.client.dates if all(f(d) for f in self.filters))
+        start, end = self.window
+        page = [{"data_pk": d} for d in matched[start:end + 1]]
+        return FakeResponse(page, len(matched) if self.count == "exact" else None)
+
+
+class FakeClient:
+    def __init__(self, dates=()):
+        self.dates = set(dates)
+        self.calls = 0
+        self.upserts = []
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+def test_easter_and_trading_days():
+    assert easter(2024) == date(2024, 3, 31)
+    assert easter(2025) == date(2025, 4, 20)
+
+    cal = build_calendar("2025-03-01", "2025-12-31").set_index("data_pk")
+    # Carnaval: dia útil pela semântica original, mas sem pregão
+    assert cal.loc["2025-03-03", "is_business_day"]
+    assert not cal.loc["2025-03-03", "is_trading_day"]
+    assert not cal.loc["2025-03-03", "is_feriado"]
+    assert cal.loc["2025-04-18", "nome_feriado"] == "Sexta-feira Santa"
+    assert cal.loc["2025-04-18", "is_feriado"]
+    assert cal.loc["2025-06-19", "nome_feriado"] == "Corpus Christi"
+    assert cal.loc["2025-11-20", "is_feriado"]
+    assert cal.loc["2025-03-05", "is_trading_day"]
+    assert cal.loc["2025-03-05", "dia_semana"] == 3
+    assert cal.loc["2025-03-08", "dia_semana"] == 6
+    assert cal.loc["2025-12-29", "semana"] == 1  # semana ISO do ano seguinte
+    assert cal.loc["2025-12-29", "trimestre"] == 4
+
+
+def test_missing_spans():
+    existing = ["2024-01-01", "2024-01-02", "2024-01-05", "2024-01-06"]
+    assert _missing_spans(existing, date(2023, 12, 30), date(2024, 1, 8)) == [
+        (date(2023, 12, 30), date(2023, 12, 31)),
+        (date(2024, 1, 3), date(2024, 1, 4)),
+        (date(2024, 1, 7), date(2024, 1, 8)),
+    ]
+    assert _missing_spans(existing, date(2024, 1, 1), date(2024, 1, 2)) == []
+
+
+def test_ensure_calendar_only_adds_missing_dates():
+    client = FakeClient(["2024-01-01", "2024-01-02", "2024-01-05"])
+
+    added = ensure_calendar(client, "2024-01-01", "2024-01-07")
+
+    assert added == 4
+    assert len(client.upserts) == 1  # um único statement para os dois intervalos
+    assert sorted(r["data_pk"] for r in client.upserts[0]) == ["2024-01-03", "2024-01-04", "2024-01-06", "2024-01-07"]
+
+
+def test_ensure_calendar_complete_range_is_one_count_query():
+    client = FakeClient(build_calendar("2024-01-01", "2024-12-31")["data_pk"])
+
+    assert ensure_calendar(client, "2024-02-01", "2024-03-31") == 0
+    assert client.calls == 1
+    assert client.upserts == []
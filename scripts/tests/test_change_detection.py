@@ -0,0 +1,69 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from change_detection import diff_frames
+
+COLUMNS = ["valor_dolar", "valor_jbs"]
+
+
+def existing_rows():
+    return pd.DataFrame({
+        "data_fk": ["2024-01-01", "2024-01-02", "2024-01-03"],
+        "valor_dolar": [5.0, 5.1, 5.2],
+        "valor_jbs": [30.0, np.nan, 31.0],
+    }).set_index("data_fk")
+
+
+def test_splits_inserts_updates_and_unchanged():
+    new = pd.DataFrame({
+        "data_fk": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"],
+        "valor_dolar": [5.0, 5.1, 5.25, 5.3],
+        "valor_jbs": [30.0, np.nan, 31.0, 32.0],
+    })
+    diff = diff_frames(new, existing_rows(), "data_fk", COLUMNS)
+
+    assert diff.unchanged == 2
+    assert diff.inserts["data_fk"].tolist() == ["2024-01-04"]
+    assert diff.updates["data_fk"].tolist() == ["2024-01-03"]
+    assert len(diff.changed) == 2
+
+
+def test_per_column_tolerance_ignores_rounding():
+    new = pd.DataFrame({
+        "data_fk": ["2024-01-01", "2024-01-03"],
+        "valor_dolar": [5.00004, 5.2],
+        "valor_jbs": [30.0, 31.5],
+    })
+    diff = diff_frames(new, existing_rows(), "data_fk", COLUMNS, {"valor_dolar": 1e-4, "valor_jbs": 1.0})
+
+    assert diff.unchanged == 2
+    assert diff.updates.empty
+
+
+def test_missing_values_inherit_stored_values():
+    new = pd.DataFrame({
+        "data_fk": ["2024-01-01", "2024-01-02"],
+        "valor_dolar": [np.nan, 5.15],
+        "valor_jbs": [30.0, np.nan],
+    })
+    diff = diff_frames(new, existing_rows(), "data_fk", COLUMNS)
+
+    assert diff.unchanged == 1
+    row = diff.updates.iloc[0]
+    assert row["data_fk"] == "2024-01-02"
+    assert row["valor_dolar"] == 5.15
+    assert np.isnan(row["valor_jbs"])
+
+
+def test_empty_existing_means_all_inserts():
+    new = pd.DataFrame({"data_fk": ["2024-02-01"], "valor_dolar": [5.0], "valor_jbs": [None]})
+    empty = pd.DataFrame(columns=["data_fk"] + COLUMNS).set_index("data_fk")
+    diff = diff_frames(new, empty, "data_fk", COLUMNS)
+
+    assert len(diff.inserts) == 1
+    assert diff.updates.empty and diff.unchanged == 0
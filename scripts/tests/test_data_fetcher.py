@@ -0,0 +1,96 @@
+import asyncio
+import os
+import sys
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O módulo cria o client do Supabase no import (sem rede)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.test")
+
+import data_fetcher  # noqa: E402
+from http_client import SourceRequest, SourceResult, fetch_source  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+
+def daily(days, temps, rain):
+    return {"daily": {"time": days, "temperature_2m_max": temps, "precipitation_sum": rain}}
+
+
+def test_parse_locations():
+    assert data_fetcher.parse_locations("Cuiabá:-15.6:-56.1; Sorriso:-12.54:-55.72;") == [
+        ("Cuiabá", -15.6, -56.1),
+        ("Sorriso", -12.54, -55.72),
+    ]
+
+
+def test_weather_requests_batch_coordinates(monkeypatch):
+    monkeypatch.setattr(data_fetcher, "WEATHER_BATCH_SIZE", 2)
+    locations = [("A", 1.0, 2.0), ("B", 3.0, 4.0), ("C", 5.0, 6.0)]
+
+    requests = data_fetcher.weather_requests(locations, days=3)
+
+    assert [r.name for r in requests] == ["clima", "clima_2"]
+    assert requests[0].params["latitude"] == "1.0,3.0"
+    assert requests[0].params["longitude"] == "2.0,4.0"
+    assert requests[1].params["latitude"] == "5.0"
+
+
+def test_parse_weather_response_multi_location():
+    payload = [
+        daily(["2024-01-01", "2024-01-02"], [30.1, 31.2], [0.0, 12.5]),
+        daily(["2024-01-01", "2024-01-02"], [29.0, 28.4], [3.2, None]),
+    ]
+    response = SimpleNamespace(json=lambda: payload)
+
+    records = data_fetcher.parse_weather_response(response, names=["Sorriso", "Sinop"])
+
+    assert len(records) == 4
+    assert records[0] == {"data_fk": "2024-01-01", "temp_max": 30.1, "chuva_mm": 0.0, "localizacao": "Sorriso"}
+    assert records[3] == {"data_fk": "2024-01-02", "temp_max": 28.4, "chuva_mm": None, "localizacao": "Sinop"}
+
+    # Uma única coordenada: o Open-Meteo devolve um objeto, não uma lista
+    single = SimpleNamespace(json=lambda: payload[0])
+    assert len(data_fetcher.parse_weather_response(single, names=["Cuiabá"])) == 2
+
+
+def test_stale_cache_does_not_advance_watermark(tmp_path):
+    cache = ResponseCache(str(tmp_path), mode="on")
+    url = "http://127.0.0.1:9/ptax"  # porta fechada: erro de conexão
+    cache.store(url, {}, httpx.Response(200, json=[{"data": "2024-03-05"}], request=httpx.Request("GET", url)))
+    request = SourceRequest("dolar", url, lambda r: r.json(), retries=0, cache_ttl=0)
+
+    async def go():
+        async with httpx.AsyncClient() as client:
+            return await fetch_source(client, request, cache)
+
+    stale = asyncio.run(go())
+    assert stale.cache == "stale" and stale.records == [{"data": "2024-03-05"}]
+
+    fresh = SourceResult("jbs", [{"data": "2024-03-06"}], 1.0, 1, 200)
+    imea = SourceResult("imea", [], 1.0, 1, 200)
+    assert data_fetcher.source_watermarks({"dolar": stale, "jbs": fresh, "imea": imea}) == {"jbs": date(2024, 3, 6)}
+
+
+def test_brapi_range_covers_window_with_supported_values():
+    assert data_fetcher.brapi_range(1) == "1d"
+    assert data_fetcher.brapi_range(3) == "5d"
+    assert data_fetcher.brapi_range(30) == "1mo"
+    assert data_fetcher.brapi_range(40) == "3mo"
+    assert data_fetcher.brapi_range(366) == "1y"
+    assert data_fetcher.brapi_range(1000) == "5y"
+    assert data_fetcher.brapi_range(3653) == "10y"
+    assert data_fetcher.brapi_range(4000) == "max"
+
+    request = data_fetcher.stock_request("JBSS3", days=40)
+    assert request.params["range"] == "3mo"
+
+    # O range pedido cobre mais que a janela: o excesso é recortado
+    today = datetime.now()
+    prices = [{"date": int((today - timedelta(days=d)).timestamp()), "close": 20.0 + d} for d in (80, 39, 0)]
+    response = SimpleNamespace(json=lambda: {"results": [{"historicalDataPrice": prices}]})
+    assert [r["valor_jbs"] for r in request.parse(response)] == [59.0, 20.0]
@@ -0,0 +1,108 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O módulo cria o client do Supabase no import (sem rede)
+os.environ.setdefault("VITE_SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("VITE_SUPABASE_ANON_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.test")
+
+import etl_pipeline  # noqa: E402
+
+
+@pytest.fixture
+def unified_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 1500
+    df = pd.DataFrame({
+        "Date": pd.date_range("2000-01-01", periods=n).strftime("%Y-%m-%d"),
+        "Dolar": rng.random(n),
+        "JBS": rng.random(n),
+        "Boi_Gordo": rng.random(n),
+        "Temp_Max": rng.random(n),
+        "Chuva_mm": rng.random(n),
+    })
+    for column in ["Dolar", "JBS", "Boi_Gordo", "Chuva_mm"]:
+        df.loc[rng.random(n) < 0.3, column] = np.nan
+    # Lacuna longa atravessando vários chunks
+    df.loc[200:450, "Dolar"] = np.nan
+    path = tmp_path / "dados_agro.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_streaming_matches_in_memory(unified_csv):
+    df_finance, df_weather = etl_pipeline.extract_and_clean_unified(unified_csv)
+
+    streamed_finance = pd.concat(etl_pipeline.stream_finance(unified_csv, 97), ignore_index=True)
+    streamed_weather = pd.concat(etl_pipeline.stream_weather(unified_csv, 97), ignore_index=True)
+
+    pd.testing.assert_frame_equal(df_finance.reset_index(drop=True), streamed_finance)
+    pd.testing.assert_frame_equal(df_weather.reset_index(drop=True), streamed_weather)
+
+
+def test_records_are_generated_lazily(unified_csv):
+    records = etl_pipeline.iter_records(etl_pipeline.stream_finance(unified_csv, 100))
+
+    first = next(records)
+    assert first["data_fk"] == "2000-01-01"
+    assert set(first) == {"data_fk", "valor_dolar", "valor_jbs", "valor_boi_gordo"}
+
+
+class RecordingClient:
+    """Supabase falso: conta upserts por tabela; tabelas em `down` falham como rede caída"""
+
+    def __init__(self, down=()):
+        self.down = set(down)
+        self.calls = {}
+
+    def table(self, name):
+        client = self
+
+        class Query:
+            def upsert(self, rows, on_conflict=None):
+                return self
+
+            def execute(self):
+                client.calls[name] = client.calls.get(name, 0) + 1
+                if name in client.down:
+                    raise ConnectionError("connection reset")
+                return self
+
+        return Query()
+
+
+def test_incomplete_load_is_retried_on_rerun(unified_csv, tmp_path, monkeypatch):
+    import shutil
+
+    import batch_uploader
+
+    # csv/ e .etl_checkpoints/ são relativos ao diretório atual
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("csv")
+    shutil.copy(unified_csv, "csv/dados_agro.csv")
+    monkeypatch.setattr(etl_pipeline.bulk_loader, "is_available", lambda: False)
+    monkeypatch.setattr(etl_pipeline, "create_dim_calendario", lambda start, end: None)
+    monkeypatch.setattr(batch_uploader.time, "sleep", lambda seconds: None)
+
+    failing = RecordingClient(down={"fact_clima"})
+    monkeypatch.setattr(etl_pipeline, "supabase", failing)
+    etl_pipeline.run_etl_pipeline(chunksize=0)
+    assert failing.calls["fact_clima"] > 0
+
+    # Rede de volta: só os lotes de clima são reenviados
+    healthy = RecordingClient()
+    monkeypatch.setattr(etl_pipeline, "supabase", healthy)
+    etl_pipeline.run_etl_pipeline(chunksize=0)
+    assert healthy.calls.get("fact_mercado", 0) == 0
+    assert healthy.calls["fact_clima"] > 0
+
+    # Agora completa: nova execução é no-op
+    idle = RecordingClient()
+    monkeypatch.setattr(etl_pipeline, "supabase", idle)
+    etl_pipeline.run_etl_pipeline(chunksize=0)
+    assert idle.calls == {}
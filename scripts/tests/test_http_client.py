@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import SourceRequest, backoff_delay, fetch_all, fetch_source, run_sources
+from response_cache import ResponseCache
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    hits = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        MockHandler.hits[path] = MockHandler.hits.get(path, 0) + 1
+        if path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                return
+            body = json.dumps({"value": [7, 8]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif path == "/ok":
+            self._json(200, {"value": [1, 2, 3]})
+        elif path == "/flaky":
+            if MockHandler.hits[path] <= 2:
+                self._json(503, {"error": "unavailable"})
+            else:
+                self._json(200, {"value": [42]})
+        elif path.startswith("/slow"):
+            time.sleep(0.3)
+            self._json(200, {"value": [0]})
+        elif path == "/missing":
+            self._json(404, {"error": "not found"})
+        else:
+            self._json(500, {"error": "boom"})
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), MockHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def parse_values(response):
+    return [{"v": v} for v in response.json()["value"]]
+
+
+def request(name, url, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    return SourceRequest(name, url, parse_values, **kwargs)
+
+
+def test_fetches_and_parses(server):
+    results = run_sources([request("ok", f"{server}/ok")])
+    assert results["ok"].ok
+    assert results["ok"].records == [{"v": 1}, {"v": 2}, {"v": 3}]
+    assert results["ok"].attempts == 1
+    assert results["ok"].latency_ms > 0
+
+
+def test_retries_transient_errors(server):
+    MockHandler.hits.pop("/flaky", None)
+    results = run_sources([request("flaky", f"{server}/flaky", retries=3)])
+    assert results["flaky"].ok
+    assert results["flaky"].attempts == 3
+    assert results["flaky"].records == [{"v": 42}]
+
+
+def test_gives_up_after_retries(server):
+    results = run_sources([request("down", f"{server}/down", retries=1)])
+    assert not results["down"].ok
+    assert results["down"].attempts == 2
+    assert results["down"].records == []
+
+
+def test_client_errors_are_not_retried(server):
+    MockHandler.hits.pop("/missing", None)
+    results = run_sources([request("missing", f"{server}/missing", retries=3)])
+    assert not results["missing"].ok
+    assert MockHandler.hits["/missing"] == 1
+
+
+def test_timeout_is_per_source(server):
+    results = run_sources([
+        request("slow", f"{server}/slow", timeout=0.05, retries=0),
+        request("ok", f"{server}/ok"),
+    ])
+    assert not results["slow"].ok
+    assert "Timeout" in results["slow"].error
+    assert results["ok"].ok
+
+
+def test_sources_run_concurrently(server):
+    started = time.perf_counter()
+    results = run_sources([request(f"slow{i}", f"{server}/slow{i}") for i in range(4)])
+    elapsed = time.perf_counter() - started
+    assert all(r.ok for r in results.values())
+    assert elapsed < 0.3 * 4 * 0.75
+
+
+def test_concurrency_cap(server):
+    started = time.perf_counter()
+    asyncio.run(fetch_all([request(f"slow{i}", f"{server}/slow{i}") for i in range(2)], max_concurrency=1))
+    assert time.perf_counter() - started >= 0.55
+
+
+def test_backoff_is_bounded():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=0.5, cap=2.0) <= 2.0
+
+
+def fetch_with_cache(req, cache):
+    async def go():
+        async with httpx.AsyncClient() as client:
+            return await fetch_source(client, req, cache)
+    return asyncio.run(go())
+
+
+def test_cache_ttl_then_etag_revalidation(server, tmp_path):
+    MockHandler.hits.pop("/etag", None)
+    cache = ResponseCache(str(tmp_path), mode="on")
+    req = request("etag", f"{server}/etag", params={"d": "1", "token": "secret"}, cache_ttl=60)
+
+    first = fetch_with_cache(req, cache)
+    second = fetch_with_cache(req, cache)
+    assert first.cache == "stored" and second.cache == "hit"
+    assert second.records == [{"v": 7}, {"v": 8}]
+    assert MockHandler.hits["/etag"] == 1
+    # Corpo gravado comprimido, sem o token na chave/metadados
+    stored = list(tmp_path.iterdir())
+    assert len(stored) == 1 and stored[0].suffix == ".gz"
+
+    # TTL vencido: request condicional, 304 reaproveita o corpo salvo
+    expired = request("etag", f"{server}/etag", params={"d": "1", "token": "other"}, cache_ttl=0)
+    third = fetch_with_cache(expired, cache)
+    assert third.cache == "revalidated"
+    assert third.records == [{"v": 7}, {"v": 8}]
+    assert MockHandler.hits["/etag"] == 2
+
+
+def test_offline_mode_replays_without_network(server, tmp_path):
+    fetch_with_cache(request("ok", f"{server}/ok", cache_ttl=60), ResponseCache(str(tmp_path), mode="on"))
+    MockHandler.hits.pop("/ok", None)
+    offline = ResponseCache(str(tmp_path), mode="offline")
+
+    replay = fetch_with_cache(request("ok", f"{server}/ok", cache_ttl=0), offline)
+    miss = fetch_with_cache(request("new", f"{server}/ok", params={"x": "1"}, cache_ttl=60), offline)
+
+    assert replay.ok and replay.cache == "offline"
+    assert replay.records == [{"v": 1}, {"v": 2}, {"v": 3}]
+    assert not miss.ok and "offline" in miss.error
+    assert "/ok" not in MockHandler.hits
+
+
+def test_stale_cache_when_upstream_is_down(tmp_path):
+    cache = ResponseCache(str(tmp_path), mode="on")
+    url = "http://127.0.0.1:9/down"  # porta fechada: erro de conexão
+    cache.store(url, {}, httpx.Response(200, json={"value": [5]}, request=httpx.Request("GET", url)))
+
+    result = fetch_with_cache(request("down", url, cache_ttl=0, retries=0), cache)
+
+    assert not result.ok and result.cache == "stale"
+    assert result.error.startswith("stale: ConnectError")
+    assert result.records == [{"v": 5}]
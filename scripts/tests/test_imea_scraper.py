@@ -0,0 +1,38 @@
+import os
+import sys
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import imea_scraper  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "imea_indicador_boi.html")
+
+
+@pytest.fixture(scope="module")
+def page():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("name", list(imea_scraper.available_parsers()) + ["full_tree"])
+def test_parsers_find_mato_grosso_row(page, name):
+    parser = imea_scraper.available_parsers().get(name, imea_scraper.parse_full_tree)
+    # "Mato Grosso" também aparece no rodapé, fora da tabela
+    assert parser(page) == 304.85
+    assert parser(page, "Centro-Sul") == 308.6
+
+
+def test_missing_region_returns_none(page):
+    assert imea_scraper.parse_cattle_price(page, "Goiás") is None
+    assert imea_scraper.parse_cattle_price("<p>Mato Grosso 300,00</p>") is None
+
+
+def test_parse_imea_page_uses_requested_date(page):
+    response = SimpleNamespace(text=page)
+    assert imea_scraper.parse_imea_page(response, as_of=date(2024, 3, 4)) == [
+        {"data": "2024-03-04", "valor_boi_gordo": 304.85}
+    ]
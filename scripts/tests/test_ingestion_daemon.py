@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# data_fetcher cria o client do Supabase no import (sem rede)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.test")
+
+import ingestion_daemon  # noqa: E402
+from http_client import SourceRequest  # noqa: E402
+from ingestion_daemon import B3_TZ, IngestionDaemon, PollingSource, is_b3_session  # noqa: E402
+
+
+def test_b3_session_hours_and_holidays():
+    assert is_b3_session(datetime(2024, 3, 4, 11, 0, tzinfo=B3_TZ))
+    assert not is_b3_session(datetime(2024, 3, 4, 9, 59, tzinfo=B3_TZ))
+    assert not is_b3_session(datetime(2024, 3, 4, 18, 0, tzinfo=B3_TZ))
+    assert not is_b3_session(datetime(2024, 3, 2, 11, 0, tzinfo=B3_TZ))  # sábado
+    assert not is_b3_session(datetime(2024, 2, 12, 11, 0, tzinfo=B3_TZ))  # carnaval
+    # 13h UTC = 10h em Brasília
+    assert is_b3_session(datetime.fromisoformat("2024-03-04T13:30:00+00:00"))
+
+
+def test_next_delay_uses_session_interval_jitter_and_retry():
+    source = PollingSource("jbs", lambda days: [], 300, 3600)
+    daemon = IngestionDaemon(sources=[source], writer=lambda *args: 0, jitter=0.1)
+    session = datetime(2024, 3, 4, 11, 0, tzinfo=B3_TZ)
+    night = datetime(2024, 3, 4, 22, 0, tzinfo=B3_TZ)
+
+    assert all(270 <= daemon.next_delay(source, session) <= 330 for _ in range(50))
+    assert 3240 <= daemon.next_delay(source, night) <= 3960
+
+    daemon.status["jbs"].consecutive_failures = 2  # 60s, 120s, ... até o intervalo
+    assert 108 <= daemon.next_delay(source, night) <= 132
+
+
+def test_polls_keep_warm_state_and_report_status(monkeypatch):
+    monkeypatch.setattr(ingestion_daemon, "save_watermarks", lambda *args: None)
+    monkeypatch.setattr(ingestion_daemon, "EVENTS_PUBLISH_URL", "http://api/api/events/publish")
+    calls = []
+    events = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/api/events/publish":
+            events.append(json.loads(request.content))
+            return httpx.Response(200, json={})
+        if request.url.path == "/imea":
+            return httpx.Response(503)
+        return httpx.Response(200, json={"data": "2024-03-04", "valor": 5.1})
+
+    def parse(column):
+        return lambda response: [{"data": response.json()["data"], column: response.json()["valor"]}]
+
+    def request(name, column):
+        return SourceRequest(name, f"http://upstream/{name}", parse(column), retries=0)
+
+    sources = [
+        PollingSource("dolar", lambda days: [request("dolar", "valor_dolar")], 60, 60),
+        PollingSource("imea", lambda days: [request("imea", "valor_boi_gordo")], 60, 60),
+    ]
+    written = []
+
+    def writer(name, results, days):
+        written.append((name, sorted(n for n, r in results.items() if r.ok)))
+        return 1
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            daemon = IngestionDaemon(sources=sources, client=client, writer=writer)
+            await daemon.warm_up()
+            await daemon.poll(daemon.sources["dolar"])
+
+            server = await daemon.start_status_server(host="127.0.0.1", port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with httpx.AsyncClient() as http:
+                status = (await http.get(f"http://127.0.0.1:{port}/status")).json()
+                missing = await http.get(f"http://127.0.0.1:{port}/nope")
+            server.close()
+            await server.wait_closed()
+            return daemon, status, missing
+
+    daemon, status, missing = asyncio.run(scenario())
+
+    assert calls.count("/dolar") == 2
+    # IMEA falhou: nada gravado para ele e o dólar continua no estado quente
+    assert written == [("dolar", ["dolar"]), ("dolar", ["dolar"])]
+    assert daemon.watermarks["dolar"].isoformat() == "2024-03-04"
+    assert status["sources"]["dolar"]["polls"] == 2
+    assert status["sources"]["dolar"]["rows_written"] == 2
+    assert status["sources"]["imea"]["last_success_at"] is None
+    assert "503" in status["sources"]["imea"]["last_error"]
+    assert status["watermarks"] == {"dolar": "2024-03-04"}
+    assert missing.status_code == 404
+    # Cada gravação do dólar anuncia a tabela e a invalidação para o push SSE
+    assert events[:2] == [
+        {"type": "fact_mercado", "data": {"source": "dolar", "rows": 1, "latest": "2024-03-04"}},
+        {"type": "invalidate", "data": {"tables": ["fact_mercado"]}},
+    ]
+    assert len(events) == 4
@@ -0,0 +1,79 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from number_parser import LOCALE_EN, LOCALE_PT_BR, detect_locale, parse_numeric, parse_numeric_columns
+
+# (entrada, locale esperado, saída esperada)
+GOLDEN = [
+    (["1.234,56", "5,38", "0,5", "-1.234,5"], LOCALE_PT_BR, [1234.56, 5.38, 0.5, -1234.5]),
+    (["1,234.56", "5.38", "0.5", "-1,234.5"], LOCALE_EN, [1234.56, 5.38, 0.5, -1234.5]),
+    # Formato já com ponto decimal (o parser antigo removia o ponto: 5.3829 -> 53829)
+    (["5.382900238037109", "39.03819029279317", "660.58"], LOCALE_EN, [5.382900238037109, 39.03819029279317, 660.58]),
+    # Milhar pt-BR sem decimais
+    (["1.234.567", "2.000", "15"], LOCALE_PT_BR, [1234567.0, 2000.0, 15.0]),
+    # Ambíguos desempatados pelo resto da coluna
+    (["1.234", "5,5"], LOCALE_PT_BR, [1234.0, 5.5]),
+    (["1,234", "5.5"], LOCALE_EN, [1234.0, 5.5]),
+    # Vazios, lixo e espaços viram NaN / são ignorados
+    ([" 7,25 ", "", None, "n/a", "3,1"], LOCALE_PT_BR, [7.25, np.nan, np.nan, np.nan, 3.1]),
+]
+
+
+# Colunas mistas: valor inequívoco é lido no próprio formato, não no da maioria
+MIXED = [
+    (["5,38", "5,40", "5.42"], LOCALE_PT_BR, [5.38, 5.40, 5.42]),
+    (["1.234,56", "5.38"], LOCALE_EN, [1234.56, 5.38]),
+    (["1,234.56", "2.000,5", "7,25", "1.234"], LOCALE_PT_BR, [1234.56, 2000.5, 7.25, 1234.0]),
+    (["1,234,567", "3,5", "3,50"], LOCALE_PT_BR, [1234567.0, 3.5, 3.5]),
+]
+
+
+@pytest.mark.parametrize("values,locale,expected", GOLDEN)
+def test_golden_inputs(values, locale, expected):
+    series = pd.Series(values, dtype=object)
+
+    assert detect_locale(series) == locale
+    np.testing.assert_array_equal(parse_numeric(series).to_numpy(), np.array(expected, dtype=float))
+
+
+@pytest.mark.parametrize("values,locale,expected", MIXED)
+def test_mixed_columns_keep_each_value_format(values, locale, expected):
+    series = pd.Series(values, dtype=object)
+
+    assert detect_locale(series) == locale
+    np.testing.assert_allclose(parse_numeric(series).to_numpy(), np.array(expected, dtype=float))
+
+
+def test_mixed_values_are_reported(capsys):
+    df = pd.DataFrame({"valor_dolar": ["5,38", "5,40", "5.42"]})
+    parse_numeric_columns(df, ["valor_dolar"])
+
+    assert df["valor_dolar"].tolist() == [5.38, 5.40, 5.42]
+    assert "valor_dolar: 1 valores com formato diferente" in capsys.readouterr().out
+
+
+def test_numeric_columns_pass_through():
+    series = pd.Series([1.5, np.nan, 3])
+    parsed = parse_numeric(series)
+
+    assert parsed.dtype == np.float64
+    np.testing.assert_array_equal(parsed.to_numpy(), [1.5, np.nan, 3.0])
+
+
+def test_locale_is_detected_per_column_and_reused_across_chunks():
+    locales = {}
+    first = pd.DataFrame({"valor_dolar": ["5,38", "5,41"], "valor_jbs": ["39.03", "40.10"]})
+    parse_numeric_columns(first, ["valor_dolar", "valor_jbs"], locales)
+    assert locales == {"valor_dolar": LOCALE_PT_BR, "valor_jbs": LOCALE_EN}
+
+    # Chunk seguinte só com valores ambíguos: mantém o locale do primeiro
+    second = pd.DataFrame({"valor_dolar": ["1.234"], "valor_jbs": ["1,234"]})
+    parse_numeric_columns(second, ["valor_dolar", "valor_jbs"], locales, decimals=2)
+    assert second["valor_dolar"].tolist() == [1234.0]
+    assert second["valor_jbs"].tolist() == [1234.0]
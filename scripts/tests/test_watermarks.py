@@ -0,0 +1,43 @@
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from watermarks import save_watermarks
+
+
+class FakeTable:
+    def __init__(self, upserts):
+        self.upserts = upserts
+
+    def upsert(self, rows, on_conflict=""):
+        self.upserts.append((rows, on_conflict))
+        return self
+
+    def execute(self):
+        return self
+
+
+class FakeClient:
+    def __init__(self):
+        self.upserts = []
+
+    def table(self, name):
+        return FakeTable(self.upserts)
+
+
+def test_save_never_moves_watermark_back():
+    client = FakeClient()
+    stored = {"dolar": date(2024, 3, 10), "jbs": date(2024, 3, 1)}
+
+    save_watermarks(client, {"dolar": date(2024, 3, 5), "jbs": date(2024, 3, 6), "imea": date(2024, 3, 4)}, 3, stored)
+
+    rows, on_conflict = client.upserts[0]
+    assert on_conflict == "source"
+    assert {r["source"]: r["last_success_date"] for r in rows} == {
+        "dolar": "2024-03-10",  # janela atrasada não regride
+        "jbs": "2024-03-06",
+        "imea": "2024-03-04",
+    }
+    assert all(r["rows_written"] == 3 for r in rows)
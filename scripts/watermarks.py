@@ -0,0 +1,97 @@
+"""
+Watermarks de ingestão por fonte (tabela ingestion_state)
+Cada execução busca apenas desde a última data boa + uma pequena sobreposição,
+em vez de repuxar uma janela fixa de 30 dias.
+"""
+
+import os
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional
+
+WATERMARK_TABLE = "ingestion_state"
+WATERMARK_OVERLAP_DAYS = int(os.getenv("WATERMARK_OVERLAP_DAYS", "3"))
+DEFAULT_LOOKBACK_DAYS = int(os.getenv("DEFAULT_LOOKBACK_DAYS", "30"))
+
+
+def _to_date(value) -> Optional[date]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def load_watermarks(client) -> Dict[str, date]:
+    """Lê todas as watermarks em uma query; tabela ausente = sem watermark"""
+    try:
+        resp = client.table(WATERMARK_TABLE).select("source, last_success_date").execute()
+    except Exception as e:
+        print(f"⚠️ Não foi possível ler {WATERMARK_TABLE} ({e}), usando janela padrão")
+        return {}
+    return {
+        row["source"]: _to_date(row["last_success_date"])
+        for row in (resp.data or [])
+        if _to_date(row.get("last_success_date"))
+    }
+
+
+def lookback_days(
+    watermark: Optional[date],
+    today: Optional[date] = None,
+    overlap: int = WATERMARK_OVERLAP_DAYS,
+    default: int = DEFAULT_LOOKBACK_DAYS,
+) -> int:
+    """
+    Dias a buscar: desde a watermark + overlap, limitado à janela padrão.
+    Sem watermark (primeira execução) usa a janela padrão; lacunas maiores
+    que isso devem ser preenchidas por backfill.
+    """
+    if watermark is None:
+        return default
+    today = today or date.today()
+    days = (today - watermark).days + overlap
+    return max(1, min(default, days))
+
+
+def latest_date(records: Iterable[dict], key: str = "data") -> Optional[date]:
+    """Maior data presente nos registros de uma fonte"""
+    dates = [_to_date(r.get(key)) for r in records]
+    dates = [d for d in dates if d is not None]
+    return max(dates) if dates else None
+
+
+def merge_watermarks(stored: Optional[Dict[str, date]], new: Dict[str, date]) -> Dict[str, date]:
+    """max(gravada, nova) por fonte: uma janela reprocessada não faz a watermark voltar"""
+    stored = stored or {}
+    return {source: max(value, stored[source]) if stored.get(source) else value for source, value in new.items()}
+
+
+def save_watermarks(
+    client,
+    watermarks: Dict[str, date],
+    rows_written: int = 0,
+    stored: Optional[Dict[str, date]] = None,
+) -> None:
+    """
+    Grava as watermarks das fontes que tiveram sucesso (um único upsert).
+    Nunca regride: compara com as já lidas (stored) e o trigger da tabela
+    aplica greatest() contra escritas concorrentes (cron + daemon).
+    """
+    if not watermarks:
+        return
+    watermarks = merge_watermarks(stored, watermarks)
+    now = datetime.utcnow().isoformat()
+    rows = [
+        {"source": source, "last_success_date": value.isoformat(), "last_run_at": now, "rows_written": rows_written}
+        for source, value in watermarks.items()
+    ]
+    try:
+        client.table(WATERMARK_TABLE).upsert(rows, on_conflict="source").execute()
+        print(f"🔖 Watermarks atualizadas: {', '.join(f'{k}={v}' for k, v in watermarks.items())}")
+    except Exception as e:
+        print(f"⚠️ Erro ao salvar watermarks: {e}")
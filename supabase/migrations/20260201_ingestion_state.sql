@@ -0,0 +1,11 @@
+-- Watermarks de ingestão por fonte (data_fetcher.py)
+-- Cada execução busca apenas desde last_success_date + pequena sobreposição
+create table if not exists public.ingestion_state (
+  source text primary key,
+  last_success_date date not null,
+  last_run_at timestamptz not null default now(),
+  rows_written integer not null default 0
+);
+
+-- Somente o service_role (que ignora RLS) lê/escreve
+alter table public.ingestion_state enable row level security;
@@ -0,0 +1,21 @@
+-- Atributos extras da dim_calendario (calculados uma vez por scripts/calendar_dim.py)
+alter table public.dim_calendario
+  add column if not exists dia_semana smallint,       -- ISO: 1=segunda ... 7=domingo
+  add column if not exists semana smallint,           -- semana ISO
+  add column if not exists trimestre smallint,
+  add column if not exists is_feriado boolean not null default false,
+  add column if not exists nome_feriado text,
+  add column if not exists is_trading_day boolean;    -- pregão na B3
+
+-- Preenche o que dá para calcular em SQL nas linhas existentes; feriados e
+-- pregão vêm de: python scripts/calendar_dim.py <inicio> <fim> --refresh
+update public.dim_calendario
+set
+  dia_semana = extract(isodow from data_pk)::smallint,
+  semana = extract(week from data_pk)::smallint,
+  trimestre = extract(quarter from data_pk)::smallint,
+  is_trading_day = coalesce(is_trading_day, is_business_day)
+where dia_semana is null;
+
+create index if not exists idx_dim_calendario_trading_day
+  on public.dim_calendario(data_pk) where is_trading_day;
@@ -0,0 +1,112 @@
+-- fact_clima com várias localizações: chave (data_fk, localizacao)
+-- O data_fetcher grava uma linha por dia e região produtora (WEATHER_LOCATIONS)
+
+-- 1) localizacao passa a fazer parte da chave: sem nulos
+update public.fact_clima set localizacao = 'Mato Grosso' where localizacao is null;
+alter table public.fact_clima alter column localizacao set default 'Mato Grosso';
+alter table public.fact_clima alter column localizacao set not null;
+
+-- 2) Remove PK/unique só em data_fk (o nome varia conforme a migração que criou a tabela)
+do $$
+declare
+  r record;
+begin
+  for r in
+    select con.conname
+    from pg_constraint con
+    join pg_attribute att on att.attrelid = con.conrelid and att.attnum = con.conkey[1]
+    where con.conrelid = 'public.fact_clima'::regclass
+      and con.contype in ('p', 'u')
+      and array_length(con.conkey, 1) = 1
+      and att.attname = 'data_fk'
+  loop
+    execute format('alter table public.fact_clima drop constraint %I', r.conname);
+  end loop;
+
+  for r in
+    select idx.relname
+    from pg_index i
+    join pg_class idx on idx.oid = i.indexrelid
+    join pg_attribute att on att.attrelid = i.indrelid and att.attnum = i.indkey[0]
+    where i.indrelid = 'public.fact_clima'::regclass
+      and i.indisunique
+      and i.indnatts = 1
+      and att.attname = 'data_fk'
+  loop
+    execute format('drop index if exists public.%I', r.relname);
+  end loop;
+end $$;
+
+-- 3) Nova chave natural (alvo do upsert on_conflict=data_fk,localizacao)
+create unique index if not exists fact_clima_data_localizacao_key
+  on public.fact_clima(data_fk, localizacao);
+
+-- Filtro por região na API: localizacao = any(...) and data_fk between ...
+create index if not exists idx_fact_clima_localizacao_data
+  on public.fact_clima(localizacao, data_fk);
+
+-- 4) Clima diário agregado entre as regiões (uma linha por data)
+create or replace view public.view_clima_diario
+with (security_invoker=on) as
+select
+  data_fk,
+  round(avg(chuva_mm), 2) as chuva_mm,
+  round(avg(temp_max), 2) as temp_max,
+  count(*) as n_localizacoes
+from public.fact_clima
+group by data_fk;
+
+-- Resumo por região (lista de localizações disponíveis na API)
+create or replace view public.view_clima_localizacoes
+with (security_invoker=on) as
+select
+  localizacao,
+  min(data_fk) as data_inicio,
+  max(data_fk) as data_fim,
+  count(*) as dias,
+  round(avg(chuva_mm), 2) as chuva_media_mm,
+  round(avg(temp_max), 2) as temp_max_media
+from public.fact_clima
+group by localizacao;
+
+-- 5) Views que juntavam fact_clima por data passam a usar a média diária
+--    (senão cada data de mercado se repetiria uma vez por região).
+--    drop + create: o tipo das colunas de clima muda (avg -> numeric)
+drop view if exists public.vw_agro_daily;
+create view public.vw_agro_daily
+with (security_invoker=on) as
+select
+  c.data_pk as data,
+  c.ano,
+  c.mes,
+  c.is_business_day,
+  m.valor_dolar,
+  m.valor_jbs,
+  m.valor_boi_gordo,
+  w.temp_max,
+  w.chuva_mm,
+  case when w.n_localizacoes > 1 then 'Média regional' else coalesce(w.localizacao, 'Mato Grosso') end as localizacao
+from public.dim_calendario c
+left join public.fact_mercado m on m.data_fk = c.data_pk
+left join (
+  select data_fk, avg(temp_max) as temp_max, avg(chuva_mm) as chuva_mm, count(*) as n_localizacoes, min(localizacao) as localizacao
+  from public.fact_clima
+  group by data_fk
+) w on w.data_fk = c.data_pk
+order by c.data_pk;
+
+drop view if exists public.view_lag_chuva_60d_boi;
+create view public.view_lag_chuva_60d_boi
+with (security_invoker=on) as
+select
+    fm.data_fk as data_preco,
+    dc_preco.ano as ano_preco,
+    dc_preco.mes as mes_preco,
+    fm.valor_boi_gordo,
+    fc.chuva_mm as chuva_mm_lag_60d,
+    fc.data_fk as data_chuva_original
+from public.fact_mercado fm
+join public.dim_calendario dc_preco on fm.data_fk = dc_preco.data_pk
+left join public.view_clima_diario fc on fc.data_fk = fm.data_fk - interval '60 days'
+where fm.valor_boi_gordo is not null
+order by fm.data_fk;
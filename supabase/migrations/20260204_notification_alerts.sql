@@ -0,0 +1,29 @@
+-- Alertas gerados no servidor (api/lib/alerts.py) em vez de em cada navegador
+-- 1) Metadados do alerta + chave de deduplicação por usuário
+alter table public.notifications
+  add column if not exists category text,
+  add column if not exists level text,
+  add column if not exists dedup_key text;
+
+-- Reavaliar a mesma janela não duplica: insert ... on conflict (user_id, dedup_key) do nothing
+-- (dedup_key nulo = notificação comum, nunca conflita)
+create unique index if not exists idx_notifications_user_dedup
+  on public.notifications(user_id, dedup_key);
+
+-- 2) Preferências de alerta (opt-out): sem linha = recebe todas as categorias
+create table if not exists public.alert_subscriptions (
+  user_id uuid primary key references auth.users(id) on delete cascade,
+  enabled boolean not null default true,
+  categories text[] not null default array['mercado', 'clima'],
+  updated_at timestamptz not null default now()
+);
+
+alter table public.alert_subscriptions enable row level security;
+
+drop policy if exists "Users manage own alert subscription" on public.alert_subscriptions;
+create policy "Users manage own alert subscription"
+  on public.alert_subscriptions
+  for all
+  to authenticated
+  using (auth.uid() = user_id)
+  with check (auth.uid() = user_id);
@@ -0,0 +1,27 @@
+-- Central de notificações via API (/api/notifications)
+-- 1) Estado de leitura
+alter table public.notifications
+  add column if not exists is_read boolean not null default false;
+
+-- 2) Keyset por usuário: where user_id = ? and (created_at, id) < cursor
+--    order by created_at desc, id desc (desempate estável para o cursor)
+create index if not exists idx_notifications_user_created
+  on public.notifications(user_id, created_at desc, id desc);
+
+-- Notificações globais (user_id nulo) entram na mesma página
+create index if not exists idx_notifications_global_created
+  on public.notifications(created_at desc, id desc)
+  where user_id is null;
+
+-- 3) Contador de não lidas: só as linhas não lidas ficam no índice
+create index if not exists idx_notifications_unread
+  on public.notifications(user_id)
+  where not is_read;
+
+-- 4) Usuário marca as próprias como lidas (acesso direto pelo Supabase)
+drop policy if exists "Users can update own notifications" on public.notifications;
+create policy "Users can update own notifications"
+  on public.notifications
+  for update
+  using (user_id = auth.uid())
+  with check (user_id = auth.uid());
@@ -0,0 +1,17 @@
+-- Watermarks nunca regridem: cron (data_fetcher) e daemon gravam a mesma fonte
+-- e uma janela reprocessada/atrasada não pode voltar last_success_date
+create or replace function public.ingestion_state_keep_latest()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.last_success_date := greatest(old.last_success_date, new.last_success_date);
+  return new;
+end;
+$$;
+
+drop trigger if exists ingestion_state_keep_latest on public.ingestion_state;
+create trigger ingestion_state_keep_latest
+  before update on public.ingestion_state
+  for each row
+  execute function public.ingestion_state_keep_latest();